@@ -0,0 +1,74 @@
+"""
+Benchmark field-indexed rule dispatch.
+
+Each event touches one field. The number of rules referencing that field is
+held constant while the total number of rules grows; with the index in
+place the per-event cost should stay roughly flat.
+
+Run from the repository root:
+
+    python packages/validator-python/benchmarks/bench_rule_dispatch.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from sdt_validator.rules import RuleEngine
+
+
+def _rules(total: int, matching: int, fields: int) -> list[dict]:
+    rules = []
+    for i in range(total):
+        # The first `matching` rules watch the hot field; the rest are spread
+        # across the other fields.
+        field = "hot" if i < matching else f"f{i % fields}"
+        rules.append(
+            {
+                "schema_version": "0.1.0",
+                "id": f"r{i}",
+                "template_id": "bench",
+                "enabled": True,
+                "conditions": [{"type": "count", "field": field, "value": 1_000_000}],
+                "effects": [{"type": "nudge"}],
+            }
+        )
+    return rules
+
+
+def _events(n: int, users: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        {
+            "user_id": f"u{rng.randrange(users)}",
+            "project_id": "p",
+            "timestamp": "2026-03-01T00:00:00Z",
+            "field": "hot",
+            "value": 1,
+        }
+        for _ in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--matching", type=int, default=5)
+    args = parser.parse_args()
+
+    events = _events(args.events, args.users)
+    print(f"{'total rules':>12} {'matching':>9} {'us/event':>9}")
+    for total in (10, 100, 1_000, 10_000):
+        engine = RuleEngine(_rules(total, args.matching, fields=200), validate=False)
+        start = time.perf_counter()
+        for event in events:
+            engine.process(event)
+        elapsed = time.perf_counter() - start
+        print(f"{total:>12} {args.matching:>9} {elapsed / len(events) * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,95 @@
-from .validator import (
-    ValidationError,
-    load_json_file,
-    validate_template,
-    validate_rule,
-    validate_agent,
-    validate_project,
-    validate_execution,
-    validate_event,
-    validate_billing,
-)
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .dedupe import DuplicateDetector
+    from .references import (
+        ReferenceResult,
+        TemplateIndex,
+        iter_reference_errors,
+        validate_references,
+    )
+    from .stream import (
+        RecordResult,
+        StreamSummary,
+        iter_ndjson,
+        iter_validate_ndjson,
+    )
+    from .validator import (
+        KINDS,
+        ErrorDetail,
+        ValidationError,
+        clear_schema_cache,
+        compile_schemas,
+        load_json_file,
+        validate_template,
+        validate_rule,
+        validate_agent,
+        validate_project,
+        validate_execution,
+        validate_event,
+        validate_billing,
+        validate_kind,
+        is_valid,
+    )
+
+# Public names and the submodule each comes from. They are imported on first
+# access so `sdt-validate` can hand a file to a running daemon (see server.py)
+# without loading the validator.
+_EXPORTS = {
+    "DuplicateDetector": "dedupe",
+    "ReferenceResult": "references",
+    "TemplateIndex": "references",
+    "iter_reference_errors": "references",
+    "validate_references": "references",
+    "RecordResult": "stream",
+    "StreamSummary": "stream",
+    "iter_ndjson": "stream",
+    "iter_validate_ndjson": "stream",
+    "KINDS": "validator",
+    "ErrorDetail": "validator",
+    "ValidationError": "validator",
+    "clear_schema_cache": "validator",
+    "compile_schemas": "validator",
+    "load_json_file": "validator",
+    "validate_template": "validator",
+    "validate_rule": "validator",
+    "validate_agent": "validator",
+    "validate_project": "validator",
+    "validate_execution": "validator",
+    "validate_event": "validator",
+    "validate_billing": "validator",
+    "validate_kind": "validator",
+    "is_valid": "validator",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
+    "KINDS",
+    "DuplicateDetector",
+    "ErrorDetail",
+    "RecordResult",
+    "ReferenceResult",
+    "StreamSummary",
+    "TemplateIndex",
     "ValidationError",
+    "clear_schema_cache",
+    "compile_schemas",
     "load_json_file",
     "validate_template",
     "validate_rule",
@@ -20,4 +98,10 @@ __all__ = [
     "validate_execution",
     "validate_event",
     "validate_billing",
+    "validate_kind",
+    "is_valid",
+    "iter_ndjson",
+    "iter_validate_ndjson",
+    "iter_reference_errors",
+    "validate_references",
 ]
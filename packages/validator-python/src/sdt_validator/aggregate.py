@@ -0,0 +1,266 @@
+"""
+Incremental metric aggregation with per-user running state.
+
+MetricAggregator keeps, for every (user_id, project_id), one small running
+state per distinct aggregate call in a template's metrics. Each event updates
+the states in O(1) and get_metric() combines them without touching history.
+Events can be retracted (e.g. when a user deletes data) and a user's whole
+state can be dropped.
+
+Results are identical to evaluating the same formulas with
+metrics.evaluate_metrics() over the retained records.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Iterable, Mapping, Optional, Union
+
+from .metrics import Aggregate, Call, compile_template_metrics, record_from_event
+from .records import EventRecord
+
+
+class ExactSum:
+    """
+    An exact, order-independent running sum of ints and floats.
+
+    Values can be added, removed again and merged from other sums without
+    drift. value() is metrics.exact_sum() of the values held: their exact
+    int sum if none is a float, else the correctly rounded (math.fsum) sum
+    of all of them as floats. Finite floats are kept as one integer over the
+    largest power-of-two denominator seen, a few words wide for typical
+    data. Infinities and NaNs are counted apart; a NaN, or infinities of
+    both signs, make the sum NaN.
+    """
+
+    __slots__ = ("ints", "floats", "num", "shift", "pos_inf", "neg_inf", "nans")
+
+    def __init__(self) -> None:
+        self.ints = 0
+        self.floats = 0
+        self.num = 0  # finite part of the float sum is num / 2**shift
+        self.shift = 0
+        self.pos_inf = self.neg_inf = self.nans = 0
+
+    def add(self, v: Any) -> None:
+        self._fold(v, 1)
+
+    def remove(self, v: Any) -> None:
+        self._fold(v, -1)
+
+    def _fold(self, v: Any, sign: int) -> None:
+        if isinstance(v, float):
+            self.floats += sign
+            f = v
+        else:
+            self.ints += sign * int(v)
+            try:
+                f = float(v)
+            except OverflowError:
+                f = math.inf if v > 0 else -math.inf
+        if math.isfinite(f):
+            n, d = f.as_integer_ratio()
+            k = d.bit_length() - 1
+            if k > self.shift:
+                self.num <<= k - self.shift
+                self.shift = k
+            self.num += sign * (n << (self.shift - k))
+        elif f != f:
+            self.nans += sign
+        elif f > 0:
+            self.pos_inf += sign
+        else:
+            self.neg_inf += sign
+
+    def merge(self, other: ExactSum) -> None:
+        self.ints += other.ints
+        self.floats += other.floats
+        shift = max(self.shift, other.shift)
+        self.num = (self.num << (shift - self.shift)) + (other.num << (shift - other.shift))
+        self.shift = shift
+        self.pos_inf += other.pos_inf
+        self.neg_inf += other.neg_inf
+        self.nans += other.nans
+
+    def value(self, as_float: Optional[bool] = None) -> Any:
+        """The sum; as_float forces (or suppresses) the float result."""
+        if not (self.floats if as_float is None else as_float):
+            return self.ints
+        if self.nans or (self.pos_inf and self.neg_inf):
+            return math.nan
+        if self.pos_inf or self.neg_inf:
+            return math.inf if self.pos_inf else -math.inf
+        try:
+            return self.num / (1 << self.shift)
+        except OverflowError:
+            return math.copysign(math.inf, self.num)
+
+
+def _count_key(v: Any) -> tuple[bool, Any]:
+    # True == 1 and False == 0 hash alike; keep bools apart from numbers.
+    return (type(v) is bool, v)
+
+
+class RunningAggregate:
+    """
+    Running state for one aggregate: count, ExactSum, and (for min/max) a
+    value -> multiplicity map so retracting the current extreme is possible.
+
+    The map holds one entry per distinct value, which exact retraction of
+    an extreme requires. min and max ignore NaNs, which have no order.
+    """
+
+    __slots__ = ("func", "n", "total", "counts", "extreme")
+
+    def __init__(self, func: str) -> None:
+        self.func = func
+        self.n = 0
+        self.total = ExactSum() if func in ("sum", "avg") else None
+        self.counts: Optional[dict[tuple[bool, Any], int]] = (
+            {} if func in ("min", "max") else None
+        )
+        # Cached min/max; None means "recompute from counts on next read".
+        self.extreme: Any = None
+
+    def add(self, values: list) -> None:
+        for v in values:
+            if self.counts is not None and v != v:
+                continue
+            self.n += 1
+            if self.func == "count":
+                continue
+            if self.counts is not None:
+                key = _count_key(v)
+                self.counts[key] = self.counts.get(key, 0) + 1
+                if self.extreme is not None and (
+                    v < self.extreme if self.func == "min" else v > self.extreme
+                ):
+                    self.extreme = v
+                elif self.n == 1:
+                    self.extreme = v
+            else:
+                self.total.add(v)
+
+    def remove(self, values: list) -> None:
+        for v in values:
+            if self.counts is not None and v != v:
+                continue
+            if self.func != "count":
+                if self.counts is not None:
+                    key = _count_key(v)
+                    left = self.counts.get(key, 0) - 1
+                    if left < 0:
+                        raise ValueError(f"Cannot retract {v!r}: it was never added")
+                    if left:
+                        self.counts[key] = left
+                    else:
+                        del self.counts[key]
+                        if self.extreme is not None and _count_key(self.extreme) == key:
+                            self.extreme = None
+                else:
+                    self.total.remove(v)
+            self.n -= 1
+            if self.n < 0:
+                raise ValueError("Cannot retract more values than were added")
+
+    def result(self) -> Any:
+        if self.func == "count":
+            return self.n
+        if self.func in ("min", "max"):
+            if not self.counts:
+                return None
+            if self.extreme is None:
+                pick = min if self.func == "min" else max
+                self.extreme = pick(self.counts, key=lambda k: k[1])[1]
+            return self.extreme
+        if self.func == "sum":
+            return self.total.value()
+        if not self.n:
+            return None
+        return self.total.value() / self.n
+
+
+class MetricAggregator:
+    """
+    Incrementally maintained template metrics per (user_id, project_id).
+
+    Identical aggregate calls shared by several metrics (e.g. count(did))
+    are kept once.
+    """
+
+    def __init__(self, template_obj: Mapping[str, Any]) -> None:
+        self.template_id = template_obj.get("id")
+        self._metrics = compile_template_metrics(template_obj)
+        self._aggregates: list[Aggregate] = []
+        slots: dict[Call, int] = {}
+        self._metric_slots: dict[str, list[int]] = {}
+        for key, metric in self._metrics.items():
+            indices = []
+            for agg in metric.aggregates:
+                if agg.node not in slots:
+                    slots[agg.node] = len(self._aggregates)
+                    self._aggregates.append(agg)
+                indices.append(slots[agg.node])
+            self._metric_slots[key] = indices
+        self._state: dict[str, dict[str, list[RunningAggregate]]] = {}
+
+    def _states(self, user_id: str, project_id: str) -> list[RunningAggregate]:
+        projects = self._state.setdefault(user_id, {})
+        states = projects.get(project_id)
+        if states is None:
+            states = [RunningAggregate(agg.func) for agg in self._aggregates]
+            projects[project_id] = states
+        return states
+
+    def add_record(self, user_id: str, project_id: str, record: Mapping[str, Any]) -> None:
+        """Fold one {field: value} record into the running state."""
+        states = self._states(user_id, project_id)
+        for agg, state in zip(self._aggregates, states):
+            values = agg.extract(record)
+            if values:
+                state.add(values)
+
+    def retract_record(self, user_id: str, project_id: str, record: Mapping[str, Any]) -> None:
+        """Undo a previous add_record() with the same record."""
+        projects = self._state.get(user_id)
+        if not projects or project_id not in projects:
+            raise KeyError(f"No state for user '{user_id}' in project '{project_id}'")
+        for agg, state in zip(self._aggregates, projects[project_id]):
+            values = agg.extract(record)
+            if values:
+                state.remove(values)
+
+    def add(self, event: Union[Mapping[str, Any], EventRecord]) -> None:
+        """Fold one event.schema.json object (or EventRecord) into the running state."""
+        if isinstance(event, EventRecord):
+            self.add_record(event.user_id, event.project_id, event.record())
+        else:
+            self.add_record(event["user_id"], event["project_id"], record_from_event(event))
+
+    def retract(self, event: Union[Mapping[str, Any], EventRecord]) -> None:
+        """Remove a previously added event without recomputing from history."""
+        if isinstance(event, EventRecord):
+            self.retract_record(event.user_id, event.project_id, event.record())
+        else:
+            self.retract_record(event["user_id"], event["project_id"], record_from_event(event))
+
+    def add_many(self, events: Iterable[Union[Mapping[str, Any], EventRecord]]) -> None:
+        for event in events:
+            self.add(event)
+
+    def drop_user(self, user_id: str) -> None:
+        """Forget all state for a user (e.g. on an account deletion request)."""
+        self._state.pop(user_id, None)
+
+    def get_metric(self, user_id: str, project_id: str, key: str) -> Any:
+        """Current value of one metric; None-valued aggregates if nothing was seen."""
+        if key not in self._metrics:
+            raise KeyError(f"Unknown metric '{key}' for template '{self.template_id}'")
+        projects = self._state.get(user_id)
+        states = projects.get(project_id) if projects else None
+        if states is None:
+            states = [RunningAggregate(agg.func) for agg in self._aggregates]
+        return self._metrics[key].combine([states[i].result() for i in self._metric_slots[key]])
+
+    def get_metrics(self, user_id: str, project_id: str) -> dict[str, Any]:
+        return {key: self.get_metric(user_id, project_id, key) for key in self._metrics}
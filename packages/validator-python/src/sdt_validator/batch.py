@@ -0,0 +1,189 @@
+"""
+Batch validation of many JSON files across a process pool.
+
+Each worker compiles the schemas once in its initializer and then validates
+its share of the files, so the per-file cost is just reading and checking.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .dedupe import ID_FIELDS, DuplicateDetector, duplicate_error
+from .validator import (
+    _KIND_SCHEMAS,
+    ValidationError,
+    _get_compiled,
+    load_json_file,
+    validate_kind,
+)
+
+
+@dataclass
+class FileResult:
+    """
+    Validation outcome for one file. Errors are rendered (error as text,
+    details as ValidationError.to_dict()) so results pickle cleanly.
+    """
+    path: str
+    ok: bool
+    error: Optional[str] = None
+    record_id: Optional[str] = None
+    details: Optional[dict[str, Any]] = None
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    valid: int = 0
+    invalid: int = 0
+
+    def __str__(self) -> str:
+        return f"Checked {self.total} files: {self.valid} valid, {self.invalid} invalid"
+
+
+def expand_paths(patterns: Iterable[str | Path]) -> list[Path]:
+    """
+    Expand files, directories (recursively, *.json) and glob patterns.
+
+    Results are de-duplicated and returned in a stable order.
+    """
+    seen: set[Path] = set()
+    paths: list[Path] = []
+
+    def add(p: Path) -> None:
+        if p not in seen:
+            seen.add(p)
+            paths.append(p)
+
+    for pattern in patterns:
+        pattern = str(pattern)
+        p = Path(pattern)
+        if p.is_dir():
+            for child in sorted(p.rglob("*.json")):
+                add(child)
+        elif glob.has_magic(pattern):
+            for match in sorted(glob.glob(pattern, recursive=True)):
+                match_path = Path(match)
+                if match_path.is_dir():
+                    for child in sorted(match_path.rglob("*.json")):
+                        add(child)
+                else:
+                    add(match_path)
+        else:
+            add(p)
+    return paths
+
+
+# Per-process state set by _init_worker.
+_worker_kind: str = ""
+_worker_template: Any = None
+_worker_spec_dir: Optional[str] = None
+_worker_fail_fast: bool = False
+
+
+def _init_worker(
+    kind: str, template_obj: Any, spec_dir: Optional[str], fail_fast: bool = False
+) -> None:
+    global _worker_kind, _worker_template, _worker_spec_dir, _worker_fail_fast
+    _worker_kind = kind
+    _worker_template = template_obj
+    _worker_spec_dir = spec_dir
+    _worker_fail_fast = fail_fast
+    # Warm the schema cache so the first file does not pay for compilation.
+    _get_compiled(_KIND_SCHEMAS[kind], Path(spec_dir) if spec_dir else None)
+
+
+def _validate_one(
+    path: str, kind: str, template_obj: Any, spec_dir: Optional[str], fail_fast: bool = False
+) -> FileResult:
+    try:
+        obj = load_json_file(path)
+        validate_kind(kind, obj, template_obj=template_obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    except ValidationError as e:
+        return FileResult(path, False, str(e), details=e.to_dict())
+    except Exception as e:
+        return FileResult(path, False, f"Unexpected error: {e}")
+    field = ID_FIELDS.get(kind)
+    record_id = obj.get(field) if field and isinstance(obj, dict) else None
+    return FileResult(path, True, record_id=record_id if isinstance(record_id, str) else None)
+
+
+def _validate_in_worker(path: str) -> FileResult:
+    return _validate_one(
+        path, _worker_kind, _worker_template, _worker_spec_dir, _worker_fail_fast
+    )
+
+
+def validate_files(
+    paths: Iterable[str | Path],
+    kind: str,
+    *,
+    template_obj: Optional[Any] = None,
+    spec_dir: Optional[str | Path] = None,
+    jobs: Optional[int] = None,
+    duplicates: Optional[DuplicateDetector] = None,
+    fail_fast: bool = False,
+) -> list[FileResult]:
+    """
+    Validate every file in paths as `kind` and return one FileResult per file.
+
+    jobs is the number of worker processes (default: os.cpu_count()); with
+    jobs=1 or a single file everything runs in the current process. With a
+    DuplicateDetector, valid files whose id was already seen are marked
+    invalid; ids are checked in the parent, in file order. fail_fast is
+    passed to validate_kind.
+    """
+    if kind not in _KIND_SCHEMAS:
+        raise ValueError(f"Unknown kind '{kind}'. Expected one of {list(_KIND_SCHEMAS)}")
+    files = [str(p) for p in paths]
+    spec = str(Path(spec_dir).resolve()) if spec_dir else None
+    jobs = jobs or os.cpu_count() or 1
+    jobs = min(jobs, len(files)) if files else 1
+
+    if jobs <= 1:
+        results = [_validate_one(f, kind, template_obj, spec, fail_fast) for f in files]
+    else:
+        results = _validate_pool(files, kind, template_obj, spec, jobs, fail_fast)
+    if duplicates is not None:
+        for result in results:
+            if result.ok and result.record_id is not None:
+                dup = duplicate_error(duplicates, kind, {ID_FIELDS[kind]: result.record_id})
+                if dup is not None:
+                    result.ok, result.error, result.details = False, str(dup), dup.to_dict()
+    return results
+
+
+def _validate_pool(
+    files: list[str],
+    kind: str,
+    template_obj: Any,
+    spec: Optional[str],
+    jobs: int,
+    fail_fast: bool,
+) -> list[FileResult]:
+    # Large chunks keep IPC overhead low; a few chunks per worker keep the
+    # load balanced when file sizes differ.
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(kind, template_obj, spec, fail_fast),
+    ) as pool:
+        return list(pool.map(_validate_in_worker, files, chunksize=chunksize))
+
+
+def summarize(results: Iterable[FileResult]) -> BatchSummary:
+    summary = BatchSummary()
+    for result in results:
+        summary.total += 1
+        if result.ok:
+            summary.valid += 1
+        else:
+            summary.invalid += 1
+    return summary
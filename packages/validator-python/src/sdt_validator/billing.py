@@ -0,0 +1,220 @@
+"""
+Streaming rollups of billing.schema.json records.
+
+BillingRollup validates and folds records one at a time into per-user and
+per-(user, resource.project_id) totals, split by currency and transaction
+type. Replayed transaction_ids are dropped using a Bloom filter, so memory
+stays bounded by the expected number of transactions rather than the input
+size (at the cost of dropping a new transaction with probability fp_rate).
+
+Sums are exact (balance deltas are accumulated in aggregate.ExactSum), so
+rollups of partial inputs merge to the same sums as one pass over all of
+them. merge() cannot remove a transaction counted in both partials, so
+partials built independently must not share replays; rollup_files() avoids
+this by validating files in workers and deduplicating and summing in the
+parent, so its result does not depend on `jobs`.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterable, Mapping, Optional
+
+from .aggregate import ExactSum
+from .dedupe import BloomFilter
+from .stream import StreamSummary, iter_validate_ndjson
+from .validator import validate_billing
+
+
+_TYPES = ("credit_spend", "credit_grant", "refund")
+
+
+class BalanceTotals:
+    """Exact per-type sums and counts of balance_delta."""
+
+    __slots__ = ("count", "_sums")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._sums = {txn_type: ExactSum() for txn_type in _TYPES}
+
+    def add(self, txn_type: str, delta: Any) -> None:
+        self.count += 1
+        total = self._sums.get(txn_type)
+        if total is None:
+            total = self._sums[txn_type] = ExactSum()
+        total.add(delta)
+
+    def merge(self, other: BalanceTotals) -> None:
+        self.count += other.count
+        for txn_type, total in other._sums.items():
+            self._sums.setdefault(txn_type, ExactSum()).merge(total)
+
+    @property
+    def _floats(self) -> bool:
+        return any(total.floats for total in self._sums.values())
+
+    @property
+    def net(self) -> Any:
+        net = ExactSum()
+        for total in self._sums.values():
+            net.merge(total)
+        return net.value(self._floats)
+
+    def by_type(self) -> dict[str, Any]:
+        floats = self._floats
+        return {txn_type: total.value(floats) for txn_type, total in self._sums.items()}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"count": self.count, "net": self.net, **self.by_type()}
+
+
+@dataclass
+class BillingRollup:
+    """
+    Per-user and per-(user, project) billing totals built in one pass.
+
+    expected_transactions and fp_rate size the duplicate filter; partial
+    rollups to be merged must use the same values.
+    """
+    expected_transactions: int = 1_000_000
+    fp_rate: float = 1e-7
+    users: dict[tuple[str, str], BalanceTotals] = field(default_factory=dict)
+    projects: dict[tuple[str, str, str], BalanceTotals] = field(default_factory=dict)
+    duplicates: int = 0
+    summary: StreamSummary = field(default_factory=StreamSummary)
+    seen: Optional[BloomFilter] = None
+
+    def __post_init__(self) -> None:
+        if self.seen is None:
+            self.seen = BloomFilter(self.expected_transactions, self.fp_rate)
+
+    def add(self, record: Mapping[str, Any], *, validate: bool = True) -> bool:
+        """
+        Fold one billing record in. Returns False for a replayed transaction_id.
+
+        Raises ValidationError if validate is set and the record is invalid.
+        """
+        if validate:
+            validate_billing(record)
+        return self._fold(_entry(record))
+
+    def _fold(self, entry: tuple) -> bool:
+        transaction_id, user_id, currency, txn_type, delta, project_id = entry
+        if not self.seen.add(transaction_id):
+            self.duplicates += 1
+            return False
+        totals = self.users.get((user_id, currency))
+        if totals is None:
+            totals = self.users[(user_id, currency)] = BalanceTotals()
+        totals.add(txn_type, delta)
+        if project_id is not None:
+            key = (user_id, project_id, currency)
+            totals = self.projects.get(key)
+            if totals is None:
+                totals = self.projects[key] = BalanceTotals()
+            totals.add(txn_type, delta)
+        return True
+
+    def merge(self, other: BillingRollup) -> None:
+        """Fold a partial rollup (e.g. from another worker) into this one."""
+        self.seen.merge(other.seen)
+        for target, source in ((self.users, other.users), (self.projects, other.projects)):
+            for key, totals in source.items():
+                mine = target.get(key)
+                if mine is None:
+                    target[key] = mine = BalanceTotals()
+                mine.merge(totals)
+        self.duplicates += other.duplicates
+        self.summary.total += other.summary.total
+        self.summary.valid += other.summary.valid
+        self.summary.invalid += other.summary.invalid
+
+    def user_totals(self, user_id: str, currency: str = "credit") -> BalanceTotals:
+        return self.users.get((user_id, currency)) or BalanceTotals()
+
+    def project_totals(
+        self, user_id: str, project_id: str, currency: str = "credit"
+    ) -> BalanceTotals:
+        return self.projects.get((user_id, project_id, currency)) or BalanceTotals()
+
+
+def _entry(record: Mapping[str, Any]) -> tuple:
+    # The fields a rollup folds in, small enough to send back from a worker.
+    return (
+        record["transaction_id"],
+        record["user_id"],
+        record.get("currency", "credit"),
+        record["type"],
+        record["balance_delta"],
+        (record.get("resource") or {}).get("project_id"),
+    )
+
+
+def rollup_ndjson(
+    source: str | Path | IO[str],
+    *,
+    spec_dir: Optional[str | Path] = None,
+    rollup: Optional[BillingRollup] = None,
+    expected_transactions: int = 1_000_000,
+    fp_rate: float = 1e-7,
+) -> BillingRollup:
+    """
+    Validate and roll up an NDJSON file of billing records in a single pass.
+
+    Invalid lines are counted in rollup.summary and skipped.
+    """
+    if rollup is None:
+        rollup = BillingRollup(expected_transactions, fp_rate)
+    for result in iter_validate_ndjson(source, "billing", spec_dir=spec_dir, keep_records=True):
+        rollup.summary.add(result)
+        if result.ok:
+            rollup.add(result.record, validate=False)
+    return rollup
+
+
+def _validate_file(
+    path: str, spec_dir: Optional[str]
+) -> tuple[StreamSummary, list[tuple]]:
+    summary = StreamSummary()
+    entries: list[tuple] = []
+    for result in iter_validate_ndjson(path, "billing", spec_dir=spec_dir, keep_records=True):
+        summary.add(result)
+        if result.ok:
+            entries.append(_entry(result.record))
+    return summary, entries
+
+
+def rollup_files(
+    paths: Iterable[str | Path],
+    *,
+    spec_dir: Optional[str | Path] = None,
+    jobs: int = 1,
+    expected_transactions: int = 1_000_000,
+    fp_rate: float = 1e-7,
+) -> BillingRollup:
+    """
+    Roll up several NDJSON files as one pass over them in file order.
+
+    With jobs > 1 files are validated in worker processes, which send back
+    the fields of each valid record; replays are dropped and totals summed
+    in this process, so a transaction_id replayed in another file is still
+    counted once.
+    """
+    paths = [str(p) for p in paths]
+    spec = str(spec_dir) if spec_dir is not None else None
+    total = BillingRollup(expected_transactions, fp_rate)
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            rollup_ndjson(path, spec_dir=spec_dir, rollup=total)
+        return total
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for summary, entries in pool.map(_validate_file, paths, [spec] * len(paths)):
+            total.summary.total += summary.total
+            total.summary.valid += summary.valid
+            total.summary.invalid += summary.invalid
+            for entry in entries:
+                total._fold(entry)
+    return total
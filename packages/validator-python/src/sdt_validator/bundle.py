@@ -0,0 +1,192 @@
+"""
+Build and load the schema bundle shipped inside the package.
+
+The bundle is one JSON file holding every spec schema with its `$ref`s
+inlined (so no registry crawl is needed to use it) and the generated
+fast-path check source for each (see codegen.py). The validator reads it
+once, on first use, when neither spec_dir nor SDT_SPEC_DIR is given and
+./spec does not hold the schema, which makes an installed package work from
+any directory and lets a valid object be checked without importing
+jsonschema at all.
+
+Regenerate it after editing spec/:
+
+    sdt-bundle --spec-dir spec
+    sdt-bundle --check          # exit 1 if the shipped bundle is stale
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urljoin
+
+from .codegen import GENERATOR_VERSION, UnsupportedSchema, generate_source
+
+
+BUNDLE_VERSION = 1
+BUNDLE_PATH = Path(__file__).parent / "_bundle" / "schemas.json"
+
+# Keywords whose value is a map of names to subschemas, a single subschema,
+# or a list of subschemas. Every other keyword's value is data (enum, const,
+# default, ...) and is copied unchanged.
+_SCHEMA_MAPS = ("properties", "patternProperties", "dependentSchemas")
+_SCHEMA_VALUES = (
+    "items", "not", "if", "then", "else", "contains", "additionalProperties",
+    "propertyNames", "unevaluatedItems", "unevaluatedProperties",
+)
+_SCHEMA_LISTS = ("allOf", "anyOf", "oneOf", "prefixItems")
+
+
+class BundleError(ValueError):
+    """Raised when a schema cannot be inlined (e.g. a recursive $ref)."""
+
+
+def _inline(schema: Any, resolver: Any, base: str, seen: tuple[str, ...]) -> Any:
+    if not isinstance(schema, dict):
+        return schema
+    out: dict[str, Any] = {}
+    for key, value in schema.items():
+        if key in ("$ref", "$defs"):
+            continue
+        if key in _SCHEMA_MAPS:
+            out[key] = {name: _inline(s, resolver, base, seen) for name, s in value.items()}
+        elif key in _SCHEMA_VALUES:
+            out[key] = _inline(value, resolver, base, seen)
+        elif key in _SCHEMA_LISTS:
+            out[key] = [_inline(s, resolver, base, seen) for s in value]
+        else:
+            out[key] = value
+    if "$ref" not in schema:
+        return out
+
+    ref = schema["$ref"]
+    target = urljoin(base, ref)
+    if target in seen:
+        raise BundleError(f"Recursive $ref cannot be inlined: {' -> '.join(seen + (target,))}")
+    resolved = resolver.lookup(ref)
+    target_base = target.split("#", 1)[0]
+    inlined = _inline(resolved.contents, resolved.resolver, target_base, seen + (target,))
+    if isinstance(inlined, dict):
+        inlined = {k: v for k, v in inlined.items() if k not in ("$id", "$schema")}
+    if not out:
+        return inlined
+    if isinstance(inlined, dict) and not inlined.keys() & out.keys():
+        return {**inlined, **out}
+    return {"allOf": [inlined], **out}
+
+
+def spec_digest(spec_dir: Path) -> str:
+    """sha256 over the names and bytes of the spec's *.json files."""
+    h = hashlib.sha256()
+    for path in sorted(spec_dir.glob("*.json")):
+        h.update(path.name.encode("utf-8") + b"\0")
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def build_bundle(spec_dir: str | Path) -> dict[str, Any]:
+    """Inline every *.schema.json in spec_dir and generate its fast-path check."""
+    from .validator import _build_registry  # the validator imports this module
+
+    spec_path = Path(spec_dir).expanduser().resolve()
+    registry = _build_registry(spec_path)
+    schemas: dict[str, Any] = {}
+    checks: dict[str, str] = {}
+    for path in sorted(spec_path.glob("*.schema.json")):
+        with path.open("r", encoding="utf-8") as f:
+            schema = json.load(f)
+        base = schema.get("$id") or path.name
+        schemas[path.name] = _inline(schema, registry.resolver(base_uri=base), base, ())
+        try:
+            checks[path.name] = generate_source(schema, registry, label=path.name)
+        except UnsupportedSchema:
+            pass
+    return {
+        "bundle_version": BUNDLE_VERSION,
+        "generator_version": GENERATOR_VERSION,
+        "spec_digest": spec_digest(spec_path),
+        "schemas": schemas,
+        "checks": checks,
+    }
+
+
+def write_bundle(spec_dir: str | Path, path: str | Path = BUNDLE_PATH) -> dict[str, Any]:
+    bundle = build_bundle(spec_dir)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps(bundle, sort_keys=True, separators=(",", ":"), ensure_ascii=False) + "\n",
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+    return bundle
+
+
+@lru_cache(maxsize=1)
+def load_bundle(path: Path = BUNDLE_PATH) -> Optional[dict[str, Any]]:
+    """The bundle at path, or None if it is missing or from another bundle version."""
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            bundle = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if not isinstance(bundle, dict) or bundle.get("bundle_version") != BUNDLE_VERSION:
+        return None
+    return bundle
+
+
+def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(
+        prog="sdt-bundle",
+        description="Write the refs-inlined schema bundle used when no spec directory is given.",
+    )
+    p.add_argument(
+        "--spec-dir",
+        default=None,
+        help="Spec directory to bundle (default: SDT_SPEC_DIR, else ./spec).",
+    )
+    p.add_argument(
+        "--output",
+        "-o",
+        default=None,
+        help=f"Bundle file to write (default: the packaged {BUNDLE_PATH.name}).",
+    )
+    p.add_argument(
+        "--check",
+        action="store_true",
+        help="Do not write; exit 1 if the bundle differs from the spec directory.",
+    )
+    args = p.parse_args(argv)
+
+    from .validator import _spec_dir_for
+
+    spec_dir = _spec_dir_for(args.spec_dir or os.getenv("SDT_SPEC_DIR"), os.getcwd())
+    if not spec_dir.is_dir():
+        print(f"Spec directory not found: {spec_dir}", file=sys.stderr)
+        raise SystemExit(2)
+    output = Path(args.output) if args.output else BUNDLE_PATH
+    try:
+        if args.check:
+            load_bundle.cache_clear()
+            if load_bundle(output) != build_bundle(spec_dir):
+                print(f"{output} is out of date with {spec_dir}; run sdt-bundle.", file=sys.stderr)
+                raise SystemExit(1)
+            print(f"{output} is up to date.")
+            return
+        bundle = write_bundle(spec_dir, output)
+    except BundleError as e:
+        print(str(e), file=sys.stderr)
+        raise SystemExit(1)
+    print(f"Wrote {len(bundle['schemas'])} schemas to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,22 @@
 from __future__ import annotations
 
 import argparse
+import glob
+import json
+import os
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .validator import (
-    ValidationError,
-    load_json_file,
-    validate_rule,
-    validate_template,
-    validate_agent,
-    validate_project,
-    validate_execution,
-    validate_event,
-    validate_billing,
-)
+from .kinds import KINDS
+from .server import DaemonClient, DaemonError, connect, serve
+
+# The validator and the batch/stream modules are imported only when the run
+# is not handed to a daemon, so a client run stays cheap to start.
+if TYPE_CHECKING:
+    from .batch import BatchSummary, FileResult
+    from .dedupe import DuplicateDetector
+    from .stream import StreamSummary
 
 
 def _build_parser() -> argparse.ArgumentParser:
@@ -24,12 +26,15 @@ def _build_parser() -> argparse.ArgumentParser:
     )
     p.add_argument(
         "kind",
-        choices=["template", "rule", "agent", "project", "execution", "event", "billing"],
+        nargs="?",
+        choices=list(KINDS),
         help="Type of JSON to validate.",
     )
     p.add_argument(
         "json_path",
-        help="Path to JSON file to validate.",
+        nargs="*",
+        help="Path to JSON file to validate ('-' reads stdin with --ndjson). "
+             "Several files, directories or glob patterns run a batch validation.",
     )
     p.add_argument(
         "--spec-dir",
@@ -42,49 +47,309 @@ def _build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Path to template JSON file for cross-reference validation (rule or agent).",
     )
+    p.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Treat the input as newline-delimited JSON and validate it record by record "
+             "in constant memory.",
+    )
+    p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Number of worker processes for batch validation (default: CPU count).",
+    )
+    p.add_argument(
+        "--format",
+        choices=("text", "json"),
+        default="text",
+        help="Output format. 'json' prints one JSON object per line to stdout: one per "
+             "invalid record or file (each input for a single file), then a summary.",
+    )
+    p.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Report only the first schema error of each record instead of all of them.",
+    )
+    p.add_argument(
+        "--dedupe",
+        metavar="STATE_FILE",
+        default=None,
+        help="Report records whose id was already seen as invalid (batch and --ndjson). "
+             "Seen ids are loaded from and saved back to STATE_FILE.",
+    )
+    p.add_argument(
+        "--dedupe-exact-limit",
+        type=int,
+        default=None,
+        help="Ids tracked exactly before switching to a Bloom filter (default: 1000000). "
+             "Like the other --dedupe-* options it is fixed when STATE_FILE is created.",
+    )
+    p.add_argument(
+        "--dedupe-capacity",
+        type=int,
+        default=None,
+        help="Number of ids the Bloom filter is sized for (default: 100000000).",
+    )
+    p.add_argument(
+        "--dedupe-fp-rate",
+        type=float,
+        default=None,
+        help="Bloom filter false-positive rate (default: 0.001).",
+    )
+    p.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a validation daemon on --socket that keeps the compiled schemas warm. "
+             "Later sdt-validate runs hand single-file and batch validations to it.",
+    )
+    p.add_argument(
+        "--socket",
+        default=None,
+        help="Daemon socket path (default: SDT_SOCKET, else sdt-validate.sock in "
+             "XDG_RUNTIME_DIR or the temp directory).",
+    )
+    p.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always validate in this process, even if a daemon is running.",
+    )
     return p
 
 
+def _is_batch(args: argparse.Namespace) -> bool:
+    if len(args.json_path) > 1 or args.jobs is not None:
+        return True
+    path = args.json_path[0]
+    return Path(path).is_dir() or glob.has_magic(path)
+
+
+def _open_dedupe(args: argparse.Namespace) -> DuplicateDetector | None:
+    if not args.dedupe:
+        return None
+    from .dedupe import DuplicateDetector
+
+    options = {
+        name: value
+        for name, value in (
+            ("exact_limit", args.dedupe_exact_limit),
+            ("capacity", args.dedupe_capacity),
+            ("fp_rate", args.dedupe_fp_rate),
+        )
+        if value is not None
+    }
+    try:
+        return DuplicateDetector.open(args.dedupe, **options)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        raise SystemExit(2)
+
+
+def _emit(obj: dict) -> None:
+    print(json.dumps(obj, ensure_ascii=False, default=str))
+
+
+def _emit_summary(summary: StreamSummary | BatchSummary) -> None:
+    _emit({"summary": {"total": summary.total, "valid": summary.valid, "invalid": summary.invalid}})
+
+
+def _expand(args: argparse.Namespace) -> list[Path]:
+    from .batch import expand_paths
+
+    paths = expand_paths(args.json_path)
+    if not paths:
+        print("No files matched.", file=sys.stderr)
+        raise SystemExit(2)
+    return paths
+
+
+def _run_batch(args: argparse.Namespace, template_obj: object) -> None:
+    from .batch import validate_files
+
+    paths = _expand(args)
+    duplicates = _open_dedupe(args)
+    results = validate_files(
+        paths,
+        args.kind,
+        template_obj=template_obj,
+        spec_dir=args.spec_dir,
+        jobs=args.jobs,
+        duplicates=duplicates,
+        fail_fast=args.fail_fast,
+    )
+    if duplicates is not None:
+        duplicates.save(args.dedupe)
+    _report_batch(args, results)
+
+
+def _report_batch(args: argparse.Namespace, results: list[FileResult]) -> None:
+    from .batch import summarize
+
+    as_json = args.format == "json"
+    for result in results:
+        if result.ok:
+            continue
+        if as_json:
+            error = result.details or {"message": result.error, "errors": []}
+            _emit({"path": result.path, "ok": False, "error": error})
+        else:
+            print(f"{result.path}: {result.error}", file=sys.stderr)
+    summary = summarize(results)
+    if as_json:
+        _emit_summary(summary)
+    else:
+        print(summary)
+    if summary.invalid:
+        raise SystemExit(1)
+
+
+def _run_ndjson(args: argparse.Namespace, template_obj: object) -> None:
+    from .stream import StreamSummary, iter_validate_ndjson
+
+    summary = StreamSummary()
+    duplicates = _open_dedupe(args)
+    for result in iter_validate_ndjson(
+        args.json_path[0],
+        args.kind,
+        template_obj=template_obj,
+        spec_dir=args.spec_dir,
+        duplicates=duplicates,
+        fail_fast=args.fail_fast,
+    ):
+        summary.add(result)
+        if result.ok:
+            continue
+        if args.format == "json":
+            _emit({"line": result.line, "ok": False, "error": result.error.to_dict()})
+        else:
+            print(f"line {result.line}: {result.error}", file=sys.stderr)
+    if duplicates is not None:
+        duplicates.save(args.dedupe)
+    if args.format == "json":
+        _emit_summary(summary)
+    else:
+        print(summary)
+    if summary.invalid:
+        raise SystemExit(1)
+
+
+def _connect(args: argparse.Namespace) -> DaemonClient | None:
+    # NDJSON streams, dedupe state and explicit --jobs pools stay in-process.
+    if args.no_daemon or args.ndjson or args.dedupe or args.jobs is not None:
+        return None
+    return connect(args.socket)
+
+
+def _run_client(
+    args: argparse.Namespace, client: DaemonClient, batch: bool, template_path: Path | None
+) -> None:
+    options = {
+        "template_path": template_path,
+        "spec_dir": args.spec_dir or os.getenv("SDT_SPEC_DIR"),
+        "fail_fast": args.fail_fast,
+    }
+    if batch:
+        from .batch import FileResult
+
+        paths = _expand(args)
+        responses = client.validate_paths(args.kind, paths, **options)
+        _report_batch(args, [
+            FileResult(str(path), r["ok"], r.get("text"), details=r.get("error"))
+            for path, r in zip(paths, responses)
+        ])
+        return
+
+    path = str(Path(args.json_path[0]))
+    (result,) = client.validate_paths(args.kind, [path], **options)
+    if args.format == "json":
+        _emit({"path": path, **{k: result[k] for k in ("ok", "error") if k in result}})
+    elif result["ok"]:
+        print("OK")
+    else:
+        print(result["text"], file=sys.stderr)
+    if not result["ok"]:
+        raise SystemExit(3 if result.get("unexpected") else 1)
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = _build_parser()
     args = parser.parse_args(argv)
 
-    json_path = Path(args.json_path)
-    if not json_path.exists():
+    if args.serve:
+        if args.kind or args.json_path:
+            parser.error("--serve takes no kind or paths")
+        try:
+            serve(args.socket, spec_dir=args.spec_dir)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            raise SystemExit(2)
+        return
+    if args.kind is None or not args.json_path:
+        parser.error("the following arguments are required: kind, json_path")
+
+    batch = _is_batch(args)
+    if batch and args.ndjson:
+        parser.error("--ndjson takes a single input")
+    if args.dedupe and not (batch or args.ndjson):
+        parser.error("--dedupe applies to batch and --ndjson validation")
+
+    json_path = Path(args.json_path[0])
+    if not batch and not (args.ndjson and args.json_path[0] == "-") and not json_path.exists():
         print(f"File not found: {json_path}", file=sys.stderr)
         raise SystemExit(2)
 
+    template_path = Path(args.template) if args.template else None
+    if template_path is not None and not template_path.exists():
+        print(f"Template file not found: {template_path}", file=sys.stderr)
+        raise SystemExit(2)
+
+    client = _connect(args)
+    if client is not None:
+        with client:
+            try:
+                _run_client(args, client, batch, template_path)
+                return
+            except (DaemonError, OSError, ValueError):
+                pass  # the daemon could not serve this run; validate in-process
+
+    from .validator import ValidationError, load_json_file, validate_kind
+
     try:
+        template_obj = load_json_file(template_path) if template_path else None
+
+        if args.ndjson:
+            _run_ndjson(args, template_obj)
+            return
+        if batch:
+            _run_batch(args, template_obj)
+            return
+
         obj = load_json_file(json_path)
-        template_obj = None
-        if args.template:
-            template_path = Path(args.template)
-            if not template_path.exists():
-                print(f"Template file not found: {template_path}", file=sys.stderr)
-                raise SystemExit(2)
-            template_obj = load_json_file(template_path)
-
-        if args.kind == "template":
-            validate_template(obj, spec_dir=args.spec_dir)
-        elif args.kind == "rule":
-            validate_rule(obj, template_obj=template_obj, spec_dir=args.spec_dir)
-        elif args.kind == "agent":
-            validate_agent(obj, template_obj=template_obj, spec_dir=args.spec_dir)
-        elif args.kind == "project":
-            validate_project(obj, spec_dir=args.spec_dir)
-        elif args.kind == "execution":
-            validate_execution(obj, spec_dir=args.spec_dir)
-        elif args.kind == "event":
-            validate_event(obj, spec_dir=args.spec_dir)
-        else:  # billing
-            validate_billing(obj, spec_dir=args.spec_dir)
+        validate_kind(
+            args.kind,
+            obj,
+            template_obj=template_obj,
+            spec_dir=args.spec_dir,
+            fail_fast=args.fail_fast,
+        )
 
-        print("OK")
+        if args.format == "json":
+            _emit({"path": str(json_path), "ok": True})
+        else:
+            print("OK")
     except ValidationError as e:
-        print(str(e), file=sys.stderr)
+        if args.format == "json":
+            _emit({"path": str(json_path), "ok": False, "error": e.to_dict()})
+        else:
+            print(str(e), file=sys.stderr)
         raise SystemExit(1)
     except Exception as e:
-        print(f"Unexpected error: {e}", file=sys.stderr)
+        if args.format == "json":
+            _emit({"path": str(json_path), "ok": False,
+                   "error": {"message": f"Unexpected error: {e}", "errors": []}})
+        else:
+            print(f"Unexpected error: {e}", file=sys.stderr)
         raise SystemExit(3)
 
 
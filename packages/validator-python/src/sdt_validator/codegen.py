@@ -0,0 +1,331 @@
+"""
+Generate specialized Python check functions from the spec schemas.
+
+The generated function only answers "is this object valid?". It is used as a
+fast path in front of the generic Draft202012Validator: valid objects return
+immediately, invalid ones are re-run through the generic validator so error
+messages stay exactly the same as before.
+
+Only the keywords used by the SDT spec are supported. For any other keyword
+generation is abandoned and the generic validator is used for that schema.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+from urllib.parse import urljoin
+
+from .timeutil import is_rfc3339
+
+if TYPE_CHECKING:
+    from referencing import Registry
+
+
+# Bump when the generated code changes so stale on-disk entries are ignored.
+GENERATOR_VERSION = "2"
+
+_ANNOTATION_KEYWORDS = {
+    "$schema",
+    "$id",
+    "$defs",
+    "$comment",
+    "title",
+    "description",
+    "default",
+    "examples",
+}
+
+# Formats asserted by generated code (and by validator._format_checker); any
+# other format is an annotation.
+_FORMAT_CHECKS = {"date-time": "_is_rfc3339"}
+
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": (
+        "((isinstance({v}, int) and not isinstance({v}, bool))"
+        " or (isinstance({v}, float) and {v}.is_integer()))"
+    ),
+}
+
+
+class UnsupportedSchema(Exception):
+    """Raised when a schema uses a keyword the generator does not handle."""
+
+
+def _equal(one: Any, two: Any) -> bool:
+    # Mirrors JSON Schema equality: booleans never equal numbers.
+    if isinstance(one, bool) or isinstance(two, bool):
+        return type(one) is type(two) and one == two
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(_equal(one[k], two[k]) for k in one)
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(_equal(a, b) for a, b in zip(one, two))
+    if isinstance(one, (dict, list)) or isinstance(two, (dict, list)):
+        return False
+    return one == two
+
+
+class _Generator:
+    def __init__(self, registry: Registry) -> None:
+        self.registry = registry
+        self.lines: list[str] = []
+        self.constants: list[str] = []
+        self.ref_functions: dict[str, str] = {}
+        self.counter = 0
+
+    def _name(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def _constant(self, value: str) -> str:
+        name = self._name("_C")
+        self.constants.append(f"{name} = {value}")
+        return name
+
+    def function(self, name: str, schema: Any, base_uri: str, *, root: bool = False) -> None:
+        if not root and isinstance(schema, dict) and "$id" in schema:
+            raise UnsupportedSchema("nested $id is not supported")
+        body: list[str] = []
+        self._emit_schema(schema, "v0", base_uri, body, 1)
+        self.lines.append(f"def {name}(v0):")
+        self.lines.extend(body)
+        self.lines.append("    return True")
+        self.lines.append("")
+
+    def _ref_function(self, ref: str, base_uri: str) -> str:
+        uri = urljoin(base_uri, ref)
+        name = self.ref_functions.get(uri)
+        if name is not None:
+            return name
+        name = self._name("_ref")
+        self.ref_functions[uri] = name
+        resolved = self.registry.resolver(base_uri=base_uri).lookup(ref)
+        target_base = uri.split("#", 1)[0]
+        self.function(name, resolved.contents, target_base, root=True)
+        return name
+
+    def _emit_schema(
+        self, schema: Any, v: str, base_uri: str, out: list[str], depth: int
+    ) -> None:
+        pad = "    " * depth
+        if schema is True:
+            return
+        if schema is False:
+            out.append(f"{pad}return False")
+            return
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(f"schema must be an object or boolean, got {schema!r}")
+
+        for keyword in schema:
+            if keyword in _ANNOTATION_KEYWORDS:
+                continue
+            if keyword not in _HANDLED_KEYWORDS:
+                raise UnsupportedSchema(f"unsupported keyword {keyword!r}")
+        if "$id" in schema and depth > 1:
+            raise UnsupportedSchema("nested $id is not supported")
+
+        if "$ref" in schema:
+            func = self._ref_function(schema["$ref"], base_uri)
+            out.append(f"{pad}if not {func}({v}): return False")
+
+        known_type = None
+        if "type" in schema:
+            types = schema["type"]
+            if isinstance(types, str):
+                types = [types]
+                known_type = schema["type"]
+            checks = []
+            for t in types:
+                if t not in _TYPE_CHECKS:
+                    raise UnsupportedSchema(f"unsupported type {t!r}")
+                checks.append(_TYPE_CHECKS[t].format(v=v))
+            out.append(f"{pad}if not ({' or '.join(checks)}): return False")
+
+        def guard(type_name: str) -> str:
+            return "" if known_type == type_name else f"{_TYPE_CHECKS[type_name].format(v=v)} and "
+
+        if "const" in schema:
+            const = schema["const"]
+            if isinstance(const, str):
+                out.append(f"{pad}if {v} != {const!r}: return False")
+            else:
+                name = self._constant(repr(const))
+                out.append(f"{pad}if not _equal({v}, {name}): return False")
+
+        if "enum" in schema:
+            values = schema["enum"]
+            if all(isinstance(e, str) for e in values):
+                name = self._constant(f"frozenset({sorted(values)!r})")
+                out.append(f"{pad}if not ({guard('string')}{v} in {name}): return False")
+            else:
+                name = self._constant(repr(values))
+                out.append(f"{pad}if not any(_equal({v}, e) for e in {name}): return False")
+
+        string_guard = guard("string")
+        if "minLength" in schema:
+            out.append(f"{pad}if {string_guard}len({v}) < {int(schema['minLength'])}: return False")
+        if "maxLength" in schema:
+            out.append(f"{pad}if {string_guard}len({v}) > {int(schema['maxLength'])}: return False")
+        if "pattern" in schema:
+            name = self._constant(f"_re.compile({schema['pattern']!r})")
+            out.append(f"{pad}if {string_guard}not {name}.search({v}): return False")
+        if schema.get("format") in _FORMAT_CHECKS:
+            func = _FORMAT_CHECKS[schema["format"]]
+            out.append(f"{pad}if {string_guard}not {func}({v}): return False")
+
+        number_guard = guard("number") if known_type != "integer" else ""
+        if "minimum" in schema:
+            out.append(f"{pad}if {number_guard}{v} < {schema['minimum']!r}: return False")
+        if "maximum" in schema:
+            out.append(f"{pad}if {number_guard}{v} > {schema['maximum']!r}: return False")
+
+        array_guard = guard("array")
+        if "minItems" in schema:
+            out.append(f"{pad}if {array_guard}len({v}) < {int(schema['minItems'])}: return False")
+        if "maxItems" in schema:
+            out.append(f"{pad}if {array_guard}len({v}) > {int(schema['maxItems'])}: return False")
+        if "items" in schema:
+            item = self._name("v")
+            inner: list[str] = []
+            self._emit_schema(schema["items"], item, base_uri, inner, depth + 2)
+            if inner:
+                out.append(f"{pad}if {array_guard}True:")
+                out.append(f"{pad}    for {item} in {v}:")
+                out.extend(inner)
+
+        object_guard = guard("object")
+        if "required" in schema and schema["required"]:
+            checks = " and ".join(f"{key!r} in {v}" for key in schema["required"])
+            out.append(f"{pad}if {object_guard}not ({checks}): return False")
+        if "properties" in schema:
+            inner = []
+            for key, subschema in schema["properties"].items():
+                prop = self._name("v")
+                prop_lines: list[str] = []
+                self._emit_schema(subschema, prop, base_uri, prop_lines, depth + 2)
+                if prop_lines:
+                    inner.append(f"{pad}    if {key!r} in {v}:")
+                    inner.append(f"{pad}        {prop} = {v}[{key!r}]")
+                    inner.extend(prop_lines)
+            if inner:
+                out.append(f"{pad}if {object_guard}True:")
+                out.extend(inner)
+
+        for keyword in ("oneOf", "anyOf", "allOf"):
+            if keyword not in schema:
+                continue
+            names = []
+            for subschema in schema[keyword]:
+                name = self._name("_s")
+                self.function(name, subschema, base_uri)
+                names.append(f"{name}({v})")
+            if keyword == "oneOf":
+                out.append(f"{pad}if ({' + '.join(names)}) != 1: return False")
+            elif keyword == "anyOf":
+                out.append(f"{pad}if not ({' or '.join(names)}): return False")
+            else:
+                out.append(f"{pad}if not ({' and '.join(names)}): return False")
+
+
+_HANDLED_KEYWORDS = {
+    "$ref",
+    "type",
+    "const",
+    "enum",
+    "minLength",
+    "maxLength",
+    "pattern",
+    "format",
+    "minimum",
+    "maximum",
+    "minItems",
+    "maxItems",
+    "items",
+    "required",
+    "properties",
+    "oneOf",
+    "anyOf",
+    "allOf",
+}
+
+
+def generate_source(schema: Dict[str, Any], registry: Registry, *, label: str = "schema") -> str:
+    """
+    Return Python source defining check(obj) -> bool for the given schema.
+
+    Raises UnsupportedSchema if the schema uses keywords the generator does
+    not handle.
+    """
+    gen = _Generator(registry)
+    gen.function("check", schema, schema.get("$id", ""), root=True)
+    header = [
+        f"# Generated by sdt_validator.codegen from {label}. Do not edit.",
+        "import re as _re",
+        "",
+    ]
+    return "\n".join(header + gen.constants + [""] + gen.lines) + "\n"
+
+
+def load_source(source: str, *, filename: str = "<sdt-codegen>") -> Callable[[Any], bool]:
+    namespace: Dict[str, Any] = {"_equal": _equal, "_is_rfc3339": is_rfc3339}
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace["check"]
+
+
+def _cache_key(schema: Dict[str, Any], registry: Registry) -> str:
+    h = hashlib.sha256(GENERATOR_VERSION.encode("utf-8"))
+    h.update(json.dumps(schema, sort_keys=True).encode("utf-8"))
+    for uri in sorted(registry):
+        h.update(uri.encode("utf-8"))
+        h.update(json.dumps(registry.contents(uri), sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:24]
+
+
+def default_cache_dir() -> Optional[Path]:
+    """On-disk cache location from SDT_CACHE_DIR, or None to keep it in memory."""
+    env = os.getenv("SDT_CACHE_DIR")
+    return Path(env).expanduser() if env else None
+
+
+def compile_check(
+    schema: Dict[str, Any],
+    registry: Registry,
+    *,
+    label: str = "schema",
+    cache_dir: Optional[Path] = None,
+) -> Optional[Callable[[Any], bool]]:
+    """
+    Build the specialized check function for a schema.
+
+    Generated source is cached in cache_dir (if given) keyed by a hash of the
+    schema and every resource in the registry. Returns None if the schema is
+    not supported by the generator.
+    """
+    path = None
+    if cache_dir is not None:
+        name = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+        path = cache_dir / f"{name}_{_cache_key(schema, registry)}.py"
+        if path.exists():
+            return load_source(path.read_text(encoding="utf-8"), filename=str(path))
+
+    try:
+        source = generate_source(schema, registry, label=label)
+    except UnsupportedSchema:
+        return None
+
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(source, encoding="utf-8")
+        os.replace(tmp, path)
+    return load_source(source, filename=str(path) if path else f"<sdt-codegen {label}>")
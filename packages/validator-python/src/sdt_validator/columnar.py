@@ -0,0 +1,215 @@
+"""
+Columnar (NumPy) backend for metric evaluation.
+
+A ColumnBatch converts a batch of records into one set of typed arrays per
+field, built once and shared by every metric evaluated over the batch.
+Aggregates over bare fields and over comparisons of a field with a literal
+(combined with and/or/not) are evaluated as vectorized operations; any other
+aggregate falls back to the pure-Python path, so results are identical to
+metrics.evaluate_metrics(..., backend="python"). Columns holding an int
+beyond 2**53, which float64 cannot represent, are compared and ranked by
+the Python path as well.
+
+NumPy is an optional dependency: pip install sdt-template-validator[numpy].
+"""
+
+from __future__ import annotations
+
+from operator import methodcaller
+from typing import Any, Iterable, Mapping, Sequence
+
+import numpy as np
+
+from .metrics import (
+    Aggregate,
+    Binary,
+    CompiledMetric,
+    Field,
+    Literal,
+    Unary,
+    _COMPARISON_OPS,
+    compile_template_metrics,
+    exact_sum,
+    is_predicate,
+)
+
+
+_NoneType = type(None)
+
+# Every int of at most this magnitude is exact as a float64.
+_EXACT_INT = 2 ** 53
+
+
+def _inexact(value: Any) -> bool:
+    return type(value) is int and abs(value) > _EXACT_INT
+
+
+class Column:
+    """Typed views of one field across a batch of records."""
+
+    __slots__ = (
+        "values", "present", "is_bool", "is_float", "numeric", "num", "exact", "is_str"
+    )
+
+    def __init__(self, values: Sequence[Any]) -> None:
+        n = len(values)
+        obj = np.empty(n, dtype=object)
+        obj[:] = values
+        types = np.fromiter(map(type, values), dtype=object, count=n)
+        self.values = obj
+        self.present = types != _NoneType
+        self.is_bool = types == bool
+        self.is_float = types == float
+        self.numeric = self.is_bool | self.is_float | (types == int)
+        self.is_str = types == str
+        self.num = np.zeros(n, dtype=np.float64)
+        # False if `num` rounds some int, so comparisons on it would be lossy.
+        self.exact = True
+        if self.numeric.any():
+            self.num[self.numeric] = obj[self.numeric].astype(np.float64)
+            self.exact = not any(map(_inexact, values))
+
+
+class ColumnBatch:
+    """
+    A batch of records stored column-wise.
+
+    Columns are built lazily the first time a field is referenced, so fields
+    that no metric uses cost nothing.
+    """
+
+    def __init__(self, records: Sequence[Mapping[str, Any]]) -> None:
+        self.records = records if isinstance(records, (list, tuple)) else list(records)
+        self.size = len(self.records)
+        self._columns: dict[str, Column] = {}
+
+    def column(self, name: str) -> Column:
+        col = self._columns.get(name)
+        if col is None:
+            col = Column(list(map(methodcaller("get", name), self.records)))
+            self._columns[name] = col
+        return col
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _predicate(node: Any, batch: ColumnBatch) -> tuple[np.ndarray, np.ndarray]:
+    """Return (true_mask, known_mask) following the Python path's 3-valued logic."""
+    if isinstance(node, Unary) and node.op == "not":
+        true, known = _predicate(node.operand, batch)
+        return known & ~true, known
+    if isinstance(node, Binary) and node.op in ("and", "or"):
+        true_a, known_a = _predicate(node.left, batch)
+        true_b, known_b = _predicate(node.right, batch)
+        false_a = known_a & ~true_a
+        false_b = known_b & ~true_b
+        if node.op == "and":
+            false = false_a | false_b
+            true = true_a & true_b
+        else:
+            true = true_a | true_b
+            false = false_a & false_b
+        return true, true | false
+    if isinstance(node, Binary) and node.op in _COMPARISON_OPS:
+        left, right, op = node.left, node.right, node.op
+        if isinstance(left, Literal) and isinstance(right, Field):
+            left, right = right, left
+            op = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(op, op)
+        if isinstance(left, Field) and isinstance(right, Literal):
+            return _compare(batch.column(left.name), op, right.value)
+    raise _Unsupported
+
+
+def _compare(col: Column, op: str, lit: Any) -> tuple[np.ndarray, np.ndarray]:
+    if isinstance(lit, (int, float)) and not (col.exact and not _inexact(lit)):
+        raise _Unsupported
+    if op in ("==", "!="):
+        if isinstance(lit, bool):
+            eq = col.is_bool & (col.num == float(lit))
+        elif isinstance(lit, (int, float)):
+            eq = col.numeric & ~col.is_bool & (col.num == lit)
+        elif isinstance(lit, str):
+            eq = col.is_str.copy()
+            eq[eq] = col.values[eq] == lit
+        else:
+            raise _Unsupported
+        return (eq if op == "==" else col.present & ~eq), col.present
+
+    if isinstance(lit, (int, float)):
+        known = col.numeric
+        num = col.num
+    elif isinstance(lit, str):
+        known = col.is_str
+        num = col.values
+    else:
+        raise _Unsupported
+    true = np.zeros(len(known), dtype=bool)
+    if known.any():
+        sub = num[known]
+        if op == "<":
+            res = sub < lit
+        elif op == "<=":
+            res = sub <= lit
+        elif op == ">":
+            res = sub > lit
+        else:
+            res = sub >= lit
+        true[known] = np.asarray(res, dtype=bool)
+    return true, known
+
+
+def _fold(agg: Aggregate, batch: ColumnBatch) -> Any:
+    args = agg.node.args
+    if agg.func == "count":
+        if all(isinstance(a, Field) for a in args):
+            return sum(int(batch.column(a.name).present.sum()) for a in args)
+        if all(is_predicate(a) for a in args):
+            try:
+                return int(sum(_predicate(a, batch)[0].sum() for a in args))
+            except _Unsupported:
+                pass
+        return agg.fold(batch.records)
+
+    if not all(isinstance(a, Field) for a in args):
+        return agg.fold(batch.records)
+    cols = [batch.column(a.name) for a in args]
+
+    if agg.func in ("min", "max"):
+        if len(cols) != 1 or not cols[0].exact:
+            # Ties between fields resolve in record order, and float64 cannot
+            # rank large ints; leave both to Python.
+            return agg.fold(batch.records)
+        col = cols[0]
+        if not col.numeric.any():
+            return None
+        idx = np.flatnonzero(col.numeric)
+        pick = np.argmin if agg.func == "min" else np.argmax
+        return col.values[idx[pick(col.num[idx])]]
+
+    n = sum(int(c.numeric.sum()) for c in cols)
+    if any(c.is_float.any() for c in cols):
+        total = exact_sum(np.concatenate([c.num[c.numeric] for c in cols]).tolist())
+    else:
+        total = exact_sum([v for c in cols for v in c.values[c.numeric].tolist()])
+    if agg.func == "sum":
+        return total
+    return total / n if n else None
+
+
+def evaluate_metric(metric: CompiledMetric, batch: ColumnBatch) -> Any:
+    """Evaluate one compiled metric over a ColumnBatch."""
+    return metric.combine([_fold(agg, batch) for agg in metric.aggregates])
+
+
+def evaluate_metrics_columnar(
+    template_obj: Mapping[str, Any],
+    records: Iterable[Mapping[str, Any]] | ColumnBatch,
+) -> dict[str, Any]:
+    """Evaluate all template metrics over a batch using the columnar backend."""
+    batch = records if isinstance(records, ColumnBatch) else ColumnBatch(records)
+    return {
+        key: evaluate_metric(metric, batch)
+        for key, metric in compile_template_metrics(template_obj).items()
+    }
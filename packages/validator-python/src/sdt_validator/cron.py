@@ -0,0 +1,177 @@
+"""
+Parse cron expressions and compute their next fire time.
+
+Supports the standard five fields (minute hour day-of-month month
+day-of-week) with `*`, lists, ranges, steps (`*/15`, `1-30/2`), month and
+weekday names, 7 as Sunday, and the @hourly/@daily/@weekly/@monthly/@yearly
+shorthands. As in Vixie cron, when both day fields are restricted a day
+matches if either of them does.
+
+Times are epoch microseconds; schedules are evaluated in UTC unless a
+timezone is given.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from .timeutil import _zone
+
+
+class CronError(ValueError):
+    """Raised when a cron expression cannot be parsed or never fires."""
+
+    def __init__(self, message: str, expression: str) -> None:
+        super().__init__(f"{message} in cron expression {expression!r}")
+        self.expression = expression
+
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1
+)}
+_DAYS = {d: i for i, d in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+# name, low, high, names
+_FIELDS = (
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, _MONTHS),
+    ("day of week", 0, 7, _DAYS),
+)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MAX_YEARS = 8  # long enough to reach Feb 29 on a given weekday
+
+
+def _parse_value(text: str, names: dict[str, int], expression: str) -> int:
+    value = names.get(text.lower())
+    if value is not None:
+        return value
+    if not text.isdigit():
+        raise CronError(f"Invalid value '{text}'", expression)
+    return int(text)
+
+
+def _parse_field(text: str, index: int, expression: str) -> frozenset[int]:
+    name, low, high, names = _FIELDS[index]
+    values: set[int] = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        step = 1
+        if step_text:
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"Invalid step '{step_text}' in {name} field", expression)
+            step = int(step_text)
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            a, _, b = base.partition("-")
+            start, end = _parse_value(a, names, expression), _parse_value(b, names, expression)
+        else:
+            start = end = _parse_value(base, names, expression)
+            if step_text:
+                end = high
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise CronError(f"Value out of range {low}-{high} in {name} field", expression)
+        values.update(range(start, end + 1, step))
+    if index == 4 and 7 in values:
+        values.discard(7)
+        values.add(0)
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronExpression:
+    """A parsed cron expression; use next_after() to find fire times."""
+    expression: str
+    minutes: frozenset
+    hours: frozenset
+    days: frozenset
+    months: frozenset
+    weekdays: frozenset
+    days_restricted: bool
+    weekdays_restricted: bool
+    _minute_list: tuple = field(init=False, repr=False, compare=False)
+    _hour_list: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_minute_list", tuple(sorted(self.minutes)))
+        object.__setattr__(self, "_hour_list", tuple(sorted(self.hours)))
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, micros: int, tz: Optional[str] = None) -> int:
+        """First fire time strictly after `micros` (epoch microseconds)."""
+        zone = _zone(tz) if tz and tz != "UTC" else timezone.utc
+        local = (_EPOCH + timedelta(microseconds=micros)).astimezone(zone).replace(tzinfo=None)
+        dt = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt.year + _MAX_YEARS
+        while dt.year <= limit:
+            if dt.month not in self.months:
+                year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+                dt = datetime(year, month, 1)
+                continue
+            if not self._day_matches(dt):
+                dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                i = bisect_left(self._hour_list, dt.hour)
+                if i == len(self._hour_list):
+                    dt = datetime(dt.year, dt.month, dt.day) + timedelta(days=1)
+                else:
+                    dt = dt.replace(hour=self._hour_list[i], minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                i = bisect_left(self._minute_list, dt.minute)
+                if i == len(self._minute_list):
+                    dt = dt.replace(minute=0) + timedelta(hours=1)
+                else:
+                    dt = dt.replace(minute=self._minute_list[i])
+                continue
+            fire = dt.replace(tzinfo=zone)
+            result = (fire - _EPOCH) // timedelta(microseconds=1)
+            if result > micros:
+                return result
+            dt += timedelta(minutes=1)  # repeated wall time after a DST fall-back
+        raise CronError("Schedule never fires", self.expression)
+
+
+@lru_cache(maxsize=4096)
+def parse_cron(expression: str) -> CronExpression:
+    """Parse a five-field cron expression or @-shorthand (results are cached)."""
+    text = _MACROS.get(expression.strip().lower(), expression)
+    parts = text.split()
+    if len(parts) != 5:
+        raise CronError(f"Expected 5 fields, got {len(parts)}", expression)
+    fields = [_parse_field(p, i, expression) for i, p in enumerate(parts)]
+    cron = CronExpression(
+        expression,
+        *fields,
+        days_restricted=not parts[2].startswith("*"),
+        weekdays_restricted=not parts[4].startswith("*"),
+    )
+    cron.next_after(0)  # reject schedules such as Feb 30 up front
+    return cron
+
+
+def next_fire(expression: str, after: int, tz: Optional[str] = None) -> int:
+    """Next fire time of `expression` strictly after `after` (epoch microseconds)."""
+    return parse_cron(expression).next_after(after, tz)
+
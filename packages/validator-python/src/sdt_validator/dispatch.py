@@ -0,0 +1,94 @@
+"""
+Route events to the workflows they trigger.
+
+WorkflowDispatcher indexes every loaded project's `trigger.type == "event"`
+workflows by (project_id, event_type), so routing an event is a dictionary
+lookup no matter how many projects or workflows are loaded. An event
+workflow without an event_type is triggered by every event of its project.
+
+Projects can be loaded, reloaded and removed one at a time; only the index
+keys of that project are touched.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional
+
+from .validator import validate_project
+
+
+class WorkflowDispatcher:
+    """
+    (project_id, event_type) -> workflow ids, maintained per project.
+
+    Loaded projects are validated against project.schema.json unless
+    validate=False.
+    """
+
+    def __init__(
+        self,
+        projects: Iterable[Mapping[str, Any]] = (),
+        *,
+        validate: bool = True,
+        spec_dir: Optional[str | Path] = None,
+    ) -> None:
+        self._validate = validate
+        self._spec_dir = spec_dir
+        self._index: dict[tuple[str, str], tuple[str, ...]] = {}
+        self._wildcards: dict[str, tuple[str, ...]] = {}
+        self._keys: dict[str, list[tuple[str, str]]] = {}
+        self._projects: dict[str, Mapping[str, Any]] = {}
+        for project_obj in projects:
+            self.load_project(project_obj)
+
+    def __len__(self) -> int:
+        return len(self._projects)
+
+    def __contains__(self, project_id: object) -> bool:
+        return project_id in self._projects
+
+    def load_project(self, project_obj: Mapping[str, Any]) -> None:
+        """Add a project, or replace a previously loaded one with the same project_id."""
+        if self._validate:
+            validate_project(project_obj, spec_dir=self._spec_dir)
+        project_id = project_obj["project_id"]
+        by_type: dict[str, list[str]] = {}
+        wildcard: list[str] = []
+        for workflow in project_obj.get("workflows", []):
+            trigger = workflow.get("trigger", {})
+            if trigger.get("type") != "event":
+                continue
+            event_type = trigger.get("event_type")
+            if event_type is None:
+                wildcard.append(workflow["workflow_id"])
+            else:
+                by_type.setdefault(event_type, []).append(workflow["workflow_id"])
+
+        for key in self._keys.get(project_id, ()):
+            if key[1] not in by_type:
+                del self._index[key]
+        for event_type, workflow_ids in by_type.items():
+            self._index[(project_id, event_type)] = tuple(workflow_ids)
+        if wildcard:
+            self._wildcards[project_id] = tuple(wildcard)
+        else:
+            self._wildcards.pop(project_id, None)
+        self._keys[project_id] = [(project_id, event_type) for event_type in by_type]
+        self._projects[project_id] = project_obj
+
+    def remove_project(self, project_id: str) -> None:
+        for key in self._keys.pop(project_id, ()):
+            del self._index[key]
+        self._wildcards.pop(project_id, None)
+        self._projects.pop(project_id, None)
+
+    def project(self, project_id: str) -> Mapping[str, Any]:
+        return self._projects[project_id]
+
+    def route(self, event: Mapping[str, Any]) -> tuple[str, ...]:
+        """Workflow ids of the event's project triggered by its event_type."""
+        project_id = event.get("project_id")
+        matched = self._index.get((project_id, event.get("event_type")), ())
+        wildcard = self._wildcards.get(project_id)
+        return matched + wildcard if wildcard else matched
@@ -0,0 +1,325 @@
+"""
+Memory-mapped replay of NDJSON event logs through a sparse sidecar index.
+
+EventLog groups the lines of an event log into blocks of `stride` lines and
+records, per block, its byte range and the smallest and largest event
+timestamp in it; optionally it also records which blocks hold each user_id.
+A replay for a time range (and/or one user) maps the log, visits only the
+blocks whose timestamp span and user list can match, and decodes just their
+lines. Logs need not be sorted by time; sorted logs simply give tighter
+blocks.
+
+The index lives next to the log (`<log>.idx`) as a header followed by
+segments. refresh() indexes only the bytes appended since the last refresh
+and appends one segment holding the blocks it touched and the new user
+postings, so keeping the index current costs time proportional to the new
+data; the sidecar is rewritten as a single segment once the appended
+segments outgrow it. A log that shrank or whose first bytes changed
+(rotated or rewritten) is re-indexed from the start. A torn final line is
+left for the next refresh, and a torn final segment is ignored.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+from .records import EventRecord
+from .timeutil import parse_timestamp
+
+
+_MAGIC = b"SDTEVIX2"
+_HEADER = struct.Struct("<8sIB")  # magic, stride, users
+# payload bytes, blocks, postings, covered, lines, digest of the log head
+_SEGMENT = struct.Struct("<QIIQQ16s")
+_BLOCK = struct.Struct("<IQQqqI")  # id, offset, length, min, max, count
+_LEN = struct.Struct("<I")
+_TS_MAX, _TS_MIN = 2**63 - 1, -(2**63)  # also the min/max of a block without events
+_HEAD_BYTES = 4096  # leading log bytes fingerprinted to notice a replaced log
+
+Bound = Union[str, int, None]
+
+
+def _micros(bound: Bound) -> Optional[int]:
+    return parse_timestamp(bound) if isinstance(bound, str) else bound
+
+
+class EventLog:
+    """
+    An NDJSON event log with a block-level timestamp (and user) index.
+
+    The index is loaded from, or built into, `index_path` (default
+    `<path>.idx`) on open. Call refresh() after the log has grown.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        stride: int = 256,
+        index_users: bool = True,
+        index_path: Optional[str | Path] = None,
+    ) -> None:
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else Path(f"{self.path}.idx")
+        self.stride = stride
+        self.index_users = index_users
+        self._reset()
+        if not self._load_index():
+            self._reset()
+        self.refresh()
+
+    def _reset(self) -> None:
+        self.covered = 0  # log bytes indexed so far
+        self.lines = 0
+        self._head = b""  # digest of the indexed log's first bytes
+        self._offsets = array("Q")
+        self._lengths = array("Q")
+        self._counts = array("I")
+        self._min = array("q")
+        self._max = array("q")
+        self._users: dict[str, array] = {}
+        # Changes since the sidecar was last written, and its layout.
+        self._touched: set[int] = set()
+        self._postings: list[tuple[str, int]] = []
+        self._index_size = 0  # valid bytes in the sidecar; 0 forces a rewrite
+        self._compact_size = 0  # size of the last full rewrite
+
+    def __len__(self) -> int:
+        return self.lines
+
+    @property
+    def blocks(self) -> int:
+        return len(self._offsets)
+
+    def _load_index(self) -> bool:
+        try:
+            data = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return False
+        if len(data) < _HEADER.size:
+            return False
+        magic, stride, users = _HEADER.unpack_from(data)
+        if magic != _MAGIC or stride != self.stride or bool(users) != self.index_users:
+            return False
+        pos = _HEADER.size
+        try:
+            while pos + _SEGMENT.size <= len(data):
+                size, nblocks, npostings, covered, lines, head = _SEGMENT.unpack_from(data, pos)
+                end = pos + _SEGMENT.size + size
+                if end > len(data):
+                    break  # torn final segment; overwritten by the next save
+                pos += _SEGMENT.size
+                for _ in range(nblocks):
+                    self._load_block(*_BLOCK.unpack_from(data, pos))
+                    pos += _BLOCK.size
+                for _ in range(npostings):
+                    (n,) = _LEN.unpack_from(data, pos)
+                    user_id = data[pos + 4:pos + 4 + n].decode("utf-8")
+                    (block,) = _LEN.unpack_from(data, pos + 4 + n)
+                    self._post(user_id, block)
+                    pos += 8 + n
+                if pos != end:
+                    return False
+                self.covered, self.lines, self._head = covered, lines, head
+        except (struct.error, ValueError):
+            return False
+        if self._head != self._head_digest(self.covered):
+            return False
+        self._index_size = pos
+        if not self._compact_size:
+            self._compact_size = pos
+        self._postings.clear()
+        return True
+
+    def _load_block(
+        self, block: int, offset: int, length: int, lo: int, hi: int, count: int
+    ) -> None:
+        if block == self.blocks:
+            for arr in (self._offsets, self._lengths, self._min, self._max, self._counts):
+                arr.append(0)
+        elif block > self.blocks:
+            raise ValueError("index segment skips a block")
+        self._offsets[block], self._lengths[block] = offset, length
+        self._min[block], self._max[block], self._counts[block] = lo, hi, count
+
+    def _post(self, user_id: str, block: int) -> None:
+        ids = self._users.get(user_id)
+        if ids is None:
+            ids = self._users[user_id] = array("I")
+        if not ids or ids[-1] != block:
+            ids.append(block)
+            self._postings.append((user_id, block))
+
+    def _head_digest(self, covered: int) -> bytes:
+        try:
+            with open(self.path, "rb") as f:
+                head = f.read(min(covered, _HEAD_BYTES))
+        except FileNotFoundError:
+            head = b""
+        return hashlib.blake2b(head, digest_size=16).digest()
+
+    def _save_index(self) -> None:
+        self._head = self._head_digest(self.covered)
+        # Rewrite when there is no valid sidecar or the appended segments
+        # have outgrown the last full rewrite; otherwise append a segment.
+        full = not self._index_size or (
+            self._index_size - self._compact_size > max(self._compact_size, 4096)
+        )
+        if full:
+            blocks: Any = range(self.blocks)
+            postings: Any = [(u, b) for u, ids in self._users.items() for b in ids]
+        else:
+            blocks, postings = sorted(self._touched), self._postings
+        parts = []
+        for b in blocks:
+            parts.append(_BLOCK.pack(
+                b, self._offsets[b], self._lengths[b], self._min[b], self._max[b], self._counts[b]
+            ))
+        for user_id, block in postings:
+            raw = user_id.encode("utf-8")
+            parts += [_LEN.pack(len(raw)), raw, _LEN.pack(block)]
+        payload = b"".join(parts)
+        segment = _SEGMENT.pack(
+            len(payload), len(blocks), len(postings), self.covered, self.lines, self._head
+        ) + payload
+        if full:
+            tmp = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(_HEADER.pack(_MAGIC, self.stride, self.index_users) + segment)
+            os.replace(tmp, self.index_path)
+            self._index_size = self._compact_size = _HEADER.size + len(segment)
+        else:
+            with open(self.index_path, "r+b") as f:
+                f.seek(self._index_size)
+                f.write(segment)
+                f.truncate()
+            self._index_size += len(segment)
+        self._touched.clear()
+        self._postings.clear()
+
+    def refresh(self) -> int:
+        """Index lines appended since the last refresh; returns how many were added."""
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size < self.covered or (
+            self.covered and self._head_digest(self.covered) != self._head
+        ):
+            self._reset()
+        if size == self.covered:
+            return 0
+        added = 0
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = self.covered
+            while True:
+                end = mm.find(b"\n", pos)
+                if end < 0:
+                    break
+                self._index_line(mm[pos:end], pos, end + 1 - pos)
+                pos = end + 1
+                added += 1
+        self.covered = pos
+        self.lines += added
+        if added:
+            self._save_index()
+        return added
+
+    def _index_line(self, line: bytes, offset: int, length: int) -> None:
+        if not self._counts or self._counts[-1] >= self.stride:
+            self._offsets.append(offset)
+            self._lengths.append(0)
+            self._counts.append(0)
+            self._min.append(_TS_MAX)
+            self._max.append(_TS_MIN)
+        block = len(self._counts) - 1
+        self._touched.add(block)
+        self._lengths[block] += length
+        self._counts[block] += 1
+        try:
+            event = json.loads(line)
+            ts = parse_timestamp(event["timestamp"])
+        except (ValueError, KeyError, TypeError):
+            return  # not an event; skipped again on replay
+        if ts < self._min[block]:
+            self._min[block] = ts
+        if ts > self._max[block]:
+            self._max[block] = ts
+        user_id = event.get("user_id")
+        if self.index_users and isinstance(user_id, str):
+            self._post(user_id, block)
+
+    def _blocks_for(
+        self, start: Optional[int], end: Optional[int], user_id: Optional[str]
+    ) -> list[int]:
+        if user_id is not None and self.index_users:
+            candidates: Any = self._users.get(user_id, ())
+        else:
+            candidates = range(self.blocks)
+        lo = _TS_MIN if start is None else start
+        hi = _TS_MAX if end is None else end
+        return [
+            b for b in candidates
+            if self._min[b] <= self._max[b] and self._max[b] >= lo and self._min[b] < hi
+        ]
+
+    def users(self) -> list[str]:
+        """Indexed user_ids (empty unless index_users)."""
+        return list(self._users)
+
+    def replay(
+        self,
+        *,
+        start: Bound = None,
+        end: Bound = None,
+        user_id: Optional[str] = None,
+        as_records: bool = False,
+    ) -> Iterator[Union[dict[str, Any], EventRecord]]:
+        """
+        Events with start <= timestamp < end (and the given user_id), in log order.
+
+        Bounds are RFC 3339 strings or epoch microseconds; either may be
+        omitted. Lines that are not events are skipped. With as_records the
+        events are yielded as EventRecords, and lines lacking a field an
+        EventRecord needs are skipped too. A log that shrank since the last
+        refresh is re-indexed first.
+        """
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size < self.covered:
+            self.refresh()
+        lo, hi = _micros(start), _micros(end)
+        blocks = self._blocks_for(lo, hi, user_id)
+        if not blocks:
+            return
+        # A line without a backslash has no JSON escapes, so it can only hold
+        # this user_id if it contains the id's raw UTF-8 bytes; such lines are
+        # skipped before decoding. Lines with escapes are always decoded.
+        needle = user_id.encode("utf-8") if user_id is not None else None
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for b in blocks:
+                offset = self._offsets[b]
+                for line in mm[offset:offset + self._lengths[b]].splitlines():
+                    if needle is not None and needle not in line and b"\\" not in line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                        ts = parse_timestamp(event["timestamp"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if (lo is not None and ts < lo) or (hi is not None and ts >= hi):
+                        continue
+                    if user_id is not None and event.get("user_id") != user_id:
+                        continue
+                    if not as_records:
+                        yield event
+                        continue
+                    try:
+                        record = EventRecord.from_dict(event)
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    yield record
@@ -0,0 +1,185 @@
+"""
+Run project workflows with asyncio.
+
+WorkflowExecutor takes a project.schema.json object and async step handlers
+keyed by step `action`. Each step starts as soon as all of its `depends_on`
+steps have succeeded, with at most `concurrency` steps in flight, so a
+workflow's wall-clock time approaches its critical path.
+
+Every status change of a run is reported as an execution.schema.json record
+(queued -> running -> succeeded | failed | canceled). When a step fails, no
+further steps are started; steps already running finish, and the run is
+marked failed with the first error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+from .timeutil import MICROS_PER_SECOND, format_timestamp
+from .validator import validate_project
+from .workflow import WorkflowPlan, plan_project
+
+
+SCHEMA_VERSION = "0.1.0"
+
+
+@dataclass
+class StepContext:
+    """What a step handler gets besides the step itself."""
+    project_id: str
+    workflow_id: str
+    execution_id: str
+    inputs: Mapping[str, Any]
+    dependencies: dict[str, Any] = field(default_factory=dict)  # step_id -> output
+
+
+StepHandler = Callable[[Mapping[str, Any], StepContext], Awaitable[Any]]
+RecordCallback = Callable[[dict[str, Any]], None]
+
+
+class WorkflowExecutor:
+    """
+    Execute the workflows of one project.
+
+    The project is validated (schema and step graph) unless validate=False.
+    on_record receives a copy of the execution record on every status change.
+    """
+
+    def __init__(
+        self,
+        project_obj: Mapping[str, Any],
+        handlers: Mapping[str, StepHandler],
+        *,
+        concurrency: int = 8,
+        on_record: Optional[RecordCallback] = None,
+        validate: bool = True,
+        spec_dir: Optional[str | Path] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if validate:
+            validate_project(project_obj, spec_dir=spec_dir)
+        self.project_id = project_obj["project_id"]
+        self.plans: dict[str, WorkflowPlan] = plan_project(project_obj)
+        self.handlers = dict(handlers)
+        self.concurrency = concurrency
+        self._on_record = on_record
+        self._clock = clock
+
+    def _now(self) -> str:
+        return format_timestamp(int(self._clock() * MICROS_PER_SECOND))
+
+    def _emit(self, record: dict[str, Any]) -> None:
+        if self._on_record is not None:
+            self._on_record(dict(record))
+
+    async def run(
+        self,
+        workflow_id: str,
+        *,
+        inputs: Optional[Mapping[str, Any]] = None,
+        context: Optional[Mapping[str, Any]] = None,
+        execution_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """Run one workflow to completion and return its final execution record."""
+        plan = self.plans.get(workflow_id)
+        if plan is None:
+            raise KeyError(f"Unknown workflow '{workflow_id}' in project '{self.project_id}'")
+        record: dict[str, Any] = {
+            "schema_version": SCHEMA_VERSION,
+            "execution_id": execution_id or f"exec_{uuid.uuid4().hex}",
+            "project_id": self.project_id,
+            "workflow_id": workflow_id,
+            "status": "queued",
+        }
+        if inputs is not None:
+            record["inputs"] = dict(inputs)
+        if context is not None:
+            record["context"] = dict(context)
+        self._emit(record)
+
+        record["status"] = "running"
+        record["started_at"] = self._now()
+        self._emit(record)
+
+        step_ctx = StepContext(self.project_id, workflow_id, record["execution_id"], inputs or {})
+        outputs: dict[str, Any] = {}
+        try:
+            error = await self._run_steps(plan, step_ctx, outputs)
+        except asyncio.CancelledError:
+            self._finish(record, "canceled", outputs, "Execution was canceled")
+            raise
+        self._finish(record, "failed" if error else "succeeded", outputs, error)
+        return record
+
+    def _finish(
+        self, record: dict[str, Any], status: str, outputs: dict[str, Any], error: Optional[str]
+    ) -> None:
+        record["status"] = status
+        record["finished_at"] = self._now()
+        if outputs:
+            record["outputs"] = outputs
+        if error:
+            record["error"] = error
+        self._emit(record)
+
+    async def _run_step(self, step: Mapping[str, Any], ctx: StepContext) -> Any:
+        handler = self.handlers.get(step["action"])
+        if handler is None:
+            raise LookupError(f"No handler registered for action '{step['action']}'")
+        return await handler(step, ctx)
+
+    async def _run_steps(
+        self, plan: WorkflowPlan, ctx: StepContext, outputs: dict[str, Any]
+    ) -> Optional[str]:
+        waiting = {sid: len(set(step.get("depends_on", []))) for sid, step in plan.steps.items()}
+        dependents: dict[str, list[str]] = {sid: [] for sid in plan.steps}
+        for sid, step in plan.steps.items():
+            for dep in set(step.get("depends_on", [])):
+                dependents[dep].append(sid)
+        ready = deque(plan.levels[0] if plan.levels else ())
+        running: dict[asyncio.Task, str] = {}
+        error: Optional[str] = None
+
+        try:
+            while ready or running:
+                while ready and error is None and len(running) < self.concurrency:
+                    sid = ready.popleft()
+                    step = plan.steps[sid]
+                    step_ctx = StepContext(
+                        ctx.project_id,
+                        ctx.workflow_id,
+                        ctx.execution_id,
+                        ctx.inputs,
+                        {dep: outputs[dep] for dep in step.get("depends_on", [])},
+                    )
+                    running[asyncio.ensure_future(self._run_step(step, step_ctx))] = sid
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    sid = running.pop(task)
+                    exc = asyncio.CancelledError() if task.cancelled() else task.exception()
+                    if exc is not None:
+                        if error is None:
+                            error = f"Step '{sid}' failed: {exc}"
+                        continue
+                    outputs[sid] = task.result()
+                    for dependent in dependents[sid]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            ready.append(dependent)
+        finally:
+            for task in running:
+                task.cancel()
+            # Let cancelled steps run their cleanup before returning.
+            await asyncio.gather(*running, return_exceptions=True)
+        return error
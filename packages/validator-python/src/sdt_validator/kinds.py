@@ -0,0 +1,17 @@
+"""
+The kinds of SDT JSON and the spec schema each is validated against.
+
+Kept free of imports so the CLI can build its parser, and hand work to a
+running daemon (see server.py), without loading the validator.
+"""
+
+_KIND_SCHEMAS = {
+    "template": "template.schema.json",
+    "rule": "rule.schema.json",
+    "agent": "agent.schema.json",
+    "project": "project.schema.json",
+    "execution": "execution.schema.json",
+    "event": "event.schema.json",
+    "billing": "billing.schema.json",
+}
+KINDS = tuple(_KIND_SCHEMAS)
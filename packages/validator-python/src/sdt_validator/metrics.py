@@ -0,0 +1,550 @@
+"""
+Parse, compile and evaluate template metric formulas.
+
+A formula such as ``count(did=true)/count(did)`` is parsed into a small AST
+and compiled once into a CompiledMetric. Aggregate calls (sum, avg, count,
+min, max) are evaluated over a batch of records; everything outside the
+calls is a scalar expression over the aggregate results.
+
+Records are mappings of template field key to captured value. Use
+record_from_event() to turn an event.schema.json object into one.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
+
+
+METRIC_FUNC_NAMES = {
+    "sum",
+    "average",
+    "avg",
+    "count",
+    "min",
+    "max",
+}
+METRIC_KEYWORDS = {
+    "true",
+    "false",
+    "and",
+    "or",
+    "not",
+}
+
+
+class MetricFormulaError(ValueError):
+    """Raised when a metric formula cannot be parsed or compiled."""
+
+    def __init__(self, message: str, formula: str, position: Optional[int] = None) -> None:
+        where = f" at position {position}" if position is not None else ""
+        super().__init__(f"{message}{where} in formula {formula!r}")
+        self.formula = formula
+        self.position = position
+
+
+# --- AST -------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Literal:
+    value: Any
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str
+
+
+@dataclass(frozen=True)
+class Unary:
+    op: str
+    operand: Any
+
+
+@dataclass(frozen=True)
+class Binary:
+    op: str
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Call:
+    func: str
+    args: tuple
+
+
+_COMPARISON_OPS = {"=", "==", "!=", "<", "<=", ">", ">="}
+_PREDICATE_OPS = _COMPARISON_OPS | {"and", "or"}
+
+
+# --- Parser ----------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+      (?P<number>\d+(?:\.\d*)?|\.\d+)
+    | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<op>==|!=|<=|>=|[=<>+\-*/(),])
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+def _tokenize(formula: str) -> list[tuple[str, Any, int]]:
+    tokens: list[tuple[str, Any, int]] = []
+    pos = 0
+    end = len(formula.rstrip())
+    while pos < end:
+        m = _TOKEN_RE.match(formula, pos)
+        if not m or m.lastgroup is None:
+            raise MetricFormulaError("Unexpected character", formula, pos)
+        kind = m.lastgroup
+        text = m.group(kind)
+        start = m.start(kind)
+        if kind == "number":
+            tokens.append(("number", float(text) if "." in text else int(text), start))
+        elif kind == "string":
+            body = text[1:-1]
+            tokens.append(("string", re.sub(r"\\(.)", r"\1", body), start))
+        elif kind == "ident":
+            lower = text.lower()
+            if lower in METRIC_KEYWORDS:
+                tokens.append((lower, lower, start))
+            else:
+                tokens.append(("ident", text, start))
+        else:
+            tokens.append(("op", text, start))
+        pos = m.end()
+    tokens.append(("end", None, end))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, formula: str) -> None:
+        self.formula = formula
+        self.tokens = _tokenize(formula)
+        self.pos = 0
+
+    def _peek(self) -> tuple[str, Any, int]:
+        return self.tokens[self.pos]
+
+    def _next(self) -> tuple[str, Any, int]:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def _accept_op(self, *ops: str) -> Optional[str]:
+        kind, value, _ = self._peek()
+        if kind == "op" and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def _expect_op(self, op: str) -> None:
+        if self._accept_op(op) is None:
+            _, value, pos = self._peek()
+            raise MetricFormulaError(f"Expected '{op}'", self.formula, pos)
+
+    def parse(self) -> Any:
+        node = self._or()
+        kind, value, pos = self._peek()
+        if kind != "end":
+            raise MetricFormulaError(f"Unexpected token {value!r}", self.formula, pos)
+        return node
+
+    def _or(self) -> Any:
+        node = self._and()
+        while self._peek()[0] == "or":
+            self.pos += 1
+            node = Binary("or", node, self._and())
+        return node
+
+    def _and(self) -> Any:
+        node = self._not()
+        while self._peek()[0] == "and":
+            self.pos += 1
+            node = Binary("and", node, self._not())
+        return node
+
+    def _not(self) -> Any:
+        if self._peek()[0] == "not":
+            self.pos += 1
+            return Unary("not", self._not())
+        return self._comparison()
+
+    def _comparison(self) -> Any:
+        node = self._additive()
+        op = self._accept_op(*_COMPARISON_OPS)
+        if op is not None:
+            node = Binary("==" if op == "=" else op, node, self._additive())
+        return node
+
+    def _additive(self) -> Any:
+        node = self._term()
+        while True:
+            op = self._accept_op("+", "-")
+            if op is None:
+                return node
+            node = Binary(op, node, self._term())
+
+    def _term(self) -> Any:
+        node = self._unary()
+        while True:
+            op = self._accept_op("*", "/")
+            if op is None:
+                return node
+            node = Binary(op, node, self._unary())
+
+    def _unary(self) -> Any:
+        if self._accept_op("-"):
+            return Unary("-", self._unary())
+        return self._primary()
+
+    def _primary(self) -> Any:
+        kind, value, pos = self._next()
+        if kind in ("number", "string"):
+            return Literal(value)
+        if kind in ("true", "false"):
+            return Literal(kind == "true")
+        if kind == "op" and value == "(":
+            node = self._or()
+            self._expect_op(")")
+            return node
+        if kind == "ident":
+            if self._accept_op("("):
+                func = value.lower()
+                if func not in METRIC_FUNC_NAMES:
+                    raise MetricFormulaError(f"Unknown function '{value}'", self.formula, pos)
+                args = [self._or()]
+                while self._accept_op(","):
+                    args.append(self._or())
+                self._expect_op(")")
+                return Call("avg" if func == "average" else func, tuple(args))
+            return Field(value)
+        raise MetricFormulaError(
+            "Unexpected end of formula" if kind == "end" else f"Unexpected token {value!r}",
+            self.formula,
+            pos,
+        )
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(formula: str) -> Any:
+    """Parse a metric formula into an AST. Raises MetricFormulaError."""
+    return _Parser(formula).parse()
+
+
+def formula_fields(node: Any) -> set[str]:
+    """Return the set of field names referenced by an AST."""
+    if isinstance(node, Field):
+        return {node.name}
+    if isinstance(node, Unary):
+        return formula_fields(node.operand)
+    if isinstance(node, Binary):
+        return formula_fields(node.left) | formula_fields(node.right)
+    if isinstance(node, Call):
+        out: set[str] = set()
+        for arg in node.args:
+            out |= formula_fields(arg)
+        return out
+    return set()
+
+
+# --- Compilation -----------------------------------------------------------
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float))
+
+
+def _arith(op: str) -> Callable[[Any, Any], Any]:
+    def apply(a: Any, b: Any) -> Any:
+        if not _is_number(a) or not _is_number(b):
+            return None
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        return a / b if b else None
+    return apply
+
+
+def _compare(op: str) -> Callable[[Any, Any], Any]:
+    def apply(a: Any, b: Any) -> Any:
+        if a is None or b is None:
+            return None
+        if op == "==":
+            return a == b and isinstance(a, bool) == isinstance(b, bool)
+        if op == "!=":
+            return not (a == b and isinstance(a, bool) == isinstance(b, bool))
+        try:
+            if op == "<":
+                return a < b
+            if op == "<=":
+                return a <= b
+            if op == ">":
+                return a > b
+            return a >= b
+        except TypeError:
+            return None
+    return apply
+
+
+def _compile_node(
+    node: Any, formula: str, lookup: Callable[[Any], Callable[[Any], Any]]
+) -> Callable[[Any], Any]:
+    """
+    Compile an AST node into a closure over an environment.
+
+    lookup maps Field/Call leaves to accessors; this is what distinguishes
+    per-record expressions (fields read from the record) from the outer
+    scalar expression (calls read from the aggregate results).
+    """
+    if isinstance(node, Literal):
+        value = node.value
+        return lambda env: value
+    if isinstance(node, (Field, Call)):
+        return lookup(node)
+    if isinstance(node, Unary):
+        operand = _compile_node(node.operand, formula, lookup)
+        if node.op == "-":
+            return lambda env: -v if _is_number(v := operand(env)) else None
+        # three-valued NOT: unknown stays unknown
+        return lambda env: None if (v := operand(env)) is None else not v
+    if isinstance(node, Binary):
+        left = _compile_node(node.left, formula, lookup)
+        right = _compile_node(node.right, formula, lookup)
+        if node.op == "and":
+            def and_(env: Any) -> Any:
+                a = left(env)
+                if a is not None and not a:
+                    return False
+                b = right(env)
+                if b is not None and not b:
+                    return False
+                return None if a is None or b is None else True
+            return and_
+        if node.op == "or":
+            def or_(env: Any) -> Any:
+                a = left(env)
+                if a:
+                    return True
+                b = right(env)
+                if b:
+                    return True
+                return None if a is None or b is None else False
+            return or_
+        fn = _compare(node.op) if node.op in _COMPARISON_OPS else _arith(node.op)
+        return lambda env: fn(left(env), right(env))
+    raise MetricFormulaError(f"Unsupported expression {node!r}", formula)
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """
+    One aggregate call in a formula.
+
+    extract(record) returns the values the record contributes: for count()
+    over a predicate this is [True] when the predicate holds, otherwise the
+    non-null values of the arguments (numeric only for sum/avg/min/max).
+    """
+    func: str
+    node: Call
+    extract: Callable[[Mapping[str, Any]], list]
+
+    def fold(self, records: Iterable[Mapping[str, Any]]) -> Any:
+        extract = self.extract
+        values = [v for record in records for v in extract(record)]
+        if self.func == "count":
+            return len(values)
+        if not values:
+            return 0 if self.func == "sum" else None
+        if self.func == "sum":
+            return exact_sum(values)
+        if self.func == "avg":
+            return exact_sum(values) / len(values)
+        return min(values) if self.func == "min" else max(values)
+
+
+def exact_sum(values: Sequence[Any]) -> Any:
+    """
+    Sum values independently of their order.
+
+    Integers are summed exactly; if any float is present math.fsum is used,
+    so every backend (and Python version) returns the same result.
+    """
+    if any(isinstance(v, float) for v in values):
+        return math.fsum(values)
+    return sum(values)
+
+
+def is_predicate(node: Any) -> bool:
+    """True if count() over this node counts records where it holds (vs non-null values)."""
+    return (
+        isinstance(node, Binary) and node.op in _PREDICATE_OPS
+        or isinstance(node, Unary) and node.op == "not"
+        or isinstance(node, Literal) and isinstance(node.value, bool)
+    )
+
+
+def _compile_aggregate(node: Call, formula: str) -> Aggregate:
+    def field_lookup(leaf: Any) -> Callable[[Any], Any]:
+        if isinstance(leaf, Call):
+            raise MetricFormulaError(f"Nested aggregate '{leaf.func}' is not allowed", formula)
+        name = leaf.name
+        return lambda record: record.get(name)
+
+    predicate = node.func == "count" and all(is_predicate(a) for a in node.args)
+    # Fast path: a single bare field is by far the most common argument.
+    if len(node.args) == 1 and isinstance(node.args[0], Field):
+        name = node.args[0].name
+        if node.func == "count":
+            def extract(record: Mapping[str, Any]) -> list:
+                v = record.get(name)
+                return [] if v is None else [v]
+        else:
+            def extract(record: Mapping[str, Any]) -> list:
+                v = record.get(name)
+                return [v] if _is_number(v) else []
+        return Aggregate(node.func, node, extract)
+
+    getters = [_compile_node(a, formula, field_lookup) for a in node.args]
+    if predicate:
+        def extract(record: Mapping[str, Any]) -> list:
+            return [True for g in getters if g(record)]
+    elif node.func == "count":
+        def extract(record: Mapping[str, Any]) -> list:
+            return [v for g in getters if (v := g(record)) is not None]
+    else:
+        def extract(record: Mapping[str, Any]) -> list:
+            return [v for g in getters if _is_number(v := g(record))]
+    return Aggregate(node.func, node, extract)
+
+
+@dataclass(frozen=True)
+class CompiledMetric:
+    """A metric formula compiled once and evaluated over many record batches."""
+    key: str
+    formula: str
+    ast: Any
+    aggregates: tuple[Aggregate, ...]
+    _combine: Callable[[Sequence[Any]], Any]
+
+    def combine(self, values: Sequence[Any]) -> Any:
+        """Evaluate the formula given one result per entry of `aggregates`."""
+        return self._combine(values)
+
+    def evaluate(self, records: Iterable[Mapping[str, Any]]) -> Any:
+        records = records if isinstance(records, (list, tuple)) else list(records)
+        return self._combine([agg.fold(records) for agg in self.aggregates])
+
+
+def compile_formula(formula: str, *, key: str = "") -> CompiledMetric:
+    """
+    Compile a formula. Field references must appear inside aggregate calls.
+    """
+    return _compile_formula(formula, key)
+
+
+@lru_cache(maxsize=4096)
+def _compile_formula(formula: str, key: str) -> CompiledMetric:
+    ast = parse_formula(formula)
+    slots: dict[Call, int] = {}
+    aggregates: list[Aggregate] = []
+
+    def scalar_lookup(leaf: Any) -> Callable[[Any], Any]:
+        if isinstance(leaf, Field):
+            raise MetricFormulaError(
+                f"Field '{leaf.name}' must be used inside an aggregate function", formula
+            )
+        if leaf not in slots:
+            slots[leaf] = len(aggregates)
+            aggregates.append(_compile_aggregate(leaf, formula))
+        idx = slots[leaf]
+        return lambda values: values[idx]
+
+    combine = _compile_node(ast, formula, scalar_lookup)
+    return CompiledMetric(key, formula, ast, tuple(aggregates), combine)
+
+
+_template_cache_lock = threading.Lock()
+_template_cache: "OrderedDict[tuple, dict[str, CompiledMetric]]" = OrderedDict()
+_TEMPLATE_CACHE_SIZE = 1024
+
+
+def compile_template_metrics(template_obj: Mapping[str, Any]) -> dict[str, CompiledMetric]:
+    """
+    Compile every metric of a template, keyed by metric key.
+
+    Results are cached per template id, schema_version and formula set, so
+    repeated calls for the same template do not re-parse.
+    """
+    metrics = tuple(
+        (m.get("key"), m.get("formula"))
+        for m in template_obj.get("metrics", [])
+        if isinstance(m.get("formula"), str)
+    )
+    cache_key = (template_obj.get("id"), template_obj.get("schema_version"), metrics)
+    with _template_cache_lock:
+        cached = _template_cache.get(cache_key)
+        if cached is not None:
+            _template_cache.move_to_end(cache_key)
+            return cached
+
+    compiled = {key: compile_formula(formula, key=key) for key, formula in metrics}
+
+    with _template_cache_lock:
+        _template_cache[cache_key] = compiled
+        if len(_template_cache) > _TEMPLATE_CACHE_SIZE:
+            _template_cache.popitem(last=False)
+    return compiled
+
+
+def evaluate_metrics(
+    template_obj: Mapping[str, Any],
+    records: Iterable[Mapping[str, Any]],
+    *,
+    backend: str = "python",
+) -> dict[str, Any]:
+    """
+    Evaluate all template metrics over a batch of records.
+
+    backend="numpy" uses the columnar backend (requires NumPy); both
+    backends return identical results.
+    """
+    if backend == "numpy":
+        from .columnar import evaluate_metrics_columnar
+
+        return evaluate_metrics_columnar(template_obj, records)
+    if backend != "python":
+        raise ValueError(f"Unknown backend '{backend}'. Expected 'python' or 'numpy'")
+    records = records if isinstance(records, (list, tuple)) else list(records)
+    return {
+        key: metric.evaluate(records)
+        for key, metric in compile_template_metrics(template_obj).items()
+    }
+
+
+def record_from_event(event: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Map an event.schema.json object to a {field: value} record.
+
+    Uses the top-level field/value pair, or choice.field/choice.value for
+    choice events. Events without a field produce an empty record.
+    """
+    field = event.get("field")
+    if field is not None:
+        return {field: event.get("value")}
+    choice = event.get("choice")
+    if isinstance(choice, Mapping) and choice.get("field") is not None:
+        return {choice["field"]: choice.get("value")}
+    return {}
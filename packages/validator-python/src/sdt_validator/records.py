@@ -0,0 +1,250 @@
+"""
+Compact in-memory form of event.schema.json objects.
+
+EventRecord stores an event in fixed slots instead of a dict: identifiers
+that repeat across events (user_id, project_id, event_type, field, client
+platform/app_version/device_id, schema_version) are interned so millions of
+events share one copy of each, and the timestamp is parsed once to integer
+epoch microseconds. The field/value pair the metric and rule engines consume
+(top-level field/value, or choice.field/choice.value) is resolved up front.
+
+to_dict() rebuilds the event; the timestamp is rendered in UTC, so offsets
+such as "+09:00" are normalised. field/value always hold the pair
+metrics.record_from_event would pick. Members the slots do not cover (unknown
+keys, or a choice object next to a top-level field or value) are kept verbatim in
+`extra`.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import IO, Any, Iterator, Mapping, Optional
+
+from .stream import iter_ndjson, iter_validate_ndjson
+from .timeutil import format_timestamp, parse_timestamp
+
+
+_intern = sys.intern
+
+# Bits of EventRecord.flags recording which optional members were present.
+_FIELD = 1  # top-level "field"
+_VALUE = 2  # top-level "value"
+_CHOICE = 4  # a "choice" object (field/value below come from it)
+_CHOICE_FIELD = 8
+_CHOICE_VALUE = 16
+_CLIENT = 32
+_PRIVACY = 64
+
+_TOP_LEVEL = frozenset({
+    "schema_version", "event_id", "event_type", "user_id", "project_id", "timestamp",
+    "field", "value", "choice", "client", "privacy",
+})
+_CHOICE_KEYS = frozenset({"screen", "field", "value"})
+_CLIENT_KEYS = ("platform", "app_version", "device_id")
+_PRIVACY_KEYS = ("consent", "minimized")
+
+
+def _intern_opt(value: Any) -> Any:
+    return _intern(value) if isinstance(value, str) else value
+
+
+def _plain(obj: Any, keys: Any, types: tuple[type, ...]) -> bool:
+    # A sub-object the slots can hold exactly: a dict of known, typed keys.
+    return isinstance(obj, dict) and all(
+        k in keys and isinstance(v, types) for k, v in obj.items()
+    )
+
+
+class EventRecord:
+    """One event in slots; `timestamp` is epoch microseconds."""
+
+    __slots__ = (
+        "schema_version", "event_id", "event_type", "user_id", "project_id", "timestamp",
+        "field", "value", "screen", "platform", "app_version", "device_id",
+        "consent", "minimized", "flags", "extra",
+    )
+
+    def __init__(
+        self,
+        event_id: str,
+        event_type: str,
+        user_id: str,
+        project_id: str,
+        timestamp: int,
+        *,
+        field: Optional[str] = None,
+        value: Any = None,
+        schema_version: str = "0.1.0",
+        platform: Optional[str] = None,
+        app_version: Optional[str] = None,
+        device_id: Optional[str] = None,
+    ) -> None:
+        self.schema_version = _intern(schema_version)
+        self.event_id = event_id
+        self.event_type = _intern(event_type)
+        self.user_id = _intern(user_id)
+        self.project_id = _intern(project_id)
+        self.timestamp = timestamp
+        self.field = _intern_opt(field)
+        self.value = value
+        self.screen = None
+        self.platform = _intern_opt(platform)
+        self.app_version = _intern_opt(app_version)
+        self.device_id = _intern_opt(device_id)
+        self.consent = None
+        self.minimized = None
+        self.flags = (_FIELD | _VALUE if field is not None else 0) | (
+            _CLIENT if platform or app_version or device_id else 0
+        )
+        self.extra: Optional[dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, event: Mapping[str, Any]) -> EventRecord:
+        """Build a record from a (validated) event.schema.json object."""
+        self = cls.__new__(cls)
+        self.schema_version = _intern(event["schema_version"])
+        self.event_id = event["event_id"]
+        self.event_type = _intern(event["event_type"])
+        self.user_id = _intern(event["user_id"])
+        self.project_id = _intern(event["project_id"])
+        self.timestamp = parse_timestamp(event["timestamp"])
+        self.field = self.value = self.screen = None
+        self.platform = self.app_version = self.device_id = None
+        self.consent = self.minimized = None
+        flags = 0
+        extra = {k: v for k, v in event.items() if k not in _TOP_LEVEL} or None
+
+        if "field" in event:
+            flags |= _FIELD
+            self.field = _intern_opt(event["field"])
+        if "value" in event:
+            flags |= _VALUE
+            self.value = event["value"]
+        if "choice" in event:
+            choice = event["choice"]
+            if (
+                flags & (_FIELD | _VALUE)
+                or not _plain(choice, _CHOICE_KEYS, (object,))
+                or not isinstance(choice.get("screen", ""), str)
+            ):
+                extra = {**(extra or {}), "choice": choice}
+                if self.field is None and isinstance(choice, Mapping) and (
+                    choice.get("field") is not None
+                ):
+                    # metrics.record_from_event takes the pair from this choice:
+                    # keep the top-level members verbatim, the choice pair in slots.
+                    extra.update((k, event[k]) for k in ("field", "value") if k in event)
+                    flags &= ~(_FIELD | _VALUE)
+                    self.field = _intern_opt(choice["field"])
+                    self.value = choice.get("value")
+            else:
+                flags |= _CHOICE
+                self.screen = _intern_opt(choice.get("screen"))
+                if "field" in choice:
+                    flags |= _CHOICE_FIELD
+                    self.field = _intern_opt(choice["field"])
+                if "value" in choice:
+                    flags |= _CHOICE_VALUE
+                    self.value = choice["value"]
+        if "client" in event:
+            client = event["client"]
+            if _plain(client, _CLIENT_KEYS, (str,)):
+                flags |= _CLIENT
+                self.platform = _intern_opt(client.get("platform"))
+                self.app_version = _intern_opt(client.get("app_version"))
+                self.device_id = _intern_opt(client.get("device_id"))
+            else:
+                extra = {**(extra or {}), "client": client}
+        if "privacy" in event:
+            privacy = event["privacy"]
+            if _plain(privacy, _PRIVACY_KEYS, (bool,)):
+                flags |= _PRIVACY
+                self.consent = privacy.get("consent")
+                self.minimized = privacy.get("minimized")
+            else:
+                extra = {**(extra or {}), "privacy": privacy}
+        self.flags = flags
+        self.extra = extra
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
+        """The event as an event.schema.json object (timestamp in UTC)."""
+        flags = self.flags
+        event: dict[str, Any] = {
+            "schema_version": self.schema_version,
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "user_id": self.user_id,
+            "project_id": self.project_id,
+            "timestamp": format_timestamp(self.timestamp),
+        }
+        if flags & _FIELD:
+            event["field"] = self.field
+        if flags & _VALUE:
+            event["value"] = self.value
+        if flags & _CHOICE:
+            choice: dict[str, Any] = {}
+            if self.screen is not None:
+                choice["screen"] = self.screen
+            if flags & _CHOICE_FIELD:
+                choice["field"] = self.field
+            if flags & _CHOICE_VALUE:
+                choice["value"] = self.value
+            event["choice"] = choice
+        if flags & _CLIENT:
+            event["client"] = {
+                k: v
+                for k, v in zip(_CLIENT_KEYS, (self.platform, self.app_version, self.device_id))
+                if v is not None
+            }
+        if flags & _PRIVACY:
+            event["privacy"] = {
+                k: v for k, v in zip(_PRIVACY_KEYS, (self.consent, self.minimized)) if v is not None
+            }
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+    def record(self) -> dict[str, Any]:
+        """The {field: value} record metrics and rules see (as metrics.record_from_event)."""
+        return {self.field: self.value} if self.field is not None else {}
+
+    @property
+    def timestamp_text(self) -> str:
+        return format_timestamp(self.timestamp)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, EventRecord):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"EventRecord(event_id={self.event_id!r}, event_type={self.event_type!r}, "
+            f"user_id={self.user_id!r}, project_id={self.project_id!r}, "
+            f"timestamp={self.timestamp_text!r}, field={self.field!r}, value={self.value!r})"
+        )
+
+
+def iter_event_records(
+    source: str | Path | IO[str],
+    *,
+    validate: bool = True,
+    spec_dir: Optional[str | Path] = None,
+) -> Iterator[EventRecord]:
+    """
+    EventRecords for the events of an NDJSON source.
+
+    With validate (the default) invalid lines are skipped; use
+    stream.iter_validate_ndjson directly to see why they failed.
+    """
+    if not validate:
+        for _, obj in iter_ndjson(source):
+            yield EventRecord.from_dict(obj)
+        return
+    for result in iter_validate_ndjson(source, "event", spec_dir=spec_dir, keep_records=True):
+        if result.ok:
+            yield EventRecord.from_dict(result.record)
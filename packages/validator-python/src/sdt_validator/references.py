@@ -0,0 +1,129 @@
+"""
+Bulk cross-reference validation of rules and agents against many templates.
+
+A TemplateIndex is built once from any number of templates and maps each
+template id to its set of field keys. validate_references() then resolves
+every rule's and agent's template_id against the index in a single pass and
+reports missing templates and unknown fields with the same messages as
+validate_rule()/validate_agent() with a template_obj.
+
+Schema validation is not repeated here; run validate_rule()/validate_agent()
+(or the batch CLI) for that.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from .validator import (
+    ValidationError,
+    _template_field_keys,
+    agent_capability_fields,
+    field_reference_errors,
+    load_json_file,
+    rule_condition_fields,
+)
+
+
+@dataclass
+class ReferenceResult:
+    """Cross-reference errors for one rule or agent."""
+    kind: str
+    position: int
+    object_id: Optional[str]
+    template_id: Optional[str]
+    errors: list[str]
+
+    def __str__(self) -> str:
+        label = self.object_id if self.object_id is not None else f"#{self.position}"
+        return f"{self.kind} {label}: " + "; ".join(self.errors)
+
+
+_REF_LABELS = {
+    "rule": ("Rule", "Condition", rule_condition_fields),
+    "agent": ("Agent", "Capability", agent_capability_fields),
+}
+
+
+class TemplateIndex:
+    """Template id -> field keys, built once and shared across many checks."""
+
+    def __init__(self, templates: Iterable[Mapping[str, Any]] = ()) -> None:
+        self._fields: dict[str, frozenset[str]] = {}
+        self._available: dict[str, str] = {}
+        for template_obj in templates:
+            self.add(template_obj)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str | Path]) -> TemplateIndex:
+        return cls(load_json_file(str(p)) for p in paths)
+
+    def add(self, template_obj: Mapping[str, Any]) -> None:
+        template_id = template_obj.get("id")
+        if not isinstance(template_id, str):
+            raise ValidationError("Template has no string 'id'; cannot index it.")
+        keys = frozenset(_template_field_keys(template_obj))
+        previous = self._fields.get(template_id)
+        if previous is not None and previous != keys:
+            raise ValidationError(
+                f"Duplicate template id '{template_id}' with different fields.",
+                [f"Indexed fields: {sorted(previous)}", f"New fields: {sorted(keys)}"],
+            )
+        self._fields[template_id] = keys
+        self._available[template_id] = str(sorted(keys)) if keys else "none"
+
+    def __contains__(self, template_id: object) -> bool:
+        return template_id in self._fields
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    @property
+    def ids(self) -> list[str]:
+        return sorted(self._fields)
+
+    def field_keys(self, template_id: str) -> Optional[frozenset[str]]:
+        return self._fields.get(template_id)
+
+    def reference_errors(self, kind: str, obj: Mapping[str, Any]) -> list[str]:
+        """Cross-reference errors for one rule or agent ("rule" or "agent")."""
+        if kind not in _REF_LABELS:
+            raise ValueError(f"Unknown kind '{kind}'. Expected 'rule' or 'agent'")
+        label, item_label, refs = _REF_LABELS[kind]
+        template_id = obj.get("template_id")
+        keys = self._fields.get(template_id)
+        if keys is None:
+            return [f"{label} references template_id '{template_id}', which is not in the index"]
+        return field_reference_errors(item_label, refs(obj), keys, self._available[template_id])
+
+
+def iter_reference_errors(
+    index: TemplateIndex,
+    *,
+    rules: Iterable[Mapping[str, Any]] = (),
+    agents: Iterable[Mapping[str, Any]] = (),
+) -> Iterator[ReferenceResult]:
+    """Yield a ReferenceResult for every rule, then agent, with broken references."""
+    for kind, objs in (("rule", rules), ("agent", agents)):
+        for position, obj in enumerate(objs):
+            errors = index.reference_errors(kind, obj)
+            if errors:
+                yield ReferenceResult(kind, position, obj.get("id"), obj.get("template_id"), errors)
+
+
+def validate_references(
+    index: TemplateIndex,
+    *,
+    rules: Iterable[Mapping[str, Any]] = (),
+    agents: Iterable[Mapping[str, Any]] = (),
+) -> None:
+    """
+    Check every rule and agent against the index.
+
+    Raises a single ValidationError listing all problems, one line per object.
+    """
+    problems = [str(r) for r in iter_reference_errors(index, rules=rules, agents=agents)]
+    if problems:
+        raise ValidationError("Cross-reference validation failed.", problems)
@@ -0,0 +1,349 @@
+"""
+Evaluate rule.schema.json conditions over a stream of events.
+
+RuleEngine loads validated rules (disabled rules are skipped), consumes
+event.schema.json objects (or records.EventRecord) one at a time and returns the effects of every
+rule whose conditions all became true on that event. A rule fires on the
+transition from "not met" to "met" and re-arms once its conditions stop
+holding, so a satisfied rule does not re-emit on every later event.
+
+Condition semantics (value defaults to 1):
+  count        number of events carrying `field` >= value
+  threshold    latest numeric value of `field` >= value
+  streak       consecutive local days with a truthy `field` >= value; days
+               are bucketed in the user's timezone (UTC unless set) and
+               events up to `grace_days` late still count (streaks.py)
+  time_window  events carrying `field` within `window` (e.g. "7d", "PT30M")
+               >= value, counted in a bounded sliding window (windows.py)
+
+State is kept per (user_id, project_id, rule) and only for pairs that have
+seen a relevant event. Events are routed through a RuleIndex, so the cost of
+an event is proportional to the rules whose conditions reference its field,
+not to the total number of rules.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Optional, Union
+
+from .metrics import record_from_event
+from .records import EventRecord
+from .streaks import StreakState, _check_grace, read_snapshot, write_snapshot
+from .timeutil import format_timestamp, local_day, parse_timestamp
+from .validator import ValidationError, rule_condition_fields, validate_rule
+from .windows import SlidingWindowCounter, parse_window
+
+
+@dataclass(frozen=True)
+class TriggeredEffect:
+    """
+    One effect emitted because a rule's conditions were met.
+
+    timestamp is the triggering event's time as RFC 3339 UTC text, whether
+    it was given as a dict or as an EventRecord.
+    """
+    rule_id: str
+    template_id: str
+    user_id: str
+    project_id: str
+    effect: Mapping[str, Any]
+    event_id: Optional[str] = None
+    timestamp: Optional[str] = None
+
+
+class _Condition:
+    """A compiled condition: how to fold one value into state and test it."""
+
+    __slots__ = ("type", "field", "value", "window", "width")
+
+    def __init__(self, condition: Mapping[str, Any], grace_days: int) -> None:
+        self.type = condition["type"]
+        self.field = condition.get("field")
+        self.value = condition.get("value", 1)
+        self.window = parse_window(condition.get("window")) if self.type == "time_window" else 0
+        self.width = grace_days + 1
+
+    def initial(self) -> Any:
+        if self.type == "count":
+            return 0
+        if self.type == "streak":
+            return StreakState()
+        if self.type == "time_window":
+            return SlidingWindowCounter(self.window)
+        return None
+
+    def update(self, state: Any, value: Any, ts: int, day: int) -> Any:
+        if self.type == "count":
+            return state + 1
+        if self.type == "threshold":
+            return value if isinstance(value, (int, float)) and not isinstance(value, bool) else state
+        if self.type == "streak":
+            if value:
+                state.add_day(day, self.width)
+            return state
+        state.add(ts)
+        return state
+
+    def met(self, state: Any, now: int, today: int) -> bool:
+        if self.type == "count":
+            return state >= self.value
+        if self.type == "threshold":
+            return state is not None and state >= self.value
+        if self.type == "streak":
+            return state.length(self.width, today) >= self.value
+        return state.count(now) >= self.value
+
+
+class _CompiledRule:
+    __slots__ = ("id", "template_id", "conditions", "effects")
+
+    def __init__(self, rule: Mapping[str, Any], grace_days: int) -> None:
+        self.id = rule["id"]
+        self.template_id = rule["template_id"]
+        self.conditions = tuple(_Condition(c, grace_days) for c in rule.get("conditions", []))
+        self.effects = tuple(rule.get("effects", []))
+
+
+class _RuleState:
+    __slots__ = ("states", "active")
+
+    def __init__(self, rule: _CompiledRule) -> None:
+        self.states = [c.initial() for c in rule.conditions]
+        self.active = False
+
+
+class RuleIndex:
+    """
+    Inverted index from (template_id, field) to the rules and conditions using it.
+
+    Conditions without a field match every event. dispatch() results are
+    memoized per (template_id, field) and list each matching rule once with
+    the indices of its matching conditions.
+    """
+
+    def __init__(self, rules: Iterable[Mapping[str, Any]]) -> None:
+        self._by_field: dict[tuple[str, Optional[str]], list[tuple[int, int]]] = {}
+        self._templates: set[str] = set()
+        self._fields: set[str] = set()
+        for rule_idx, rule in enumerate(rules):
+            template_id = rule.get("template_id")
+            self._templates.add(template_id)
+            for cond_idx, field in rule_condition_fields(rule):
+                if field is not None:
+                    self._fields.add(field)
+                self._by_field.setdefault((template_id, field), []).append((rule_idx, cond_idx))
+        self._dispatch: dict[
+            tuple[Optional[str], Optional[str]], list[tuple[int, tuple[int, ...]]]
+        ] = {}
+
+    def dispatch(
+        self, field: Optional[str], template_id: Optional[str] = None
+    ) -> list[tuple[int, tuple[int, ...]]]:
+        """Return [(rule index, condition indices)] for an event touching `field`."""
+        if field not in self._fields:
+            # Only field-less conditions can match; sharing the key keeps the
+            # memo bounded no matter which field names events carry.
+            field = None
+        key = (template_id, field)
+        hit = self._dispatch.get(key)
+        if hit is not None:
+            return hit
+
+        templates = self._templates if template_id is None else (template_id,)
+        refs: list[tuple[int, int]] = []
+        for t in templates:
+            if field is not None:
+                refs.extend(self._by_field.get((t, field), ()))
+            refs.extend(self._by_field.get((t, None), ()))
+        grouped: dict[int, list[int]] = {}
+        for rule_idx, cond_idx in sorted(refs):
+            grouped.setdefault(rule_idx, []).append(cond_idx)
+        hit = [(rule_idx, tuple(conds)) for rule_idx, conds in grouped.items()]
+        self._dispatch[key] = hit
+        return hit
+
+
+class RuleEngine:
+    """
+    Evaluate enabled rules against events, keeping per-user rule state.
+
+    Rules are validated against rule.schema.json unless validate=False.
+    Events are expected in timestamp order per user; streak conditions also
+    accept events up to grace_days late. `timezones` maps user_id to the IANA
+    timezone whose local days streaks are counted in.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Mapping[str, Any]],
+        *,
+        validate: bool = True,
+        spec_dir: Optional[str | Path] = None,
+        grace_days: int = 1,
+        timezones: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.grace_days = _check_grace(grace_days)
+        self._timezones: dict[str, str] = dict(timezones or {})
+        self._rules: list[_CompiledRule] = []
+        enabled: list[Mapping[str, Any]] = []
+        for rule in rules:
+            if validate:
+                validate_rule(rule, spec_dir=spec_dir)
+            if not rule.get("enabled", False):
+                continue
+            try:
+                self._rules.append(_CompiledRule(rule, grace_days))
+            except ValueError as e:  # only reachable with validate=False
+                raise ValidationError(f"Rule '{rule.get('id')}' cannot be compiled.", [str(e)]) from e
+            enabled.append(rule)
+        self._index = RuleIndex(enabled)
+        # (user_id, project_id) -> rule index -> state
+        self._state: dict[tuple[str, str], dict[int, _RuleState]] = {}
+
+    @property
+    def rule_ids(self) -> list[str]:
+        return [r.id for r in self._rules]
+
+    def set_timezone(self, user_id: str, tz: Optional[str]) -> None:
+        """Count this user's streak days in `tz` (None resets to UTC)."""
+        if tz is None:
+            self._timezones.pop(user_id, None)
+        else:
+            local_day(0, tz)  # fail fast on unknown zones
+            self._timezones[user_id] = tz
+
+    def process(
+        self, event: Union[Mapping[str, Any], EventRecord], *, template_id: Optional[str] = None
+    ) -> list[TriggeredEffect]:
+        """
+        Apply one event (a dict or an EventRecord) and return the effects of
+        rules that became satisfied.
+
+        If template_id is given only rules for that template are considered.
+        """
+        if isinstance(event, EventRecord):
+            field, value = event.field, event.value
+        else:
+            record = record_from_event(event)
+            field, value = next(iter(record.items()), (None, None))
+        matches = self._index.dispatch(field, template_id)
+        if not matches:
+            return []
+
+        if isinstance(event, EventRecord):
+            ts, key = event.timestamp, (event.user_id, event.project_id)
+        else:
+            ts, key = parse_timestamp(event["timestamp"]), (event["user_id"], event["project_id"])
+        day = local_day(ts, self._timezones.get(key[0]))
+        user_state = self._state.get(key)
+        if user_state is None:
+            user_state = self._state[key] = {}
+        fired: list[TriggeredEffect] = []
+
+        for rule_idx, cond_indices in matches:
+            rule = self._rules[rule_idx]
+            state = user_state.get(rule_idx)
+            if state is None:
+                state = user_state[rule_idx] = _RuleState(rule)
+            for c_idx in cond_indices:
+                state.states[c_idx] = rule.conditions[c_idx].update(
+                    state.states[c_idx], value, ts, day
+                )
+            fired.extend(self._evaluate(rule, state, ts, day, key, event))
+        return fired
+
+    def _evaluate(
+        self,
+        rule: _CompiledRule,
+        state: _RuleState,
+        ts: int,
+        day: int,
+        key: tuple[str, str],
+        event: Union[Mapping[str, Any], EventRecord],
+    ) -> list[TriggeredEffect]:
+        met = all(c.met(s, ts, day) for c, s in zip(rule.conditions, state.states))
+        if not met:
+            state.active = False
+            return []
+        if state.active:
+            return []
+        state.active = True
+        event_id = event.event_id if isinstance(event, EventRecord) else event.get("event_id")
+        timestamp = format_timestamp(ts)
+        return [
+            TriggeredEffect(
+                rule_id=rule.id,
+                template_id=rule.template_id,
+                user_id=key[0],
+                project_id=key[1],
+                effect=effect,
+                event_id=event_id,
+                timestamp=timestamp,
+            )
+            for effect in rule.effects
+        ]
+
+    def process_many(
+        self,
+        events: Iterable[Union[Mapping[str, Any], EventRecord]],
+        *,
+        template_id: Optional[str] = None,
+    ) -> Iterator[TriggeredEffect]:
+        for event in events:
+            yield from self.process(event, template_id=template_id)
+
+    def drop_user(self, user_id: str) -> None:
+        """Forget all rule state for a user."""
+        for key in [k for k in self._state if k[0] == user_id]:
+            del self._state[key]
+
+    def save_streaks(self, path: str | Path) -> None:
+        """Write every streak condition's state to a binary snapshot file."""
+        write_snapshot(
+            path,
+            self.grace_days,
+            (
+                ((user_id, project_id, self._rules[rule_idx].id, str(c_idx)), cond_state)
+                for (user_id, project_id), user_state in self._state.items()
+                for rule_idx, state in user_state.items()
+                for c_idx, cond_state in enumerate(state.states)
+                if isinstance(cond_state, StreakState)
+            ),
+        )
+
+    def load_streaks(self, path: str | Path) -> int:
+        """
+        Restore streak state written by save_streaks(); returns entries loaded.
+
+        Entries for rules that are no longer enabled are skipped. Only streak
+        conditions are restored; other condition types start fresh.
+        """
+        grace_days, entries = read_snapshot(path)
+        if grace_days != self.grace_days:
+            raise ValueError(
+                f"Streak snapshot uses grace_days={grace_days}, engine uses {self.grace_days}"
+            )
+        by_id = {rule.id: idx for idx, rule in enumerate(self._rules)}
+        loaded = 0
+        for (user_id, project_id, rule_id, c_idx), cond_state in entries:
+            rule_idx = by_id.get(rule_id)
+            if rule_idx is None:
+                continue
+            rule = self._rules[rule_idx]
+            c_idx = int(c_idx)
+            if c_idx >= len(rule.conditions) or rule.conditions[c_idx].type != "streak":
+                continue
+            user_state = self._state.setdefault((user_id, project_id), {})
+            state = user_state.get(rule_idx)
+            if state is None:
+                state = user_state[rule_idx] = _RuleState(rule)
+            state.states[c_idx] = cond_state
+            # A rule satisfied by its streaks alone already fired before the snapshot.
+            state.active = all(
+                c.type == "streak" and s.last_day is not None and c.met(s, 0, s.last_day)
+                for c, s in zip(rule.conditions, state.states)
+            )
+            loaded += 1
+        return loaded
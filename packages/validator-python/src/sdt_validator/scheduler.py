@@ -0,0 +1,211 @@
+"""
+Fire `time_interval` workflows from their cron triggers.
+
+CronScheduler keeps one heap entry per scheduled workflow, ordered by next
+fire time. Each fire time is computed once; firing or rescheduling a
+workflow costs O(log n) and removal is lazy, so the cost of a tick depends
+on how many workflows are due, not on how many are scheduled.
+
+run() sleeps until the earliest fire time and hands every workflow due at
+that moment to a callback as one batch. Pass a SimulatedClock to drive it
+in tests without waiting. A workflow that was due several times while the
+scheduler was not running fires once and is rescheduled after "now".
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Mapping, Optional, Union
+
+from .cron import CronExpression, parse_cron
+from .timeutil import MICROS_PER_SECOND
+
+
+@dataclass(frozen=True)
+class ScheduledFire:
+    """One workflow due at `fire_at` (epoch microseconds)."""
+    project_id: str
+    workflow_id: str
+    fire_at: int
+
+
+class SystemClock:
+    """Wall-clock time in epoch microseconds."""
+
+    def now(self) -> int:
+        return time.time_ns() // 1000
+
+    async def sleep_until(self, micros: int) -> None:
+        delay = (micros - self.now()) / MICROS_PER_SECOND
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SimulatedClock:
+    """A clock that jumps straight to the requested time when slept on."""
+
+    def __init__(self, start: int = 0) -> None:
+        self._now = start
+
+    def now(self) -> int:
+        return self._now
+
+    def advance(self, micros: int) -> None:
+        self._now += micros
+
+    async def sleep_until(self, micros: int) -> None:
+        await asyncio.sleep(0)
+        self._now = max(self._now, micros)
+
+
+Clock = Union[SystemClock, SimulatedClock]
+FireCallback = Callable[[list[ScheduledFire]], Union[None, Awaitable[None]]]
+
+
+class _Entry:
+    __slots__ = ("project_id", "workflow_id", "cron", "tz", "next_fire", "seq")
+
+    def __init__(
+        self, project_id: str, workflow_id: str, cron: CronExpression, tz: Optional[str]
+    ) -> None:
+        self.project_id = project_id
+        self.workflow_id = workflow_id
+        self.cron = cron
+        self.tz = tz
+        self.next_fire = 0
+        self.seq = 0  # sequence number of this entry's live heap item
+
+
+class CronScheduler:
+    """Min-heap of cron-triggered workflows keyed by next fire time."""
+
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        self.clock = clock or SystemClock()
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        # (next_fire, sequence, key); items whose sequence is no longer the
+        # entry's (replaced or unscheduled) are skipped when they reach the top.
+        self._heap: list[tuple[int, int, tuple[str, str]]] = []
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _push(self, entry: _Entry) -> None:
+        self._seq += 1
+        entry.seq = self._seq
+        key = (entry.project_id, entry.workflow_id)
+        heapq.heappush(self._heap, (entry.next_fire, self._seq, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            # Too many stale items: rebuild from the live entries.
+            self._heap = [(e.next_fire, e.seq, k) for k, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def schedule(
+        self,
+        project_id: str,
+        workflow_id: str,
+        cron: str,
+        *,
+        tz: Optional[str] = None,
+        after: Optional[int] = None,
+    ) -> int:
+        """Add or replace one workflow's schedule; returns its next fire time."""
+        key = (project_id, workflow_id)
+        entry = _Entry(project_id, workflow_id, parse_cron(cron), tz)
+        entry.next_fire = entry.cron.next_after(self.clock.now() if after is None else after, tz)
+        self._entries[key] = entry
+        self._push(entry)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return entry.next_fire
+
+    def unschedule(self, project_id: str, workflow_id: str) -> None:
+        self._entries.pop((project_id, workflow_id), None)
+
+    def add_project(self, project_obj: Mapping[str, Any], *, tz: Optional[str] = None) -> int:
+        """
+        Schedule every workflow of a project whose trigger is time_interval with
+        a cron string, replacing the project's previous schedules. Returns the
+        number scheduled.
+        """
+        project_id = project_obj["project_id"]
+        self.remove_project(project_id)
+        count = 0
+        for workflow in project_obj.get("workflows", []):
+            trigger = workflow.get("trigger", {})
+            if trigger.get("type") == "time_interval" and trigger.get("cron"):
+                self.schedule(project_id, workflow["workflow_id"], trigger["cron"], tz=tz)
+                count += 1
+        return count
+
+    def remove_project(self, project_id: str) -> None:
+        for key in [k for k in self._entries if k[0] == project_id]:
+            del self._entries[key]
+
+    def _live_top(self) -> Optional[tuple[int, int, tuple[str, str]]]:
+        heap = self._heap
+        while heap:
+            top = heap[0]
+            entry = self._entries.get(top[2])
+            if entry is not None and entry.seq == top[1]:
+                return top
+            heapq.heappop(heap)
+        return None
+
+    def next_fire_time(self) -> Optional[int]:
+        top = self._live_top()
+        return top[0] if top is not None else None
+
+    def pop_due(self, now: Optional[int] = None) -> list[ScheduledFire]:
+        """Remove and reschedule every workflow due at or before now."""
+        now = self.clock.now() if now is None else now
+        due: list[ScheduledFire] = []
+        while True:
+            top = self._live_top()
+            if top is None or top[0] > now:
+                break
+            heapq.heappop(self._heap)
+            entry = self._entries[top[2]]
+            due.append(ScheduledFire(entry.project_id, entry.workflow_id, top[0]))
+            entry.next_fire = entry.cron.next_after(max(now, top[0]), entry.tz)
+            self._push(entry)
+        return due
+
+    async def run(self, fire: FireCallback, *, until: Optional[int] = None) -> None:
+        """
+        Sleep until the earliest fire time, pass the due batch to `fire`, repeat.
+
+        Stops once the next fire time is after `until` (if given); otherwise
+        runs until cancelled. Schedules added meanwhile wake the loop.
+        """
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self._wakeup.clear()
+                nxt = self.next_fire_time()
+                if until is not None and (nxt is None or nxt > until):
+                    return
+                if nxt is None:
+                    await self._wakeup.wait()
+                    continue
+                if nxt > self.clock.now():
+                    sleeper = asyncio.ensure_future(self.clock.sleep_until(nxt))
+                    waker = asyncio.ensure_future(self._wakeup.wait())
+                    try:
+                        await asyncio.wait({sleeper, waker}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        sleeper.cancel()
+                        waker.cancel()
+                    continue
+                batch = self.pop_due()
+                if batch:
+                    result = fire(batch)
+                    if inspect.isawaitable(result):
+                        await result
+        finally:
+            self._wakeup = None
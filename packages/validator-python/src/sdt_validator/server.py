@@ -0,0 +1,340 @@
+"""
+Local validation daemon and its client.
+
+`sdt-validate --serve` runs serve(): a server on a Unix socket that compiles
+every schema once, keeps it warm, and validates batches of objects or files
+sent to it. The CLI hands single-file and batch runs to the daemon through
+connect() when one is listening and validates in-process otherwise, so
+per-file calls from scripts and hooks skip interpreter-side imports and
+schema loading.
+
+The protocol is one JSON request per line, answered by one JSON line:
+
+    {"kind": "event", "payloads": [{...}, ...], "fail_fast": false}
+    {"kind": "rule", "paths": ["/abs/rule.json"], "template_path": "/abs/t.json"}
+    {"results": [{"ok": true}, {"ok": false, "error": {...}, "text": "..."}]}
+
+Requests carry `payloads` (objects) or `paths` (absolute file paths the
+daemon reads), and optionally `template` or `template_path`, `spec_dir`
+and `fail_fast`. Each result's `error` is ValidationError.to_dict() and
+`text` its str(); errors that are not ValidationErrors are also marked
+`"unexpected": true`. A request that cannot be served is answered with
+{"error": "..."}, and the CLI then validates in-process.
+
+Clients send the spec source they resolved: an absolute `spec_dir` (from
+--spec-dir or their SDT_SPEC_DIR), or else `cwd`, whose ./spec is used for
+the schemas it holds, and `bundle`, the path of their packaged bundle used
+for the rest. The daemon serves the latter only if it would resolve the same
+schemas, i.e. it runs from the same install and has neither an
+SDT_SPEC_DIR nor a ./spec of its own in the way; restart it after
+regenerating the bundle.
+
+connect() only trusts a socket owned by the current user, and replies are
+awaited for at most its `reply_timeout`, so a stuck daemon surfaces as
+socket.timeout (an OSError) rather than a hung client.
+
+This module imports only the standard library at load time; the validator
+is imported by the daemon when it starts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+
+class DaemonError(RuntimeError):
+    """Raised by DaemonClient when the daemon rejects a request."""
+
+
+# bundle.BUNDLE_PATH, without importing the bundle module into clients.
+_BUNDLE_PATH = Path(__file__).parent / "_bundle" / "schemas.json"
+
+
+def default_socket_path() -> Path:
+    """SDT_SOCKET, else sdt-validate.sock in XDG_RUNTIME_DIR or a per-user temp path."""
+    env = os.getenv("SDT_SOCKET")
+    if env:
+        return Path(env).expanduser()
+    runtime = os.getenv("XDG_RUNTIME_DIR")
+    if runtime:
+        return Path(runtime) / "sdt-validate.sock"
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(tempfile.gettempdir()) / f"sdt-validate-{uid}.sock"
+
+
+def _result(check: Callable[[], Any]) -> dict[str, Any]:
+    from .validator import ValidationError
+
+    try:
+        check()
+    except ValidationError as e:
+        return {"ok": False, "error": e.to_dict(), "text": str(e)}
+    except Exception as e:
+        message = f"Unexpected error: {e}"
+        return {
+            "ok": False,
+            "error": {"message": message, "errors": []},
+            "text": message,
+            "unexpected": True,
+        }
+    return {"ok": True}
+
+
+def handle_request(request: Any) -> dict[str, Any]:
+    """Validate one decoded request and build its response."""
+    from .validator import (
+        _KIND_SCHEMAS,
+        KINDS,
+        ValidationError,
+        _get_bundled,
+        load_json_file,
+        validate_kind,
+    )
+
+    if not isinstance(request, dict):
+        return {"error": "Request must be a JSON object."}
+    kind = request.get("kind")
+    if kind not in KINDS:
+        return {"error": f"Unknown kind '{kind}'. Expected one of {list(KINDS)}"}
+    payloads, paths = request.get("payloads"), request.get("paths")
+    if (payloads is None) == (paths is None):
+        return {"error": "Request needs exactly one of 'payloads' or 'paths'."}
+    if not isinstance(payloads if paths is None else paths, list):
+        return {"error": "'payloads' and 'paths' must be lists."}
+
+    template_obj = request.get("template")
+    if request.get("template_path"):
+        try:
+            template_obj = load_json_file(request["template_path"])
+        except (OSError, ValidationError) as e:
+            return {"error": f"Cannot load template: {e}"}
+    spec_dir = request.get("spec_dir")
+    if spec_dir is None:
+        if os.getenv("SDT_SPEC_DIR"):
+            return {"error": "The daemon's SDT_SPEC_DIR differs from the client's spec source."}
+        if request.get("bundle") != str(_BUNDLE_PATH):
+            return {"error": "The client uses another install's schema bundle."}
+        schema = _KIND_SCHEMAS[kind]
+        local = Path(request.get("cwd") or os.getcwd()) / "spec"
+        if (local / schema).is_file() or _get_bundled(schema) is None:
+            spec_dir = str(local)
+        elif (Path("spec") / schema).is_file():
+            return {"error": "The daemon's own ./spec would shadow the client's bundle."}
+    fail_fast = bool(request.get("fail_fast"))
+
+    def check(obj: Any) -> None:
+        validate_kind(kind, obj, template_obj=template_obj, spec_dir=spec_dir, fail_fast=fail_fast)
+
+    if paths is None:
+        results = [_result(lambda obj=obj: check(obj)) for obj in payloads]
+    else:
+        results = [_result(lambda path=path: check(load_json_file(path))) for path in paths]
+    return {"results": results}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = handle_request(json.loads(line))
+            except ValueError as e:
+                response = {"error": f"Invalid JSON request: {e}"}
+            self.server.requests += 1  # type: ignore[attr-defined]
+            self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8"))
+            self.wfile.write(b"\n")
+            self.wfile.flush()
+
+
+class ValidationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    The daemon's socket server; one thread per connection.
+
+    The socket is created readable and writable by the owner only. A socket
+    file left behind by a daemon that is gone is replaced; one that still
+    answers raises RuntimeError.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.requests = 0
+        if self.path.exists():
+            if _listening(self.path):
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+            self.path.unlink()
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.path), _Handler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _listening(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def warm(spec_dir: Optional[str | Path] = None) -> None:
+    """Compile every kind's schema, including the generic validator used for error reports."""
+    from .validator import _KIND_SCHEMAS, _get_compiled
+
+    for schema in _KIND_SCHEMAS.values():
+        _get_compiled(schema, Path(spec_dir) if spec_dir else None).validator
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(path: Optional[str | Path] = None, *, spec_dir: Optional[str | Path] = None) -> None:
+    """
+    Warm the schemas and serve on path (default: default_socket_path()).
+
+    Runs until SIGINT or SIGTERM, then removes the socket.
+    """
+    path = Path(path) if path else default_socket_path()
+    warm(spec_dir)
+    if threading.current_thread() is threading.main_thread():
+        # Background jobs start with SIGINT ignored; stop on it regardless.
+        signal.signal(signal.SIGINT, _interrupt)
+        signal.signal(signal.SIGTERM, _interrupt)
+    with ValidationServer(path) as server:
+        print(f"Listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(f"Served {server.requests} requests.", file=sys.stderr)
+
+
+class DaemonClient:
+    """A connection to a running daemon; see connect()."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    def request(self, request: dict[str, Any]) -> dict[str, Any]:
+        self._file.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The daemon closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response
+
+    def validate(
+        self,
+        kind: str,
+        payloads: Iterable[Any],
+        *,
+        template_obj: Optional[Any] = None,
+        spec_dir: Optional[str | Path] = None,
+        fail_fast: bool = False,
+    ) -> list[dict[str, Any]]:
+        """One result per payload (see the module docstring), in order."""
+        return self.request({
+            "kind": kind,
+            "payloads": list(payloads),
+            "template": template_obj,
+            **_spec_source(spec_dir),
+            "fail_fast": fail_fast,
+        })["results"]
+
+    def validate_paths(
+        self,
+        kind: str,
+        paths: Iterable[str | Path],
+        *,
+        template_path: Optional[str | Path] = None,
+        spec_dir: Optional[str | Path] = None,
+        fail_fast: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Like validate(), for files the daemon reads itself."""
+        return self.request({
+            "kind": kind,
+            "paths": [_absolute(p) for p in paths],
+            "template_path": _absolute(template_path),
+            **_spec_source(spec_dir),
+            "fail_fast": fail_fast,
+        })["results"]
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> DaemonClient:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _absolute(path: Optional[str | Path]) -> Optional[str]:
+    # The daemon's working directory is not the client's.
+    return str(Path(path).expanduser().resolve()) if path else None
+
+
+def _spec_source(spec_dir: Optional[str | Path]) -> dict[str, Any]:
+    if spec_dir:
+        return {"spec_dir": _absolute(spec_dir)}
+    return {"spec_dir": None, "bundle": str(_BUNDLE_PATH), "cwd": os.getcwd()}
+
+
+def _owned(path: Path) -> bool:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def connect(
+    path: Optional[str | Path] = None, *, timeout: float = 1.0, reply_timeout: float = 60.0
+) -> Optional[DaemonClient]:
+    """
+    A client for the daemon on path (default: default_socket_path()), or None
+    if none is listening or the socket is not owned by the current user.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = Path(path) if path else default_socket_path()
+    if not _owned(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(reply_timeout)
+    return DaemonClient(sock)
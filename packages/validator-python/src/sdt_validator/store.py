@@ -0,0 +1,289 @@
+"""
+A local, append-only store for execution.schema.json records.
+
+Records are appended as NDJSON lines to one log file. Appending a record
+whose execution_id is already stored supersedes the earlier version (e.g.
+queued -> running -> succeeded), so a run's status changes are just appends.
+
+On open the log is scanned once to rebuild in-memory indexes holding file
+offsets, not records: by project_id, workflow_id and status, each kept
+ordered by started_at, with records that have not started in a separate
+append-only list so queued appends stay O(1). Queries such as "latest 20 failed runs of workflow W"
+walk the smallest matching index from the newest end and read only the
+records they return. compact() rewrites the log with the newest version of
+each record; it also runs automatically once superseded lines outnumber
+live ones.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional
+
+from .timeutil import parse_timestamp
+from .validator import ValidationError, validate_execution
+
+
+_INDEXED = ("project_id", "workflow_id", "status")
+
+
+class _Entry:
+    __slots__ = ("offset", "length", "seq", "started", "project_id", "workflow_id", "status")
+
+    def __init__(self, offset: int, length: int, seq: int, record: Mapping[str, Any]) -> None:
+        self.offset = offset
+        self.length = length
+        self.seq = seq
+        started = record.get("started_at")
+        self.started = parse_timestamp(started) if started else None
+        self.project_id = record.get("project_id")
+        self.workflow_id = record.get("workflow_id")
+        self.status = record.get("status")
+
+
+class _Index:
+    """Started records as sorted (started, seq, id); unstarted ones as (seq, id) in append order."""
+
+    __slots__ = ("started", "queued")
+
+    def __init__(self) -> None:
+        self.started: list[tuple[int, int, str]] = []
+        self.queued: list[tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.started) + len(self.queued)
+
+    def add(self, entry: _Entry, execution_id: str) -> None:
+        if entry.started is None:
+            self.queued.append((entry.seq, execution_id))
+            return
+        item = (entry.started, entry.seq, execution_id)
+        # Records mostly arrive in started_at order, so this is usually an append.
+        if not self.started or self.started[-1] <= item:
+            self.started.append(item)
+        else:
+            insort(self.started, item)
+
+
+class ExecutionStore:
+    """
+    File-backed execution records with secondary indexes.
+
+    Appended records are validated against execution.schema.json unless
+    validate=False. With fsync=True every append is flushed to disk before
+    returning; otherwise call flush() (or close()) at checkpoints. On open a
+    torn final line (no trailing newline) is truncated; any other unreadable
+    line raises ValidationError and the log is left untouched.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        validate: bool = True,
+        spec_dir: Optional[str | Path] = None,
+        fsync: bool = False,
+        auto_compact_min: int = 10_000,
+    ) -> None:
+        self.path = Path(path)
+        self._validate = validate
+        self._spec_dir = spec_dir
+        self._fsync = fsync
+        self._auto_compact_min = auto_compact_min
+        self._load()
+
+    def _reset(self) -> None:
+        self._entries: dict[str, _Entry] = {}
+        # (field, value) -> _Index; items whose seq no longer matches the
+        # entry are stale and skipped on read.
+        self._indexes: dict[tuple[str, Any], _Index] = {}
+        self._all = _Index()
+        self._seq = 0
+        self._stale = 0
+
+    def _load(self) -> None:
+        self._reset()
+        self.path.touch(exist_ok=True)
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn final write; only this is truncated
+                try:
+                    record = json.loads(line)
+                    execution_id, entry = self._entry(record, good, len(line))
+                except (ValueError, ValidationError) as e:  # includes UnicodeDecodeError
+                    raise ValidationError(
+                        f"Corrupt execution record at byte {good} of {self.path}.", [str(e)]
+                    ) from e
+                self._add(execution_id, entry)
+                good += len(line)
+        if good != self.path.stat().st_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        self._writer = open(self.path, "ab")
+        self._reader = open(self.path, "rb")
+        self._dirty = False
+
+    def _entry(
+        self, record: Any, offset: int, length: int
+    ) -> tuple[str, _Entry]:
+        # Everything the indexes need is checked here, before anything is written.
+        execution_id = record.get("execution_id") if isinstance(record, Mapping) else None
+        if not isinstance(execution_id, str):
+            raise ValidationError("Execution record needs a string execution_id.")
+        try:
+            return execution_id, _Entry(offset, length, self._seq + 1, record)
+        except (TypeError, ValueError) as e:
+            raise ValidationError("Execution record has an invalid started_at.", [str(e)]) from e
+
+    def _add(self, execution_id: str, entry: _Entry) -> None:
+        self._seq = entry.seq
+        if execution_id in self._entries:
+            self._stale += 1
+        self._entries[execution_id] = entry
+        self._all.add(entry, execution_id)
+        for name in _INDEXED:
+            index = self._indexes.get((name, getattr(entry, name)))
+            if index is None:
+                index = self._indexes[(name, getattr(entry, name))] = _Index()
+            index.add(entry, execution_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, execution_id: object) -> bool:
+        return execution_id in self._entries
+
+    def __enter__(self) -> ExecutionStore:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def append(self, record: Mapping[str, Any]) -> None:
+        """Store a record, superseding any earlier version with the same execution_id."""
+        if self._validate:
+            validate_execution(record, spec_dir=self._spec_dir)
+        line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode()
+        offset = self._writer.tell()
+        execution_id, entry = self._entry(record, offset, len(line))
+        self._writer.write(line)
+        self._dirty = True
+        if self._fsync:
+            self.flush()
+        self._add(execution_id, entry)
+        if self._stale >= self._auto_compact_min and self._stale > len(self._entries):
+            self.compact()
+
+    def flush(self) -> None:
+        self._writer.flush()
+        if self._fsync:
+            os.fsync(self._writer.fileno())
+        self._dirty = False
+
+    def _read(self, entry: _Entry) -> dict[str, Any]:
+        if self._dirty:
+            self.flush()
+        self._reader.seek(entry.offset)
+        return json.loads(self._reader.read(entry.length))
+
+    def get(self, execution_id: str) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(execution_id)
+        return self._read(entry) if entry is not None else None
+
+    def _iter_newest(
+        self,
+        index: _Index,
+        started_after: Optional[int],
+        started_before: Optional[int],
+    ) -> Iterator[tuple[str, _Entry]]:
+        items = index.started
+        end = len(items)
+        if started_before is not None:
+            end = bisect_left(items, (started_before,))
+        for i in range(end - 1, -1, -1):
+            started, seq, execution_id = items[i]
+            if started_after is not None and started <= started_after:
+                return
+            entry = self._entries.get(execution_id)
+            if entry is not None and entry.seq == seq:
+                yield execution_id, entry
+        if started_after is not None:
+            return
+        for seq, execution_id in reversed(index.queued):
+            entry = self._entries.get(execution_id)
+            if entry is not None and entry.seq == seq:
+                yield execution_id, entry
+
+    def query(
+        self,
+        *,
+        project_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        status: Optional[str] = None,
+        started_after: Optional[str] = None,
+        started_before: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Records matching every given filter, newest started_at first.
+
+        started_after/started_before are exclusive RFC 3339 bounds; records
+        that have not started sort oldest and are excluded by started_after.
+        """
+        filters = {
+            name: value
+            for name, value in (
+                ("project_id", project_id),
+                ("workflow_id", workflow_id),
+                ("status", status),
+            )
+            if value is not None
+        }
+        candidates = [self._indexes.get((name, value), _Index()) for name, value in filters.items()]
+        index = min(candidates, key=len) if candidates else self._all
+        after = parse_timestamp(started_after) if started_after else None
+        before = parse_timestamp(started_before) if started_before else None
+
+        results: list[dict[str, Any]] = []
+        for _, entry in self._iter_newest(index, after, before):
+            if all(getattr(entry, name) == value for name, value in filters.items()):
+                results.append(self._read(entry))
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def latest(
+        self, workflow_id: str, *, status: Optional[str] = None, n: int = 10
+    ) -> list[dict[str, Any]]:
+        """The n most recently started executions of a workflow, optionally by status."""
+        return self.query(workflow_id=workflow_id, status=status, limit=n)
+
+    def compact(self) -> int:
+        """Rewrite the log keeping only the newest version of each record; returns bytes saved."""
+        self.flush()
+        before = self.path.stat().st_size
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        entries = sorted(self._entries.values(), key=lambda e: e.offset)
+        with open(tmp, "wb") as out:
+            for entry in entries:
+                self._reader.seek(entry.offset)
+                out.write(self._reader.read(entry.length))
+            out.flush()
+            os.fsync(out.fileno())
+        self._writer.close()
+        self._reader.close()
+        os.replace(tmp, self.path)
+        self._load()
+        return before - self.path.stat().st_size
+
+    def close(self) -> None:
+        if not self._writer.closed:
+            self.flush()
+            self._writer.close()
+            self._reader.close()
+
@@ -0,0 +1,217 @@
+"""
+Consecutive-day streak tracking with local-day bucketing and checkpoints.
+
+A StreakState is three integers: the newest active day, a bitmask of which
+of the last `grace_days + 1` days were active, and the length of the run
+that ended just before the mask. That is enough to accept events arriving
+up to `grace_days` late (filling a gap re-joins the runs on either side)
+without keeping any event history.
+
+Days are local to the user: timestamps are bucketed with timeutil.local_day()
+in the user's IANA timezone (e.g. execution context.timezone).
+
+StreakTracker.save() / load() write the whole state to a compact binary file
+so a restarted process resumes without replaying events.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from .timeutil import local_day
+
+
+MAX_GRACE_DAYS = 62
+
+_MAGIC = b"SDTSTRK1"
+_HEADER = struct.Struct("<8sBI")  # magic, grace_days, entry count
+_ENTRY = struct.Struct("<qQI")  # last_day, mask, base
+_PART_COUNT = struct.Struct("<B")
+_PART_LEN = struct.Struct("<H")
+
+Key = Union[str, tuple]
+
+
+class StreakState:
+    """Streak state for one user-condition."""
+
+    __slots__ = ("last_day", "mask", "base")
+
+    def __init__(self, last_day: Optional[int] = None, mask: int = 0, base: int = 0) -> None:
+        self.last_day = last_day
+        self.mask = mask  # bit i set = day (last_day - i) was active
+        self.base = base  # run length ending on day (last_day - width)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StreakState):
+            return NotImplemented
+        return (self.last_day, self.mask, self.base) == (other.last_day, other.mask, other.base)
+
+    def __repr__(self) -> str:
+        return f"StreakState(last_day={self.last_day}, mask={self.mask:#x}, base={self.base})"
+
+    def add_day(self, day: int, width: int) -> bool:
+        """Mark `day` active. Returns False if it is older than the grace window."""
+        last = self.last_day
+        if last is None:
+            self.last_day, self.mask, self.base = day, 1, 0
+            return True
+        if day <= last:
+            if last - day >= width:
+                return False
+            self.mask |= 1 << (last - day)
+            return True
+
+        shift = day - last
+        if shift > width:
+            # Every day in the old mask leaves, followed by at least one gap.
+            self.base = 0
+            self.mask = 1
+        else:
+            base = self.base
+            for i in range(width - 1, width - 1 - shift, -1):
+                base = base + 1 if self.mask >> i & 1 else 0
+            self.base = base
+            self.mask = ((self.mask << shift) | 1) & ((1 << width) - 1)
+        self.last_day = day
+        return True
+
+    def length(self, width: int, today: Optional[int] = None) -> int:
+        """
+        Current streak length. If `today` is given, a streak whose newest day
+        is before yesterday has lapsed and counts as 0.
+        """
+        if self.last_day is None:
+            return 0
+        if today is not None and self.last_day < today - 1:
+            return 0
+        run = 0
+        while run < width and self.mask >> run & 1:
+            run += 1
+        return run + self.base if run == width else run
+
+
+def _check_grace(grace_days: int) -> int:
+    if not 0 <= grace_days <= MAX_GRACE_DAYS:
+        raise ValueError(f"grace_days must be between 0 and {MAX_GRACE_DAYS}")
+    return grace_days
+
+
+def _encode_key(key: Key) -> bytes:
+    parts = key if isinstance(key, tuple) else (key,)
+    out = [_PART_COUNT.pack(len(parts))]
+    for part in parts:
+        raw = str(part).encode("utf-8")
+        out.append(_PART_LEN.pack(len(raw)))
+        out.append(raw)
+    return b"".join(out)
+
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("Truncated streak snapshot")
+    return data
+
+
+def _decode_key(f: BinaryIO) -> Key:
+    (count,) = _PART_COUNT.unpack(_read_exact(f, _PART_COUNT.size))
+    parts = []
+    for _ in range(count):
+        (n,) = _PART_LEN.unpack(_read_exact(f, _PART_LEN.size))
+        parts.append(_read_exact(f, n).decode("utf-8"))
+    return parts[0] if count == 1 else tuple(parts)
+
+
+def write_snapshot(
+    path: str | Path, grace_days: int, states: Iterable[tuple[Key, StreakState]]
+) -> None:
+    """Atomically write (key, state) pairs to a binary snapshot file."""
+    path = Path(path)
+    body = [
+        _encode_key(key) + _ENTRY.pack(state.last_day, state.mask, state.base)
+        for key, state in states
+        if state.last_day is not None
+    ]
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, grace_days, len(body)))
+        f.writelines(body)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: str | Path) -> tuple[int, Iterator[tuple[Key, StreakState]]]:
+    """Return (grace_days, iterator of (key, state)) from a snapshot file."""
+    data = Path(path).read_bytes()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Not a streak snapshot: {path}")
+    magic, grace_days, count = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError(f"Not a streak snapshot: {path}")
+
+    def entries() -> Iterator[tuple[Key, StreakState]]:
+        f = io.BytesIO(data)
+        f.seek(_HEADER.size)
+        for _ in range(count):
+            key = _decode_key(f)
+            last_day, mask, base = _ENTRY.unpack(_read_exact(f, _ENTRY.size))
+            yield key, StreakState(last_day, mask, base)
+
+    return grace_days, entries()
+
+
+class StreakTracker:
+    """
+    Streaks for many keys (e.g. (user_id, project_id, rule_id)).
+
+    Events may arrive up to grace_days (local days) late; older ones are
+    ignored and counted in `dropped`.
+    """
+
+    def __init__(self, grace_days: int = 1) -> None:
+        self.grace_days = _check_grace(grace_days)
+        self.width = grace_days + 1
+        self.dropped = 0
+        self._states: dict[Key, StreakState] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def add(self, key: Key, ts: int, tz: Optional[str] = None) -> int:
+        """Record activity at ts (epoch microseconds) and return the streak length."""
+        return self.add_day(key, local_day(ts, tz))
+
+    def add_day(self, key: Key, day: int) -> int:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = StreakState()
+        if not state.add_day(day, self.width):
+            self.dropped += 1
+        return state.length(self.width)
+
+    def length(self, key: Key, now: Optional[int] = None, tz: Optional[str] = None) -> int:
+        """Streak length for key; with `now`, lapsed streaks count as 0."""
+        state = self._states.get(key)
+        if state is None:
+            return 0
+        return state.length(self.width, None if now is None else local_day(now, tz))
+
+    def discard(self, key: Key) -> None:
+        self._states.pop(key, None)
+
+    def items(self) -> Iterator[tuple[Key, StreakState]]:
+        return iter(self._states.items())
+
+    def save(self, path: str | Path) -> None:
+        write_snapshot(path, self.grace_days, self._states.items())
+
+    @classmethod
+    def load(cls, path: str | Path) -> StreakTracker:
+        grace_days, entries = read_snapshot(path)
+        tracker = cls(grace_days)
+        tracker._states.update(entries)
+        return tracker
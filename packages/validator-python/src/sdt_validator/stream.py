@@ -0,0 +1,123 @@
+"""
+Streaming validation of newline-delimited JSON (NDJSON) files.
+
+Records are read and validated one line at a time, so memory use does not
+depend on the size of the input.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+from .dedupe import DuplicateDetector, duplicate_error
+from .validator import ValidationError, validate_kind
+
+
+@dataclass
+class RecordResult:
+    """Validation outcome for one NDJSON line."""
+    line: int
+    ok: bool
+    error: Optional[ValidationError] = None
+    record: Any = None
+
+
+@dataclass
+class StreamSummary:
+    total: int = 0
+    valid: int = 0
+    invalid: int = 0
+    invalid_lines: list[int] = field(default_factory=list)
+
+    def add(self, result: RecordResult, *, max_lines: int = 1000) -> None:
+        self.total += 1
+        if result.ok:
+            self.valid += 1
+        else:
+            self.invalid += 1
+            # Keep a bounded sample so summaries stay small on huge feeds.
+            if len(self.invalid_lines) < max_lines:
+                self.invalid_lines.append(result.line)
+
+    def __str__(self) -> str:
+        return f"Checked {self.total} records: {self.valid} valid, {self.invalid} invalid"
+
+
+def _open_source(source: str | Path | IO[str]) -> tuple[IO[str], bool]:
+    if isinstance(source, (str, Path)):
+        if str(source) == "-":
+            return sys.stdin, False
+        return Path(source).open("r", encoding="utf-8"), True
+    return source, False
+
+
+def _iter_lines(source: str | Path | IO[str]) -> Iterator[tuple[int, Any]]:
+    # (line_number, obj), or (line_number, JSONDecodeError) for a bad line.
+    stream, owned = _open_source(source)
+    try:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, e
+    finally:
+        if owned:
+            stream.close()
+
+
+def iter_ndjson(source: str | Path | IO[str]) -> Iterator[tuple[int, Any]]:
+    """
+    Yield (line_number, obj) for every non-blank line of an NDJSON source.
+
+    source may be a path, "-" for stdin, or an open text stream. Lines that
+    are not valid JSON raise ValidationError with the line number.
+    """
+    for line_no, obj in _iter_lines(source):
+        if isinstance(obj, json.JSONDecodeError):
+            raise ValidationError(f"Line {line_no} is not valid JSON.", [str(obj)]) from obj
+        yield line_no, obj
+
+
+def iter_validate_ndjson(
+    source: str | Path | IO[str],
+    kind: str,
+    *,
+    template_obj: Optional[Any] = None,
+    spec_dir: Optional[str | Path] = None,
+    keep_records: bool = False,
+    duplicates: Optional[DuplicateDetector] = None,
+    fail_fast: bool = False,
+) -> Iterator[RecordResult]:
+    """
+    Validate each line of an NDJSON source as `kind`, yielding one result per record.
+
+    Invalid JSON on a line is reported as a failed record rather than
+    aborting the stream. Set keep_records to attach the decoded object to
+    each result. With a DuplicateDetector, a valid record whose id (see
+    dedupe.ID_FIELDS) was already seen, in this stream or a run whose state
+    the detector was loaded from, is reported as a failed record. fail_fast
+    is passed to validate_kind (report only the first schema error per record).
+    """
+    for line_no, obj in _iter_lines(source):
+        if isinstance(obj, json.JSONDecodeError):
+            yield RecordResult(line_no, False, ValidationError("Invalid JSON.", [str(obj)]))
+            continue
+        try:
+            validate_kind(
+                kind, obj, template_obj=template_obj, spec_dir=spec_dir, fail_fast=fail_fast
+            )
+        except ValidationError as e:
+            yield RecordResult(line_no, False, e, obj if keep_records else None)
+            continue
+        if duplicates is not None:
+            dup = duplicate_error(duplicates, kind, obj)
+            if dup is not None:
+                yield RecordResult(line_no, False, dup, obj if keep_records else None)
+                continue
+        yield RecordResult(line_no, True, None, obj if keep_records else None)
@@ -0,0 +1,75 @@
+import io
+import json
+
+from sdt_validator.billing import BillingRollup, rollup_files, rollup_ndjson
+
+
+def _txn(n, user, delta, txn_type="credit_spend", project="proj_1"):
+    record = {
+        "schema_version": "0.1.0",
+        "transaction_id": f"txn_{n}",
+        "user_id": user,
+        "type": txn_type,
+        "balance_delta": delta,
+        "timestamp": "2026-01-30T08:00:00Z",
+    }
+    if project:
+        record["resource"] = {"project_id": project}
+    return record
+
+
+def _ndjson(records):
+    return "".join(json.dumps(r) + "\n" for r in records)
+
+
+def test_rollup_dedupes_and_totals():
+    records = [
+        _txn(1, "u1", 100, "credit_grant", project=None),
+        _txn(2, "u1", -5),
+        _txn(3, "u1", -2.5, project="proj_2"),
+        _txn(2, "u1", -5),  # replayed
+        _txn(4, "u2", 3, "refund"),
+    ]
+    source = io.StringIO(_ndjson(records) + '{"transaction_id": "broken"}\n')
+    rollup = rollup_ndjson(source, expected_transactions=1000)
+    assert rollup.duplicates == 1
+    assert str(rollup.summary) == "Checked 6 records: 5 valid, 1 invalid"
+    u1 = rollup.user_totals("u1")
+    assert u1.count == 3 and u1.net == 92.5
+    assert u1.by_type() == {"credit_spend": -7.5, "credit_grant": 100.0, "refund": 0.0}
+    assert rollup.project_totals("u1", "proj_1").to_dict() == {
+        "count": 1, "net": -5, "credit_spend": -5, "credit_grant": 0, "refund": 0
+    }
+    assert rollup.user_totals("nobody").count == 0
+
+
+def test_partial_rollups_merge_to_single_pass(tmp_path):
+    records = [_txn(n, f"u{n % 3}", (-1) ** n * 0.1 * n) for n in range(300)]
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"part{i}.ndjson"
+        path.write_text(_ndjson(records[i::3]))
+        paths.append(path)
+    whole = BillingRollup(1000)
+    for record in records:
+        whole.add(record)
+    merged = rollup_files(paths, jobs=2, expected_transactions=1000)
+    for user in ("u0", "u1", "u2"):
+        assert merged.user_totals(user).to_dict() == whole.user_totals(user).to_dict()
+    # The merged filter recognises transactions from every partial.
+    assert not merged.add(records[1])
+
+
+def test_rollup_files_dedupes_across_files_for_any_jobs(tmp_path):
+    paths = []
+    for day in (1, 2):
+        path = tmp_path / f"day{day}.ndjson"
+        path.write_text(_ndjson([_txn(1, "u1", -5), _txn(10 + day, "u1", -1)]))
+        paths.append(path)
+    results = [rollup_files(paths, jobs=jobs, expected_transactions=1000) for jobs in (1, 2)]
+    for rollup in results:
+        assert rollup.duplicates == 1
+        assert rollup.user_totals("u1").to_dict() == {
+            "count": 3, "net": -7, "credit_spend": -7, "credit_grant": 0, "refund": 0
+        }
+        assert str(rollup.summary) == "Checked 4 records: 4 valid, 0 invalid"
@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+
+from sdt_validator.batch import validate_files
+from sdt_validator.dedupe import BloomFilter, DuplicateDetector
+from sdt_validator.stream import iter_validate_ndjson
+
+
+def _txn(n, user, delta, txn_type="credit_spend", project="proj_1"):
+    record = {
+        "schema_version": "0.1.0",
+        "transaction_id": f"txn_{n}",
+        "user_id": user,
+        "type": txn_type,
+        "balance_delta": delta,
+        "timestamp": "2026-01-30T08:00:00Z",
+    }
+    if project:
+        record["resource"] = {"project_id": project}
+    return record
+
+
+def _ndjson(records):
+    return "".join(json.dumps(r) + "\n" for r in records)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(10_000, 0.01)
+    for n in range(10_000):
+        bloom.add(f"id-{n}")
+    assert all(f"id-{n}" in bloom for n in range(10_000))
+    false_hits = sum(f"other-{n}" in bloom for n in range(10_000))
+    assert false_hits < 200
+    assert bloom.nbytes < 12_500
+
+
+def test_duplicate_detector_switches_to_bloom_and_persists(tmp_path):
+    detector = DuplicateDetector(exact_limit=100, capacity=10_000, fp_rate=1e-4)
+    assert not any(detector.seen(f"id_{i}") for i in range(100))
+    assert detector.exact and detector.seen("id_7")
+    assert not detector.seen("id_100")
+    assert not detector.exact and detector.seen("id_7") and len(detector) == 101
+
+    state = tmp_path / "seen.bin"
+    detector.save(state)
+    loaded = DuplicateDetector.open(state)
+    assert DuplicateDetector.open(state, capacity=10_000, fp_rate=1e-4).count == 101
+    with pytest.raises(ValueError, match="fp_rate"):
+        DuplicateDetector.open(state, fp_rate=1e-3)
+    assert not loaded.exact and loaded.seen("id_42") and not loaded.seen("id_new")
+
+    exact = DuplicateDetector()
+    exact.seen("a")
+    exact.save(state)
+    assert DuplicateDetector.load(state).seen("a")
+
+
+def test_stream_and_batch_report_duplicates(tmp_path):
+    detector = DuplicateDetector()
+    source = io.StringIO(_ndjson([_txn(1, "u1", 1), _txn(2, "u1", 1), _txn(1, "u1", 1)]))
+    results = list(iter_validate_ndjson(source, "billing", duplicates=detector))
+    assert [r.ok for r in results] == [True, True, False]
+    assert results[2].error.errors == ["transaction_id 'txn_1' was already seen"]
+
+    paths = []
+    for n in (2, 3, 3):
+        path = tmp_path / f"txn_{len(paths)}.json"
+        path.write_text(json.dumps(_txn(n, "u1", 1)))
+        paths.append(path)
+    files = validate_files(paths, "billing", jobs=1, duplicates=detector)
+    assert [f.ok for f in files] == [False, True, False]
+    assert "Duplicate transaction_id." in files[0].error
@@ -0,0 +1,95 @@
+import json
+
+from sdt_validator.eventlog import EventLog
+
+
+def _event(field, value, timestamp, user="u1", event_id=None):
+    return {
+        "schema_version": "0.1.0",
+        "event_id": event_id or f"{user}-{timestamp}-{field}",
+        "event_type": "field_changed",
+        "user_id": user,
+        "project_id": "p1",
+        "timestamp": timestamp,
+        "field": field,
+        "value": value,
+    }
+
+
+def test_event_log_replays_ranges_and_users_incrementally(tmp_path):
+    events = [
+        _event("did", True, f"2026-03-{1 + (i * 7) % 28:02d}T09:00:00Z", user=f"u{i % 3}",
+               event_id=f"e{i}")
+        for i in range(100)
+    ]
+    path = tmp_path / "events.ndjson"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events[:60]) + "not json\n")
+    log = EventLog(path, stride=8)
+    assert len(log) == 61 and log.blocks == 8
+
+    def expected(start, end, user=None):
+        return [
+            e["event_id"] for e in events
+            if start <= e["timestamp"] < end and user in (None, e["user_id"])
+        ]
+
+    with path.open("a") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in events[60:]) + '{"torn": ')
+    assert log.refresh() == 40 and EventLog(path, stride=8).refresh() == 0
+
+    start, end = "2026-03-05T00:00:00Z", "2026-03-12T00:00:00Z"
+    assert [e["event_id"] for e in log.replay(start=start, end=end)] == expected(start, end)
+    by_user = list(log.replay(start=start, end=end, user_id="u1", as_records=True))
+    assert [r.event_id for r in by_user] == expected(start, end, "u1")
+    assert len(log._blocks_for(None, None, "u1")) == log.blocks
+
+    # A rewritten log is re-indexed from scratch.
+    path.write_text(json.dumps(events[0]) + "\n" * 200)
+    reopened = EventLog(path, stride=8)
+    assert len(reopened) == 200
+    assert [e["event_id"] for e in reopened.replay()] == ["e0"]
+
+
+def test_event_log_appends_index_segments_and_matches_escaped_ids(tmp_path):
+    path = tmp_path / "events.ndjson"
+    index = tmp_path / "events.ndjson.idx"
+    path.write_text("".join(
+        json.dumps(_event("did", True, f"2026-03-01T{h:02d}:00:00Z", user=f"u{h % 4}")) + "\n"
+        for h in range(24)
+    ))
+    log = EventLog(path, stride=4)
+    sizes = [index.stat().st_size]
+    escaped = json.dumps(_event("did", True, "2026-03-02T00:00:00Z", user="u1", event_id="esc"))
+    for line in (json.dumps(_event("did", True, "2026-03-02T01:00:00Z", user="u2")),
+                 escaped.replace('"u1"', '"\\u00751"')):
+        with path.open("a") as f:
+            f.write(line + "\n")
+        assert log.refresh() == 1
+        sizes.append(index.stat().st_size)
+    # Each refresh appends a segment instead of rewriting the sidecar.
+    assert sizes[1] - sizes[0] < sizes[0] and sizes[2] - sizes[1] < sizes[0]
+
+    reopened = EventLog(path, stride=4)
+    for name in ("_offsets", "_lengths", "_min", "_max", "_counts", "_users"):
+        assert getattr(reopened, name) == getattr(log, name)
+    assert "esc" in [e["event_id"] for e in reopened.replay(user_id="u1")]
+
+    with index.open("ab") as f:
+        f.write(b"\x10\x00")  # torn segment header
+    with path.open("a") as f:
+        f.write(json.dumps(_event("did", True, "2026-03-03T00:00:00Z", user="u3")) + "\n")
+    assert EventLog(path, stride=4).lines == 27 and EventLog(path, stride=4).refresh() == 0
+
+
+def test_event_log_replay_skips_partial_events_and_survives_truncation(tmp_path):
+    path = tmp_path / "events.ndjson"
+    partial = {"timestamp": "2026-03-01T08:00:00Z", "user_id": "u1"}
+    path.write_text(
+        json.dumps(partial) + "\n" + json.dumps(_event("did", True, "2026-03-01T09:00:00Z")) + "\n"
+    )
+    log = EventLog(path, stride=4)
+    assert len(list(log.replay())) == 2
+    assert [r.event_id for r in log.replay(as_records=True)] == ["u1-2026-03-01T09:00:00Z-did"]
+
+    path.write_text("")
+    assert list(log.replay()) == [] and len(log) == 0
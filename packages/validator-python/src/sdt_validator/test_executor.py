@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+from sdt_validator import validate_execution
+from sdt_validator.executor import WorkflowExecutor
+
+
+def _project(steps):
+    return {
+        "schema_version": "0.1.0",
+        "project_id": "proj_1",
+        "name": "Test Project",
+        "owner_id": "user_1",
+        "agents": ["agent_a"],
+        "workflows": [{"workflow_id": "wf_1", "trigger": {"type": "manual"}, "steps": steps}],
+    }
+
+
+def _step(step_id, action, depends_on=()):
+    step = {"step_id": step_id, "agent_id": "agent_a", "action": action}
+    if depends_on:
+        step["depends_on"] = list(depends_on)
+    return step
+
+
+async def _sleep_handler(step, ctx):
+    await asyncio.sleep(0.05)
+    return {"after": sorted(ctx.dependencies)}
+
+
+def test_independent_steps_run_concurrently():
+    fan_out = [f"analyze_{i}" for i in range(10)]
+    steps = [_step("capture", "capture")]
+    steps += [_step(s, "analyze", ["capture"]) for s in fan_out]
+    steps.append(_step("remind", "remind", fan_out))
+    records = []
+    executor = WorkflowExecutor(
+        _project(steps),
+        {"capture": _sleep_handler, "analyze": _sleep_handler, "remind": _sleep_handler},
+        concurrency=16,
+        on_record=records.append,
+    )
+
+    start = time.perf_counter()
+    final = asyncio.run(executor.run("wf_1", inputs={"focus": 3}, execution_id="exec_1"))
+    elapsed = time.perf_counter() - start
+
+    # Critical path is three steps deep; serial execution would take 12 steps.
+    assert elapsed < 0.4
+    assert [r["status"] for r in records] == ["queued", "running", "succeeded"]
+    for record in records:
+        validate_execution(record)
+    assert final["outputs"]["remind"] == {"after": fan_out}
+    assert final["started_at"] <= final["finished_at"]
+
+
+def test_failed_step_stops_dependents():
+    calls = []
+
+    async def handler(step, ctx):
+        calls.append(step["step_id"])
+        if step["step_id"] == "capture":
+            raise RuntimeError("device offline")
+        return None
+
+    steps = [_step("capture", "capture"), _step("analyze", "analyze", ["capture"])]
+    records = []
+    executor = WorkflowExecutor(
+        _project(steps), {"capture": handler, "analyze": handler}, on_record=records.append
+    )
+    final = asyncio.run(executor.run("wf_1"))
+    assert calls == ["capture"]
+    assert final["status"] == "failed"
+    assert final["error"] == "Step 'capture' failed: device offline"
+    validate_execution(final)
+
+    with pytest.raises(KeyError):
+        asyncio.run(executor.run("missing"))
+
+
+def test_cancelled_run_waits_for_step_cleanup():
+    cleaned = []
+
+    async def handler(step, ctx):
+        try:
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0)
+            cleaned.append(step["step_id"])
+
+    executor = WorkflowExecutor(
+        _project([_step("a", "custom"), _step("b", "custom")]), {"custom": handler}
+    )
+
+    async def main():
+        run = asyncio.ensure_future(executor.run("wf_1"))
+        await asyncio.sleep(0.01)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        return sorted(cleaned)
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+
+def test_executor_records_go_to_store(tmp_path):
+    from sdt_validator.store import ExecutionStore
+
+    steps = [_step("capture", "capture")]
+    with ExecutionStore(tmp_path / "executions.ndjson") as store:
+        executor = WorkflowExecutor(
+            _project(steps), {"capture": _sleep_handler}, on_record=store.append
+        )
+        final = asyncio.run(executor.run("wf_1"))
+        assert store.get(final["execution_id"]) == final
+        assert store.latest("wf_1", status="succeeded") == [final]
@@ -0,0 +1,213 @@
+import pytest
+
+from sdt_validator import ValidationError, load_json_file, validate_template
+from sdt_validator.metrics import (
+    Binary,
+    Call,
+    Field,
+    Literal,
+    MetricFormulaError,
+    compile_formula,
+    compile_template_metrics,
+    evaluate_metrics,
+    parse_formula,
+    record_from_event,
+)
+
+
+def test_parse_formula_ast():
+    ast = parse_formula("count(did=true)/count(did)")
+    assert ast == Binary(
+        "/",
+        Call("count", (Binary("==", Field("did"), Literal(True)),)),
+        Call("count", (Field("did"),)),
+    )
+
+
+def test_evaluate_preset_metrics():
+    template = load_json_file("presets/habit_tracker.json")
+    records = [{"did": True}, {"did": False}, {"did": True}, {"notes": "skipped"}]
+    assert evaluate_metrics(template, records) == {"completion_rate": pytest.approx(2 / 3)}
+
+
+def test_evaluate_multi_argument_and_scalar_expressions():
+    records = [{"commits": 2, "reviews": 1}, {"commits": 3}, {"reviews": "n/a"}]
+    assert compile_formula("sum(commits, reviews)").evaluate(records) == 6
+    assert compile_formula("max(commits) - min(commits)").evaluate(records) == 1
+    assert compile_formula("avg(commits) * 2").evaluate(records) == 5
+    assert compile_formula("count(commits > 2 or reviews = 1)").evaluate(records) == 2
+    assert compile_formula("avg(missing)").evaluate(records) is None
+    assert compile_formula("count(did=true)/count(did)").evaluate([]) is None
+
+
+@pytest.mark.parametrize(
+    "formula",
+    ["count(", "sum(x", "median(x)", "x + 1", "count(sum(x))", "count(x) $"],
+)
+def test_invalid_formulas(formula):
+    with pytest.raises(MetricFormulaError):
+        compile_formula(formula)
+
+
+def test_template_metrics_are_compiled_once():
+    template = load_json_file("presets/habit_tracker.json")
+    assert compile_template_metrics(template) is compile_template_metrics(dict(template))
+
+
+def test_validate_template_reports_formula_syntax_error():
+    template = load_json_file("presets/habit_tracker.json")
+    template["metrics"].append({"key": "broken", "formula": "count(did"})
+    with pytest.raises(ValidationError) as exc_info:
+        validate_template(template)
+    assert "Metric[1].formula is invalid" in str(exc_info.value)
+
+
+def test_record_from_event():
+    event = load_json_file("examples/minimal_event.json")
+    assert record_from_event({"field": "did", "value": True}) == {"did": True}
+    assert record_from_event({"choice": {"field": "mood", "value": "ok"}}) == {"mood": "ok"}
+    assert isinstance(record_from_event(event), dict)
+
+
+def test_numpy_backend_matches_python_backend():
+    pytest.importorskip("numpy")
+    from sdt_validator.columnar import ColumnBatch, evaluate_metrics_columnar
+
+    template = {
+        "id": "mixed",
+        "metrics": [
+            {"key": "rate", "formula": "count(did=true)/count(did)"},
+            {"key": "total", "formula": "sum(x, y)"},
+            {"key": "mean", "formula": "avg(x)"},
+            {"key": "low", "formula": "min(x)"},
+            {"key": "high", "formula": "max(y)"},
+            {"key": "filtered", "formula": "count(x > 1 and not (s = 'skip'))"},
+            {"key": "fallback", "formula": "count(x + 1)"},
+        ],
+    }
+    records = [
+        {"did": True, "x": 1, "y": 2.5, "s": "a"},
+        {"did": False, "x": 3, "s": "skip"},
+        {"did": "yes", "x": "3", "y": True},
+        {"x": None, "y": -1},
+        {},
+    ]
+    expected = evaluate_metrics(template, records)
+    assert evaluate_metrics(template, records, backend="numpy") == expected
+    assert evaluate_metrics_columnar(template, ColumnBatch(records)) == expected
+    assert evaluate_metrics(template, [], backend="numpy") == evaluate_metrics(template, [])
+
+
+def test_numpy_backend_keeps_ints_beyond_float64_exact():
+    pytest.importorskip("numpy")
+
+    template = {
+        "id": "big",
+        "metrics": [
+            {"key": "low", "formula": "min(a)"},
+            {"key": "high", "formula": "max(a)"},
+            {"key": "hits", "formula": "count(a = 1152921504606846976)"},
+            {"key": "above", "formula": "count(b > 9007199254740992)"},
+            {"key": "total", "formula": "sum(a)"},
+        ],
+    }
+    records = [{"a": 2**60, "b": 2**53 + 1}, {"a": 2**60 + 1, "b": 2.0**53}]
+    expected = evaluate_metrics(template, records)
+    assert expected["high"] == 2**60 + 1 and expected["hits"] == 1 and expected["above"] == 1
+    assert evaluate_metrics(template, records, backend="numpy") == expected
+
+
+def _event(field, value, user="u1", project="p1"):
+    return {"user_id": user, "project_id": project, "field": field, "value": value}
+
+
+def test_incremental_aggregator_matches_batch_with_retraction():
+    from sdt_validator.aggregate import MetricAggregator
+
+    template = {
+        "id": "t",
+        "fields": [{"key": "did", "type": "boolean"}, {"key": "minutes", "type": "number"}],
+        "metrics": [
+            {"key": "rate", "formula": "count(did=true)/count(did)"},
+            {"key": "total", "formula": "sum(minutes)"},
+            {"key": "mean", "formula": "avg(minutes)"},
+            {"key": "longest", "formula": "max(minutes)"},
+        ],
+    }
+    events = [
+        _event("did", True),
+        _event("did", False),
+        _event("minutes", 0.1),
+        _event("minutes", 0.2),
+        _event("minutes", 30),
+        _event("did", True, user="u2"),
+    ]
+    agg = MetricAggregator(template)
+    agg.add_many(events)
+    agg.retract(events[4])
+    kept = [e for e in events[:4]]
+
+    expected = evaluate_metrics(template, [record_from_event(e) for e in kept])
+    assert agg.get_metrics("u1", "p1") == expected
+    assert agg.get_metric("u1", "p1", "longest") == 0.2
+    assert agg.get_metric("u2", "p1", "rate") == 1
+
+    agg.drop_user("u2")
+    assert agg.get_metric("u2", "p1", "rate") is None
+    with pytest.raises(KeyError):
+        agg.get_metric("u1", "p1", "unknown")
+
+
+def test_running_min_max_keeps_bools_apart_from_numbers():
+    from sdt_validator.aggregate import RunningAggregate
+
+    high = RunningAggregate("max")
+    high.add([1, True, 0])
+    high.remove([True])
+    assert high.result() == 1 and type(high.result()) is int
+    with pytest.raises(ValueError):
+        high.remove([True])
+
+    low = RunningAggregate("min")
+    low.add([False, 0])
+    low.remove([False])
+    assert low.result() == 0 and type(low.result()) is int
+
+
+def test_exact_sum_matches_fsum_and_retracts_without_drift():
+    import math
+    import random
+
+    from sdt_validator.aggregate import ExactSum
+
+    rng = random.Random(7)
+    values = [rng.uniform(-1e6, 1e6) for _ in range(500)] + [1e-300, 2**60 + 1, True, 3]
+    total = ExactSum()
+    for v in values:
+        total.add(v)
+    assert total.value() == math.fsum(values)
+    for v in values[:-2]:
+        total.remove(v)
+    assert total.value() == 4 and type(total.value()) is int
+    assert total.value(as_float=True) == 4.0
+    assert total.num.bit_length() < 1100 and ExactSum().value() == 0
+
+
+def test_running_aggregates_survive_non_finite_values():
+    import math
+
+    from sdt_validator.aggregate import RunningAggregate
+
+    total, high = RunningAggregate("sum"), RunningAggregate("max")
+    for state in (total, high):
+        state.add([1.5, math.inf, math.nan])
+    assert math.isnan(total.result()) and high.result() == math.inf
+    for state in (total, high):
+        state.remove([math.nan])
+    assert total.result() == math.inf and high.result() == math.inf
+    total.add([-math.inf])
+    assert math.isnan(total.result())
+    for state in (total, high):
+        state.remove([math.inf])
+    total.remove([-math.inf])
+    assert total.result() == 1.5 and high.result() == 1.5
@@ -0,0 +1,118 @@
+import json
+import tracemalloc
+
+from sdt_validator.records import EventRecord
+from sdt_validator.rules import RuleEngine
+
+
+def _rule(rule_id, conditions, *, enabled=True, template_id="habit-tracker"):
+    return {
+        "schema_version": "0.1.0",
+        "id": rule_id,
+        "template_id": template_id,
+        "enabled": enabled,
+        "conditions": conditions,
+        "effects": [{"type": "nudge", "message": f"{rule_id} fired"}],
+    }
+
+
+def _event(field, value, timestamp, user="u1", event_id=None):
+    return {
+        "schema_version": "0.1.0",
+        "event_id": event_id or f"{user}-{timestamp}-{field}",
+        "event_type": "field_changed",
+        "user_id": user,
+        "project_id": "p1",
+        "timestamp": timestamp,
+        "field": field,
+        "value": value,
+    }
+
+
+def test_event_record_round_trip_and_rule_engine():
+    choice = {
+        "schema_version": "0.1.0",
+        "event_id": "e1",
+        "event_type": "choice_made",
+        "user_id": "u1",
+        "project_id": "p1",
+        "timestamp": "2026-03-01T18:00:00+09:00",
+        "choice": {"screen": "home", "field": "did", "value": True},
+        "client": {"platform": "ios", "app_version": "1.2.3"},
+        "privacy": {"consent": True},
+        "custom": [1, 2],
+    }
+    record = EventRecord.from_dict(choice)
+    assert record.timestamp_text == "2026-03-01T09:00:00Z"
+    assert record.record() == {"did": True} and record.extra == {"custom": [1, 2]}
+    assert record.to_dict() == {**choice, "timestamp": "2026-03-01T09:00:00Z"}
+    other = EventRecord.from_dict({**choice, "event_id": "e2", "user_id": "u" + "1"})
+    assert other.user_id is record.user_id
+
+    streak = [{"type": "streak", "field": "did", "value": 3}]
+    events = [_event("did", True, f"2026-03-0{d}T09:00:00Z") for d in (1, 2, 3)]
+    from_dicts = list(RuleEngine([_rule("s3", streak)]).process_many(events))
+    records = [EventRecord.from_dict(e) for e in events]
+    from_records = list(RuleEngine([_rule("s3", streak)]).process_many(records))
+    assert from_records == from_dicts and len(from_records) == 1
+
+
+def test_triggered_effects_carry_utc_timestamps_for_dicts_and_records():
+    event = _event("did", True, "2026-03-01T18:00:00.5+09:00")
+    rule = _rule("count-1", [{"type": "count", "field": "did", "value": 1}])
+    (by_dict,) = RuleEngine([rule]).process(event)
+    (by_record,) = RuleEngine([rule]).process(EventRecord.from_dict(event))
+    assert by_dict == by_record
+    assert by_dict.timestamp == "2026-03-01T09:00:00.500000Z"
+
+
+def test_event_record_picks_the_same_pair_as_record_from_event():
+    from sdt_validator.aggregate import MetricAggregator
+    from sdt_validator.metrics import record_from_event
+
+    base = _event("did", True, "2026-03-01T09:00:00Z")
+    choice = {"screen": "home", "field": "did", "value": True}
+    variants = [
+        {k: v for k, v in base.items() if k != "field"} | {"value": 5, "choice": choice},
+        base | {"field": None, "choice": choice},
+        base | {"choice": choice},
+        {k: v for k, v in base.items() if k not in ("field", "value")}
+        | {"choice": {**choice, "note": "x"}},
+    ]
+    template = {
+        "id": "habit-tracker",
+        "fields": [{"key": "did", "type": "boolean"}],
+        "metrics": [{"key": "days", "formula": "count(did=true)"}],
+    }
+    rule = _rule("count-1", [{"type": "count", "field": "did", "value": 1}])
+    for i, event in enumerate(variants):
+        event = {**event, "event_id": f"e{i}"}
+        record = EventRecord.from_dict(event)
+        assert record.record() == record_from_event(event)
+        assert record.to_dict() == event
+        by_dict, by_record = MetricAggregator(template), MetricAggregator(template)
+        by_dict.add(event)
+        by_record.add(record)
+        assert by_dict.get_metrics("u1", "p1") == by_record.get_metrics("u1", "p1")
+        engines = RuleEngine([rule], validate=False), RuleEngine([rule], validate=False)
+        assert len(engines[0].process(event)) == len(engines[1].process(record)) == 1
+
+
+def test_event_records_use_under_half_the_memory_of_dicts():
+    lines = [
+        json.dumps({**_event("did", True, "2026-03-01T09:00:00Z", user=f"u{i % 50}"),
+                    "event_id": f"e{i}", "client": {"platform": "ios"}})
+        for i in range(2000)
+    ]
+
+    def traced(build):
+        tracemalloc.start()
+        try:
+            kept = [build(json.loads(line)) for line in lines]
+            return tracemalloc.get_traced_memory()[0], kept
+        finally:
+            tracemalloc.stop()
+
+    dict_bytes, _ = traced(lambda e: e)
+    record_bytes, _ = traced(EventRecord.from_dict)
+    assert record_bytes < dict_bytes / 2
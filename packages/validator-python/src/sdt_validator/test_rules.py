@@ -0,0 +1,188 @@
+import pytest
+
+from sdt_validator import ValidationError, load_json_file
+from sdt_validator.rules import RuleEngine
+
+
+def _rule(rule_id, conditions, *, enabled=True, template_id="habit-tracker"):
+    return {
+        "schema_version": "0.1.0",
+        "id": rule_id,
+        "template_id": template_id,
+        "enabled": enabled,
+        "conditions": conditions,
+        "effects": [{"type": "nudge", "message": f"{rule_id} fired"}],
+    }
+
+
+def _event(field, value, timestamp, user="u1", event_id=None):
+    return {
+        "schema_version": "0.1.0",
+        "event_id": event_id or f"{user}-{timestamp}-{field}",
+        "event_type": "field_changed",
+        "user_id": user,
+        "project_id": "p1",
+        "timestamp": timestamp,
+        "field": field,
+        "value": value,
+    }
+
+
+def test_streak_rule_from_examples_fires_once():
+    engine = RuleEngine([load_json_file("examples/full/rule.json")])
+    fired = []
+    for day in range(1, 10):
+        fired += engine.process(_event("did", True, f"2026-03-{day:02d}T09:00:00Z"))
+    assert [(f.rule_id, f.timestamp) for f in fired] == [
+        ("habit-streak-7", "2026-03-07T09:00:00Z")
+    ]
+    assert fired[0].effect["type"] == "nudge"
+
+
+def test_streak_uses_local_days_and_grace_window():
+    streak = [{"type": "streak", "field": "did", "value": 3}]
+    # 04:00Z and 20:00Z on Mar 2 are Mar 1 and Mar 2 in Los Angeles.
+    times = ["2026-03-02T04:00:00Z", "2026-03-02T20:00:00Z", "2026-03-03T20:00:00Z"]
+    local = RuleEngine([_rule("s3", streak)], timezones={"u1": "America/Los_Angeles"})
+    utc = RuleEngine([_rule("s3", streak)])
+    assert [len(local.process(_event("did", True, t))) for t in times] == [0, 0, 1]
+    assert [len(utc.process(_event("did", True, t))) for t in times] == [0, 0, 0]
+
+    # A day arriving late fills the gap within the grace window only.
+    late = ["2026-03-01T09:00:00Z", "2026-03-03T09:00:00Z", "2026-03-02T09:00:00Z"]
+    engine = RuleEngine([_rule("s3", streak)], grace_days=1)
+    assert [len(engine.process(_event("did", True, t))) for t in late] == [0, 0, 1]
+    engine = RuleEngine([_rule("s3", streak)], grace_days=0)
+    assert [len(engine.process(_event("did", True, t))) for t in late] == [0, 0, 0]
+    assert engine.process(_event("did", True, "2026-03-04T09:00:00Z")) == []
+
+
+def test_streak_snapshot_round_trip(tmp_path):
+    from sdt_validator.streaks import StreakTracker
+
+    rules = [_rule("s3", [{"type": "streak", "field": "did", "value": 3}])]
+    engine = RuleEngine(rules)
+    for day in (1, 2):
+        engine.process(_event("did", True, f"2026-03-0{day}T09:00:00Z"))
+    engine.save_streaks(tmp_path / "streaks.bin")
+
+    restored = RuleEngine(rules)
+    assert restored.load_streaks(tmp_path / "streaks.bin") == 1
+    fired = restored.process(_event("did", True, "2026-03-03T09:00:00Z"))
+    assert [f.rule_id for f in fired] == ["s3"]
+
+    tracker = StreakTracker(grace_days=2)
+    for ts in (0, 86_400_000_000, 3 * 86_400_000_000):
+        tracker.add(("u1", "p1"), ts)
+    assert tracker.add(("u1", "p1"), 2 * 86_400_000_000) == 4
+    tracker.save(tmp_path / "t.bin")
+    loaded = StreakTracker.load(tmp_path / "t.bin")
+    assert loaded.length(("u1", "p1")) == 4
+    assert loaded.length(("u1", "p1"), now=10 * 86_400_000_000) == 0
+    assert (tmp_path / "t.bin").stat().st_size < 64
+
+
+def test_grace_days_out_of_range_rejected():
+    from sdt_validator.streaks import MAX_GRACE_DAYS
+
+    rule = _rule("streak-3", [{"type": "streak", "field": "did", "value": 3}])
+    RuleEngine([rule], grace_days=MAX_GRACE_DAYS)
+    for grace_days in (-1, MAX_GRACE_DAYS + 1, 100):
+        with pytest.raises(ValueError):
+            RuleEngine([rule], grace_days=grace_days)
+
+
+def test_count_threshold_and_time_window_conditions():
+    engine = RuleEngine(
+        [
+            _rule("count-3", [{"type": "count", "field": "did", "value": 3}]),
+            _rule("long-session", [{"type": "threshold", "field": "minutes", "value": 30}]),
+            _rule("burst", [{"type": "time_window", "field": "did", "window": "1h", "value": 2}]),
+            _rule("disabled", [{"type": "count", "field": "did", "value": 1}], enabled=False),
+        ]
+    )
+    assert engine.rule_ids == ["count-3", "long-session", "burst"]
+
+    fired = engine.process(_event("did", True, "2026-03-01T09:00:00Z"))
+    assert fired == []
+    fired = engine.process(_event("did", True, "2026-03-01T11:00:00Z"))
+    assert fired == []
+    fired = engine.process(_event("did", True, "2026-03-01T11:30:00Z"))
+    assert sorted(f.rule_id for f in fired) == ["burst", "count-3"]
+
+    assert engine.process(_event("minutes", 10, "2026-03-01T12:00:00Z")) == []
+    fired = engine.process(_event("minutes", 45, "2026-03-01T12:05:00Z"))
+    assert [f.rule_id for f in fired] == ["long-session"]
+    # Still above the threshold: no repeat until it drops and rises again.
+    assert engine.process(_event("minutes", 50, "2026-03-01T12:10:00Z")) == []
+    engine.process(_event("minutes", 5, "2026-03-01T12:15:00Z"))
+    assert [f.rule_id for f in engine.process(_event("minutes", 31, "2026-03-01T12:20:00Z"))] == [
+        "long-session"
+    ]
+
+
+def test_rule_state_is_per_user():
+    engine = RuleEngine([_rule("count-2", [{"type": "count", "field": "did", "value": 2}])])
+    engine.process(_event("did", True, "2026-03-01T09:00:00Z", user="a"))
+    assert engine.process(_event("did", True, "2026-03-01T09:00:00Z", user="b")) == []
+    assert len(engine.process(_event("did", True, "2026-03-01T10:00:00Z", user="a"))) == 1
+
+
+def test_invalid_rule_rejected():
+    with pytest.raises(ValidationError):
+        RuleEngine([{"id": "r", "enabled": True}])
+
+
+def test_time_window_without_window_names_the_rule():
+    rule = _rule("burst", [{"type": "time_window", "field": "did", "value": 2}])
+    for validate in (True, False):
+        with pytest.raises(ValidationError) as exc_info:
+            RuleEngine([rule], validate=validate)
+        assert "'burst'" in str(exc_info.value)
+
+
+def test_rule_index_dispatches_only_matching_rules():
+    from sdt_validator.rules import RuleIndex
+
+    rules = [
+        _rule("a", [{"type": "count", "field": "did"}]),
+        _rule("b", [{"type": "count", "field": "minutes"}, {"type": "count", "field": "did"}]),
+        _rule("c", [{"type": "count"}]),
+        _rule("d", [{"type": "count", "field": "did"}], template_id="other"),
+    ]
+    index = RuleIndex(rules)
+    assert index.dispatch("did", "habit-tracker") == [(0, (0,)), (1, (1,)), (2, (0,))]
+    assert index.dispatch("minutes", "habit-tracker") == [(1, (0,)), (2, (0,))]
+    assert index.dispatch("unknown", "habit-tracker") == [(2, (0,))]
+    assert index.dispatch("did") == [(0, (0,)), (1, (1,)), (2, (0,)), (3, (0,))]
+
+
+def test_parse_window_specs():
+    from sdt_validator.windows import parse_window
+
+    hour = 3600 * 1_000_000
+    assert parse_window("24h") == 24 * hour
+    assert parse_window("7d") == parse_window("P7D") == parse_window("P1W") == 168 * hour
+    assert parse_window("PT30M") == parse_window("30m") == hour // 2
+    assert parse_window("1h30m") == parse_window("PT1H30M") == 3 * hour // 2
+    for bad in ("", "7x", "P1M", "P1Y", "PT", "0s", "h", None):
+        with pytest.raises(ValueError):
+            parse_window(bad)
+
+
+def test_sliding_window_counter_is_bounded():
+    from sdt_validator.windows import SlidingWindowCounter
+
+    minute = 60 * 1_000_000
+    counter = SlidingWindowCounter(10 * minute, buckets=10, track_sum=True)
+    for i in range(1000):
+        counter.add(i * minute // 100, 2.0)  # 100 events per minute
+    assert counter.count(10 * minute - 1) == 1000
+    assert counter.sum(10 * minute - 1) == 2000.0
+    assert counter.count(10 * minute) == 900
+    assert len(counter._counts) == 10
+    # A late event still inside the window is kept; one older than it is dropped.
+    assert counter.add(5 * minute)
+    assert not counter.add(0)
+    assert counter.count(14 * minute) == 501
+    assert counter.count(30 * minute) == 0
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from sdt_validator import ValidationError, load_json_file, validate_project
+from sdt_validator.cron import CronError, next_fire, parse_cron
+from sdt_validator.scheduler import CronScheduler, SimulatedClock
+from sdt_validator.timeutil import format_timestamp, parse_timestamp
+
+
+def _next(expression, after, tz=None):
+    return format_timestamp(next_fire(expression, parse_timestamp(after), tz))
+
+
+def test_cron_next_fire():
+    assert _next("0 20 * * *", "2026-03-01T20:00:00Z") == "2026-03-02T20:00:00Z"
+    assert _next("*/15 * * * *", "2026-03-01T20:07:30Z") == "2026-03-01T20:15:00Z"
+    assert _next("0 9 * * mon-fri", "2026-03-06T10:00:00Z") == "2026-03-09T09:00:00Z"
+    assert _next("0 0 29 feb *", "2026-01-01T00:00:00Z") == "2028-02-29T00:00:00Z"
+    assert _next("@hourly", "2026-01-01T00:59:59Z") == "2026-01-01T01:00:00Z"
+    # Day-of-month and day-of-week are OR-ed when both are restricted.
+    assert _next("0 0 13 * 5", "2026-01-01T00:00:00Z") == "2026-01-02T00:00:00Z"
+    assert _next("0 20 * * *", "2026-03-01T00:00:00Z", "Asia/Seoul") == "2026-03-01T11:00:00Z"
+    for bad in ("* * *", "61 * * * *", "0 0 30 2 *", "*/0 * * * *", "x * * * *"):
+        with pytest.raises(CronError):
+            parse_cron(bad)
+
+
+def _project(project_id, crons):
+    return {
+        "schema_version": "0.1.0",
+        "project_id": project_id,
+        "name": "P",
+        "owner_id": "user_1",
+        "agents": ["agent_a"],
+        "workflows": [
+            {
+                "workflow_id": f"wf_{i}",
+                "trigger": {"type": "time_interval", "cron": cron},
+                "steps": [{"step_id": "s", "agent_id": "agent_a", "action": "capture"}],
+            }
+            for i, cron in enumerate(crons)
+        ],
+    }
+
+
+def test_scheduler_fires_due_workflows_in_batches():
+    start = parse_timestamp("2026-03-01T00:00:00Z")
+    clock = SimulatedClock(start)
+    scheduler = CronScheduler(clock)
+    for n in range(100):
+        scheduler.add_project(_project(f"p{n}", ["0 * * * *", "30 6 * * *"]))
+    assert len(scheduler) == 200
+    scheduler.unschedule("p0", "wf_1")
+
+    batches = []
+    until = parse_timestamp("2026-03-01T07:00:00Z")
+    asyncio.run(scheduler.run(batches.append, until=until))
+
+    times = [format_timestamp(b[0].fire_at) for b in batches]
+    assert times[:2] == ["2026-03-01T01:00:00Z", "2026-03-01T02:00:00Z"]
+    assert "2026-03-01T06:30:00Z" in times
+    sizes = {format_timestamp(b[0].fire_at): len(b) for b in batches}
+    assert sizes["2026-03-01T06:30:00Z"] == 99
+    assert sizes["2026-03-01T07:00:00Z"] == 100
+    assert scheduler.next_fire_time() == parse_timestamp("2026-03-01T08:00:00Z")
+
+
+def test_project_with_invalid_cron_rejected():
+    with pytest.raises(ValidationError) as exc_info:
+        validate_project(_project("p1", ["0 25 * * *"]))
+    assert "trigger.cron is invalid" in exc_info.value.errors[0]
+
+
+def test_dispatcher_routes_events_and_reloads_projects():
+    from sdt_validator.dispatch import WorkflowDispatcher
+
+    def project(project_id, triggers):
+        return {
+            "project_id": project_id,
+            "workflows": [
+                {"workflow_id": f"wf_{i}", "trigger": trigger, "steps": []}
+                for i, trigger in enumerate(triggers)
+            ],
+        }
+
+    dispatcher = WorkflowDispatcher(
+        [
+            project("p1", [
+                {"type": "event", "event_type": "choice_made"},
+                {"type": "event", "event_type": "session_end"},
+                {"type": "event", "event_type": "choice_made"},
+                {"type": "time_interval", "cron": "0 * * * *"},
+            ]),
+            project("p2", [{"type": "event"}]),
+        ],
+        validate=False,
+    )
+    event = load_json_file("examples/minimal_event.json")
+    assert dispatcher.route({**event, "project_id": "p1"}) == ("wf_0", "wf_2")
+    assert dispatcher.route({**event, "project_id": "p1", "event_type": "session_end"}) == ("wf_1",)
+    assert dispatcher.route({**event, "project_id": "p2"}) == ("wf_0",)
+    assert dispatcher.route({**event, "project_id": "nope"}) == ()
+
+    dispatcher.load_project(project("p1", [{"type": "event", "event_type": "session_end"}]))
+    assert dispatcher.route({**event, "project_id": "p1"}) == ()
+    assert dispatcher.route({**event, "project_id": "p1", "event_type": "session_end"}) == ("wf_0",)
+    dispatcher.remove_project("p2")
+    assert dispatcher.route({**event, "project_id": "p2"}) == () and len(dispatcher) == 1
+
+    with pytest.raises(ValidationError):
+        WorkflowDispatcher([project("p3", [{"type": "event"}])])
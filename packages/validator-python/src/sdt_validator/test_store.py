@@ -0,0 +1,81 @@
+import pytest
+
+from sdt_validator import ValidationError
+from sdt_validator.store import ExecutionStore
+
+
+def _record(n, status, workflow_id="wf_1", started=True):
+    record = {
+        "schema_version": "0.1.0",
+        "execution_id": f"exec_{n}",
+        "project_id": "proj_1",
+        "workflow_id": workflow_id,
+        "status": status,
+    }
+    if started:
+        record["started_at"] = f"2026-03-01T00:{n:02d}:00Z"
+    return record
+
+
+def test_execution_store_queries_and_compaction(tmp_path):
+    path = tmp_path / "executions.ndjson"
+    with ExecutionStore(path) as store:
+        for n in range(20):
+            store.append(_record(n, "running", workflow_id=f"wf_{n % 2}"))
+            store.append(_record(n, "failed" if n % 3 == 0 else "succeeded", f"wf_{n % 2}"))
+        store.append(_record(99, "queued", started=False))
+        assert len(store) == 21
+        latest = store.latest("wf_0", status="failed", n=2)
+        assert [r["execution_id"] for r in latest] == ["exec_18", "exec_12"]
+        assert store.query(status="running") == []
+        window = store.query(
+            started_after="2026-03-01T00:05:00Z", started_before="2026-03-01T00:08:00Z"
+        )
+        assert [r["execution_id"] for r in window] == ["exec_7", "exec_6"]
+        with pytest.raises(ValidationError):
+            store.append({"execution_id": "bad"})
+
+    # A torn final line (crash mid-append) is dropped on reopen.
+    with open(path, "ab") as f:
+        f.write(b'{"execution_id": "exec_')
+    store = ExecutionStore(path)
+    assert store.get("exec_3")["status"] == "failed"
+    assert store.get("exec_99")["status"] == "queued"
+    size = path.stat().st_size
+    assert store.compact() > 0 and path.stat().st_size < size
+    assert [r["execution_id"] for r in store.latest("wf_0", status="failed", n=2)] == [
+        "exec_18",
+        "exec_12",
+    ]
+    store.close()
+
+
+def test_execution_store_never_truncates_complete_lines(tmp_path):
+    path = tmp_path / "executions.ndjson"
+    with ExecutionStore(path, validate=False) as store:
+        with pytest.raises(ValidationError):
+            store.append({"status": "queued"})  # no execution_id: nothing written
+        store.append(_record(1, "running"))
+    with ExecutionStore(path) as store:
+        assert len(store) == 1
+
+    good = path.read_bytes()
+    for corrupt in (b"{not json\n", b"\xff\xfe\n", b'{"status": "queued"}\n'):
+        path.write_bytes(corrupt + good)
+        with pytest.raises(ValidationError):
+            ExecutionStore(path)
+        assert path.read_bytes() == corrupt + good
+
+
+def test_execution_store_keeps_queued_records_append_ordered(tmp_path):
+    with ExecutionStore(tmp_path / "executions.ndjson", validate=False) as store:
+        for n in range(5):
+            store.append(_record(n, "running"))
+            store.append(_record(50 + n, "queued", started=False))
+        store.append(_record(51, "running"))  # exec_51 starts
+        assert [seq for seq, _ in store._all.queued] == sorted(seq for seq, _ in store._all.queued)
+        ids = [r["execution_id"] for r in store.query()]
+        assert ids == ["exec_51", "exec_4", "exec_3", "exec_2", "exec_1", "exec_0",
+                       "exec_54", "exec_53", "exec_52", "exec_50"]
+        assert len(store.query(started_after="2026-03-01T00:00:00Z")) == 5
+        assert len(store.query(status="queued", started_before="2026-03-01T00:01:00Z")) == 4
@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 
 import pytest
@@ -10,6 +11,7 @@ from sdt_validator import (
     validate_execution,
     validate_event,
     validate_billing,
+    clear_schema_cache,
     load_json_file,
     ValidationError,
 )
@@ -180,6 +182,50 @@ def test_invalid_agent_field_not_in_template():
     assert "nonexistent_field" in str(exc_info.value)
 
 
+def test_bulk_references_against_template_index():
+    from sdt_validator import TemplateIndex, iter_reference_errors, validate_references
+
+    index = TemplateIndex.from_files(
+        [
+            "presets/game_growth.json",
+            "presets/open_source_contrib.json",
+            "examples/full/template.json",
+        ]
+    )
+    assert "game-growth-basic" in index and len(index) == 3
+    rules = [
+        load_json_file("examples/full/rule.json"),
+        {"id": "r-missing", "template_id": "nope", "conditions": []},
+        {
+            "id": "r-bad",
+            "template_id": "game-growth-basic",
+            "conditions": [{"type": "count", "field": "x"}],
+        },
+    ]
+    agents = [
+        load_json_file("examples/full/agent.json"),
+        {
+            "id": "a-bad",
+            "template_id": "game-growth-basic",
+            "capabilities": [{"type": "capture", "field": "y"}],
+        },
+    ]
+    results = list(iter_reference_errors(index, rules=rules, agents=agents))
+    assert [(r.kind, r.position, r.object_id) for r in results] == [
+        ("rule", 1, "r-missing"),
+        ("rule", 2, "r-bad"),
+        ("agent", 1, "a-bad"),
+    ]
+    assert "not in the index" in results[0].errors[0]
+    assert results[1].errors[0].startswith("Condition[0].field 'x' does not exist")
+    assert results[2].errors[0].startswith("Capability[0].field 'y' does not exist")
+
+    validate_references(index, rules=rules[:1], agents=agents[:1])
+    with pytest.raises(ValidationError) as exc_info:
+        validate_references(index, rules=rules)
+    assert len(exc_info.value.errors) == 2
+
+
 def test_valid_agent_capability_types():
     """Test all capability types with proper configs"""
     agent = {
@@ -359,6 +405,60 @@ def test_invalid_project_missing_agents():
         validate_project(bad)
 
 
+def _project_with_steps(steps):
+    return {
+        "schema_version": "0.1.0",
+        "project_id": "proj_1",
+        "name": "Test Project",
+        "owner_id": "user_1",
+        "agents": ["agent_a"],
+        "workflows": [{"workflow_id": "wf_1", "trigger": {"type": "manual"}, "steps": steps}],
+    }
+
+
+def test_project_workflow_graph_errors():
+    steps = [
+        {"step_id": "a", "agent_id": "agent_a", "action": "capture", "depends_on": ["c"]},
+        {"step_id": "b", "agent_id": "agent_a", "action": "analyze", "depends_on": ["a"]},
+        {"step_id": "c", "agent_id": "agent_a", "action": "suggest", "depends_on": ["b"]},
+        {"step_id": "d", "agent_id": "agent_x", "action": "remind", "depends_on": ["zzz"]},
+    ]
+    with pytest.raises(ValidationError) as exc_info:
+        validate_project(_project_with_steps(steps))
+    assert exc_info.value.message == "Project failed workflow validation."
+    errors = exc_info.value.errors
+    assert len(errors) == 3
+    assert "agent_id 'agent_x'" in errors[0]
+    assert "depends_on unknown step 'zzz'" in errors[1]
+    assert "a -> c -> b -> a" in errors[2]
+
+
+def test_plan_workflow_order_and_levels():
+    from sdt_validator.workflow import WorkflowError, plan_workflow
+
+    steps = [
+        {"step_id": "report", "agent_id": "agent_a", "action": "remind",
+         "depends_on": ["analyze", "suggest"]},
+        {"step_id": "capture", "agent_id": "agent_a", "action": "capture"},
+        {"step_id": "analyze", "agent_id": "agent_a", "action": "analyze",
+         "depends_on": ["capture"]},
+        {"step_id": "suggest", "agent_id": "agent_a", "action": "suggest",
+         "depends_on": ["capture"]},
+    ]
+    validate_project(_project_with_steps(steps))
+    plan = plan_workflow({"workflow_id": "wf_1", "steps": steps}, agents=["agent_a"])
+    assert plan.levels == [["capture"], ["analyze", "suggest"], ["report"]]
+    assert plan.order == ["capture", "analyze", "suggest", "report"]
+
+    steps.append({"step_id": "loop", "agent_id": "agent_a", "action": "custom",
+                  "depends_on": ["loop"]})
+    with pytest.raises(WorkflowError) as exc_info:
+        plan_workflow({"workflow_id": "wf_1", "steps": steps})
+    assert exc_info.value.errors == [
+        "Dependency cycle: loop -> loop (each step depends on the next)"
+    ]
+
+
 def test_valid_execution_minimal():
     execution = {
         "schema_version": "0.1.0",
@@ -394,3 +494,409 @@ def test_valid_billing_minimal():
         "timestamp": "2026-01-30T08:00:00Z",
     }
     validate_billing(billing)
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    [
+        "yesterday",
+        "2026-02-30T08:00:00Z",
+        "2026-01-30T24:00:00Z",
+        "2026-01-30T08:00:00",
+        "2026-01-30 08:00:00Z",
+        "2026-01-30T08:00:00+25:00",
+        "\u0662026-01-30T08:00:00Z",
+    ],
+)
+def test_invalid_timestamp_format_rejected(timestamp):
+    from sdt_validator.validator import _get_compiled
+
+    billing = {
+        "schema_version": "0.1.0",
+        "transaction_id": "txn_1",
+        "user_id": "user_1",
+        "type": "credit_spend",
+        "balance_delta": -5,
+        "timestamp": timestamp,
+    }
+    with pytest.raises(ValidationError) as exc_info:
+        validate_billing(billing)
+    assert f"{timestamp!r} is not a 'date-time' at 'timestamp'" in exc_info.value.errors
+    assert _get_compiled("billing.schema.json").check(billing) is False
+    for ok in ("2024-02-29T23:59:60.123456+05:30", "2026-01-30t08:00:00z"):
+        validate_billing({**billing, "timestamp": ok})
+
+
+def test_schema_cache_reuses_compiled_validator():
+    from sdt_validator.validator import _get_compiled
+
+    first = _get_compiled("event.schema.json")
+    second = _get_compiled("event.schema.json")
+    assert first is second
+
+
+def test_schema_cache_invalidation(tmp_path):
+    import shutil
+
+    from sdt_validator.validator import _get_compiled
+
+    spec_dir = tmp_path / "spec"
+    shutil.copytree("spec", spec_dir)
+    billing = {
+        "schema_version": "0.1.0",
+        "transaction_id": "txn_1",
+        "user_id": "user_1",
+        "type": "credit_spend",
+        "balance_delta": -5,
+        "timestamp": "2026-01-30T08:00:00Z",
+    }
+    validate_billing(billing, spec_dir=spec_dir)
+    before = _get_compiled("billing.schema.json", spec_dir)
+
+    schema = load_json_file(spec_dir / "billing.schema.json")
+    schema["required"].append("reason")
+    (spec_dir / "billing.schema.json").write_text(json.dumps(schema), encoding="utf-8")
+    clear_schema_cache(spec_dir)
+
+    assert _get_compiled("billing.schema.json", spec_dir) is not before
+    with pytest.raises(ValidationError) as exc_info:
+        validate_billing(billing, spec_dir=spec_dir)
+    assert "'reason' is a required property" in str(exc_info.value)
+
+
+def test_generated_check_matches_generic_validator():
+    from sdt_validator.validator import _get_compiled
+
+    samples = {
+        "template.schema.json": [
+            load_json_file("presets/habit_tracker.json"),
+            {"id": "x", "name": "Bad"},
+            {"schema_version": "1", "id": "", "name": "n", "domain": "game", "fields": []},
+        ],
+        "agent.schema.json": [
+            load_json_file("examples/full/agent.json"),
+            {
+                "schema_version": "0.1.0",
+                "id": "a",
+                "name": "A",
+                "template_id": "t",
+                "capabilities": [{"type": "remind", "field": "x"}],
+            },
+        ],
+        "billing.schema.json": [
+            load_json_file("examples/minimal_billing.json"),
+            {"schema_version": "0.1.0", "balance_delta": True},
+        ],
+    }
+    for schema_name, objs in samples.items():
+        compiled = _get_compiled(schema_name)
+        assert compiled.check is not None
+        for obj in objs:
+            assert compiled.check(obj) == compiled.validator.is_valid(obj)
+
+
+def test_generated_check_keeps_error_messages(monkeypatch):
+    bad = {
+        "schema_version": "0.1.0",
+        "event_id": "",
+        "event_type": "unknown",
+        "user_id": "user_1",
+        "project_id": "proj_1",
+    }
+    with pytest.raises(ValidationError) as with_codegen:
+        validate_event(bad)
+
+    monkeypatch.setenv("SDT_CODEGEN", "0")
+    clear_schema_cache()
+    try:
+        with pytest.raises(ValidationError) as without_codegen:
+            validate_event(bad)
+    finally:
+        monkeypatch.delenv("SDT_CODEGEN")
+        clear_schema_cache()
+    assert str(with_codegen.value) == str(without_codegen.value)
+
+
+def test_compile_schemas_writes_cache(tmp_path):
+    from sdt_validator import compile_schemas
+
+    compiled = compile_schemas(cache_dir=tmp_path)
+    assert "event.schema.json" in compiled
+    assert any(p.name.startswith("event_schema_json_") for p in tmp_path.iterdir())
+
+
+def _write_ndjson(path, records):
+    path.write_text(
+        "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records) + "\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_iter_validate_ndjson_reports_line_numbers(tmp_path):
+    from sdt_validator import iter_validate_ndjson
+
+    good = load_json_file("examples/minimal_event.json")
+    bad = dict(good, event_type="unknown")
+    path = _write_ndjson(tmp_path / "events.ndjson", [good, "", bad, "{not json"])
+
+    results = list(iter_validate_ndjson(path, "event"))
+    assert [(r.line, r.ok) for r in results] == [(1, True), (3, False), (4, False)]
+    assert "'unknown' is not one of" in str(results[1].error)
+
+
+def test_cli_ndjson_summary(tmp_path, capsys):
+    from sdt_validator.cli import main
+
+    good = load_json_file("examples/minimal_billing.json")
+    bad = dict(good, balance_delta="five")
+    path = _write_ndjson(tmp_path / "billing.ndjson", [good, good, bad])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main(["billing", str(path), "--ndjson"])
+    assert exc_info.value.code == 1
+    captured = capsys.readouterr()
+    assert "Checked 3 records: 2 valid, 1 invalid" in captured.out
+    assert "line 3:" in captured.err
+
+
+def test_fail_fast_is_valid_and_structured_errors():
+    import pickle
+
+    from sdt_validator import ErrorDetail, is_valid, validate_kind
+
+    bad = {"id": "x", "fields": [{"key": 1}]}
+    with pytest.raises(ValidationError) as full:
+        validate_kind("template", bad)
+    with pytest.raises(ValidationError) as fast:
+        validate_kind("template", bad, fail_fast=True)
+    assert len(fast.value.errors) == 1 < len(full.value.errors)
+
+    details = full.value.details
+    assert ErrorDetail(("fields", 0, "key"), "type", "1 is not of type 'string'") in details
+    assert "1 is not of type 'string' at 'fields[0].key'" in full.value.errors
+    restored = pickle.loads(pickle.dumps(full.value))
+    assert str(restored) == str(full.value) and restored.to_dict() == full.value.to_dict()
+
+    assert is_valid("template", load_json_file("presets/habit_tracker.json"))
+    assert not is_valid("template", bad)
+    broken_formula = load_json_file("presets/habit_tracker.json")
+    broken_formula["metrics"][0]["formula"] = "count(("
+    assert not is_valid("template", broken_formula)
+
+
+def test_cli_json_format(tmp_path, capsys):
+    from sdt_validator.cli import main
+
+    good = load_json_file("examples/minimal_billing.json")
+    path = _write_ndjson(tmp_path / "billing.ndjson", [good, dict(good, balance_delta="five")])
+    with pytest.raises(SystemExit):
+        main(["billing", str(path), "--ndjson", "--format", "json"])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[0]["line"] == 2 and lines[0]["error"]["errors"] == [
+        {"path": ["balance_delta"], "keyword": "type", "message": "'five' is not of type 'number'"}
+    ]
+    assert lines[1] == {"summary": {"total": 2, "valid": 1, "invalid": 1}}
+
+    main(["billing", "examples/minimal_billing.json", "--format", "json"])
+    assert json.loads(capsys.readouterr().out) == {
+        "path": "examples/minimal_billing.json", "ok": True
+    }
+
+
+def test_batch_validate_files_with_process_pool(tmp_path):
+    from sdt_validator.batch import expand_paths, summarize, validate_files
+
+    template = load_json_file("presets/habit_tracker.json")
+    for i in range(6):
+        (tmp_path / f"t{i}.json").write_text(json.dumps(template), encoding="utf-8")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "bad.json").write_text('{"id": "x"}', encoding="utf-8")
+
+    paths = expand_paths([tmp_path, str(tmp_path / "t*.json")])
+    assert len(paths) == 7
+
+    results = validate_files(paths, "template", jobs=2)
+    summary = summarize(results)
+    assert (summary.total, summary.valid, summary.invalid) == (7, 6, 1)
+    bad = [r for r in results if not r.ok]
+    assert bad[0].path.endswith("bad.json")
+    assert "failed schema validation" in bad[0].error
+
+
+def test_cli_batch_exit_code(tmp_path, capsys):
+    from sdt_validator.cli import main
+
+    (tmp_path / "ok.json").write_text(
+        json.dumps(load_json_file("examples/minimal_rule.json")), encoding="utf-8"
+    )
+    main(["rule", str(tmp_path), "--jobs", "1"])
+    assert "1 valid, 0 invalid" in capsys.readouterr().out
+
+    (tmp_path / "bad.json").write_text("{}", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc_info:
+        main(["rule", str(tmp_path / "ok.json"), str(tmp_path / "bad.json")])
+    assert exc_info.value.code == 1
+
+
+def test_packaged_bundle_is_current_and_inlined():
+    from sdt_validator.bundle import build_bundle, load_bundle
+
+    bundle = load_bundle()
+    assert bundle == build_bundle("spec"), "run sdt-bundle --spec-dir spec"
+    assert "$ref" not in json.dumps(bundle["schemas"])
+
+
+def test_bundle_validates_outside_repo(tmp_path, monkeypatch):
+    from sdt_validator.bundle import BUNDLE_PATH
+    from sdt_validator.validator import _get_compiled, _schema_cache
+
+    event = load_json_file("examples/minimal_event.json")
+    spec = Path("spec").resolve()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SDT_SPEC_DIR", raising=False)
+    validate_event(event)
+    assert _get_compiled("event.schema.json") is _get_compiled("event.schema.json")
+    assert (BUNDLE_PATH, "event.schema.json") in _schema_cache
+
+    bad = {**event, "timestamp": "yesterday", "extra": 1}
+    with pytest.raises(ValidationError) as bundled:
+        validate_event(bad)
+    with pytest.raises(ValidationError) as direct:
+        validate_event(bad, spec_dir=spec)
+    assert bundled.value.errors == direct.value.errors
+
+
+def test_local_spec_takes_precedence_over_bundle(tmp_path, monkeypatch):
+    from sdt_validator.bundle import BUNDLE_PATH
+    from sdt_validator.validator import _schema_cache
+
+    event = load_json_file("examples/minimal_event.json")
+    template = load_json_file("examples/minimal_template.json")
+    (tmp_path / "spec").mkdir()
+    (tmp_path / "spec" / "event.schema.json").write_text(json.dumps({
+        "$schema": "https://json-schema.org/draft/2020-12/schema", "type": "string",
+    }), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SDT_SPEC_DIR", raising=False)
+    clear_schema_cache()
+    with pytest.raises(ValidationError):
+        validate_event(event)  # the edited ./spec, not the bundle
+    validate_template(template)
+    assert (BUNDLE_PATH, "template.schema.json") in _schema_cache
+    assert (BUNDLE_PATH, "event.schema.json") not in _schema_cache
+    clear_schema_cache()
+
+
+def test_bundle_rejects_recursive_ref(tmp_path):
+    from sdt_validator.bundle import BundleError, build_bundle
+
+    (tmp_path / "tree.schema.json").write_text(json.dumps({
+        "$schema": "https://json-schema.org/draft/2020-12/schema",
+        "$id": "tree.schema.json",
+        "type": "object",
+        "properties": {"children": {"type": "array", "items": {"$ref": "#"}}},
+    }), encoding="utf-8")
+    with pytest.raises(BundleError):
+        build_bundle(tmp_path)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    import threading
+
+    from sdt_validator.server import ValidationServer
+
+    server = ValidationServer(tmp_path / "sdt.sock")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_daemon_validates_batches(daemon):
+    from sdt_validator.server import DaemonError, connect
+
+    event = load_json_file("examples/minimal_event.json")
+    bad = {**event, "timestamp": "yesterday"}
+    with connect(daemon.path) as client:
+        ok, failed = client.validate("event", [event, bad])
+        (from_file,) = client.validate_paths("event", ["examples/minimal_event.json"])
+        with pytest.raises(DaemonError):
+            client.validate("nope", [event])
+    assert ok == {"ok": True} and from_file == {"ok": True}
+    with pytest.raises(ValidationError) as exc_info:
+        validate_event(bad)
+    assert failed["error"] == exc_info.value.to_dict()
+    assert failed["text"] == str(exc_info.value)
+    assert daemon.requests == 3
+
+
+def test_cli_uses_daemon_and_falls_back(daemon, tmp_path, capsys):
+    from sdt_validator.cli import main
+    from sdt_validator.server import ValidationServer, connect
+
+    bad = tmp_path / "bad.json"
+    bad.write_text("{}", encoding="utf-8")
+    outputs = []
+    for socket_args in (["--socket", str(daemon.path)], ["--socket", str(tmp_path / "none.sock")]):
+        for paths in (["examples/minimal_event.json"], ["examples/minimal_event.json", str(bad)]):
+            with pytest.raises(SystemExit) as exc_info:
+                main(["event", *paths, "--format", "json", *socket_args])
+                raise SystemExit(0)
+            outputs.append((exc_info.value.code, capsys.readouterr().out))
+    assert daemon.requests == 2
+    assert outputs[:2] == outputs[2:]
+    assert [code for code, _ in outputs] == [0, 1, 0, 1]
+
+    assert connect(tmp_path / "none.sock") is None
+    with pytest.raises(RuntimeError):
+        ValidationServer(daemon.path)
+
+
+def test_daemon_serves_only_the_clients_spec_source(monkeypatch, tmp_path):
+    from sdt_validator.server import _spec_source, handle_request
+
+    event = load_json_file("examples/minimal_event.json")
+    request = {"kind": "event", "payloads": [event], **_spec_source(None)}
+    assert handle_request(request) == {"results": [{"ok": True}]}
+    assert "error" in handle_request({**request, "bundle": str(tmp_path / "schemas.json")})
+    # The client would use the bundle, but the daemon's ./spec holds the schema.
+    assert "error" in handle_request({**request, "cwd": str(tmp_path)})
+
+    # A daemon started with SDT_SPEC_DIR would not use the bundle the client would.
+    spec = tmp_path / "spec"
+    spec.mkdir()
+    (spec / "event.schema.json").write_text('{"type": "string"}', encoding="utf-8")
+    monkeypatch.setenv("SDT_SPEC_DIR", str(spec))
+    assert "error" in handle_request(request)
+    explicit = handle_request({**request, **_spec_source(spec)})
+    assert explicit["results"][0]["ok"] is False
+    clear_schema_cache()
+
+
+def test_connect_refuses_sockets_of_other_users(daemon, monkeypatch):
+    import os
+
+    from sdt_validator.server import connect
+
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    assert connect(daemon.path) is None
+
+
+def test_cli_falls_back_when_the_daemon_does_not_answer(tmp_path, monkeypatch, capsys):
+    import socket
+
+    from sdt_validator import cli
+    from sdt_validator.server import connect
+
+    path = tmp_path / "stuck.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stuck:
+        stuck.bind(str(path))
+        stuck.listen()
+        monkeypatch.setattr(cli, "connect", lambda p: connect(p, reply_timeout=0.2))
+        cli.main(["event", "examples/minimal_event.json", "--socket", str(path)])
+    assert capsys.readouterr().out == "OK\n"
@@ -0,0 +1,132 @@
+"""
+Timestamp helpers shared by the streaming engines.
+
+Timestamps are RFC 3339 strings (common.schema.json#/$defs/timestamp) and are
+converted once to integer microseconds since the Unix epoch.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+MICROS_PER_SECOND = 1_000_000
+MICROS_PER_DAY = 86_400 * MICROS_PER_SECOND
+
+_TIMESTAMP_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[Tt ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?"
+    r"(?:([Zz])|([+-])(\d{2}):(\d{2}))?"
+)
+# RFC 3339 section 5.6 date-time: the offset is required, digits are ASCII.
+_RFC3339_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}[Tt]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[Zz]|[+-]\d{2}:\d{2})", re.ASCII
+)
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def days_from_civil(y: int, m: int, d: int) -> int:
+    """Days since 1970-01-01 for a proleptic Gregorian date (H. Hinnant's algorithm)."""
+    y -= m <= 2
+    era = (y if y >= 0 else y - 399) // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _is_leap(y: int) -> bool:
+    return y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)
+
+
+@lru_cache(maxsize=4096)
+def is_rfc3339(value: str) -> bool:
+    """
+    Whether value is an RFC 3339 date-time, as JSON Schema's "date-time" format.
+
+    Results are cached: event streams repeat the same timestamps (batches
+    stamped to the second) far more often than they repeat other strings.
+    """
+    if _RFC3339_RE.fullmatch(value) is None:
+        return False
+    # Fixed-width two-digit fields compare correctly as strings, so only a
+    # day past the 28th needs the numeric month length.
+    month, day = value[5:7], value[8:10]
+    if not (
+        "01" <= month <= "12"
+        and "01" <= day
+        and value[11:13] <= "23"
+        and value[14:16] <= "59"
+        and value[17:19] <= "60"
+    ):
+        return False
+    if day > "28":
+        m = int(month)
+        max_day = 29 if m == 2 and _is_leap(int(value[:4])) else _DAYS_IN_MONTH[m - 1]
+        if int(day) > max_day:
+            return False
+    return value[-1] in "Zz" or (value[-5:-3] <= "23" and value[-2:] <= "59")
+
+
+def parse_timestamp(value: str) -> int:
+    """
+    Parse an RFC 3339 timestamp into integer microseconds since the epoch.
+
+    Timestamps without an offset are treated as UTC. Raises ValueError on
+    malformed input.
+    """
+    m = _TIMESTAMP_RE.fullmatch(value)
+    if m is None:
+        raise ValueError(f"Invalid RFC 3339 timestamp: {value!r}")
+    year, month, day, hour, minute, second = (int(g) for g in m.group(1, 2, 3, 4, 5, 6))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month in timestamp: {value!r}")
+    max_day = 29 if month == 2 and _is_leap(year) else _DAYS_IN_MONTH[month - 1]
+    if not 1 <= day <= max_day or hour > 23 or minute > 59 or second > 60:
+        raise ValueError(f"Invalid date or time in timestamp: {value!r}")
+    frac = m.group(7)
+    micros = int(frac[:6].ljust(6, "0")) if frac else 0
+    seconds = days_from_civil(year, month, day) * 86_400 + hour * 3600 + minute * 60 + second
+    if m.group(9):
+        off_h, off_m = int(m.group(10)), int(m.group(11))
+        if off_h > 23 or off_m > 59:
+            raise ValueError(f"Invalid UTC offset in timestamp: {value!r}")
+        offset = off_h * 3600 + off_m * 60
+        seconds -= offset if m.group(9) == "+" else -offset
+    return seconds * MICROS_PER_SECOND + micros
+
+
+def format_timestamp(micros: int) -> str:
+    """Render epoch microseconds as an RFC 3339 UTC timestamp."""
+    dt = _EPOCH + timedelta(seconds=micros // MICROS_PER_SECOND)
+    frac = micros % MICROS_PER_SECOND
+    base = (
+        f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+        f"T{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+    )
+    return f"{base}.{frac:06d}Z" if frac else f"{base}Z"
+
+
+@lru_cache(maxsize=512)
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown timezone: {name!r}") from e
+
+
+def local_day(micros: int, tz: Optional[str] = None) -> int:
+    """
+    Day number (days since 1970-01-01) of an instant in an IANA timezone.
+
+    tz=None or "UTC" buckets by UTC day without touching the tz database.
+    """
+    if tz is None or tz == "UTC":
+        return micros // MICROS_PER_DAY
+    dt = _EPOCH + timedelta(microseconds=micros)
+    offset = dt.astimezone(_zone(tz)).utcoffset()
+    return (micros + offset // timedelta(microseconds=1)) // MICROS_PER_DAY
@@ -3,37 +3,86 @@ from __future__ import annotations
 import json
 import os
 import re
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
-
-from jsonschema import Draft202012Validator
-from referencing import Registry, Resource
-
-
-_METRIC_FUNC_NAMES = {
-    "sum",
-    "average",
-    "avg",
-    "count",
-    "min",
-    "max",
-}
-_METRIC_KEYWORDS = {
-    "true",
-    "false",
-    "and",
-    "or",
-    "not",
-}
+from typing import TYPE_CHECKING, Any, Callable, Collection, Dict, Optional
+
+from .bundle import BUNDLE_PATH, load_bundle
+from .codegen import GENERATOR_VERSION, compile_check, default_cache_dir, load_source
+from .cron import CronError, parse_cron
+from .kinds import _KIND_SCHEMAS, KINDS
+from .metrics import METRIC_FUNC_NAMES, METRIC_KEYWORDS, MetricFormulaError, compile_formula
+from .timeutil import is_rfc3339
+from .windows import parse_window
+from .workflow import workflow_errors
+
+if TYPE_CHECKING:
+    from jsonschema import Draft202012Validator, FormatChecker
+    from referencing import Registry
+
+
+_METRIC_FUNC_NAMES = METRIC_FUNC_NAMES
+_METRIC_KEYWORDS = METRIC_KEYWORDS
 _IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
 
 
-@dataclass
-class ValidationError(Exception):
-    """Raised when JSON does not conform to the SDT schema."""
+@dataclass(frozen=True)
+class ErrorDetail:
+    """One schema violation: where (path into the object), which keyword, and why."""
+    path: tuple[Any, ...]
+    keyword: Optional[str]
     message: str
-    errors: Optional[list[str]] = None
+
+    @property
+    def location(self) -> str:
+        """The path rendered like fields[0].key ("" for the root)."""
+        location = ""
+        for part in self.path:
+            if isinstance(part, int):
+                location += f"[{part}]"
+            else:
+                location += f".{part}" if location else str(part)
+        return location
+
+    def __str__(self) -> str:
+        location = self.location
+        return f"{self.message} at '{location}'" if location else self.message
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"path": list(self.path), "keyword": self.keyword, "message": self.message}
+
+
+class ValidationError(Exception):
+    """
+    Raised when JSON does not conform to the SDT schema.
+
+    `errors` are readable lines. Schema failures also carry `details`, the
+    ErrorDetail objects those lines are rendered from on first access.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        errors: Optional[list[str]] = None,
+        details: Optional[list[ErrorDetail]] = None,
+    ) -> None:
+        super().__init__(message)
+        self.message = message
+        self._errors = errors
+        self.details = details
+
+    @property
+    def errors(self) -> Optional[list[str]]:
+        if self._errors is None and self.details is not None:
+            self._errors = [str(d) for d in self.details]
+        return self._errors
+
+    @errors.setter
+    def errors(self, value: Optional[list[str]]) -> None:
+        self._errors = value
 
     def __str__(self) -> str:
         if not self.errors:
@@ -41,6 +90,17 @@ class ValidationError(Exception):
         details = "\n".join(f"- {e}" for e in self.errors)
         return f"{self.message}\n{details}"
 
+    def __repr__(self) -> str:
+        return f"ValidationError(message={self.message!r}, errors={self.errors!r})"
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-ready form; errors without structure get an empty path and no keyword."""
+        if self.details is not None:
+            errors = [d.to_dict() for d in self.details]
+        else:
+            errors = [{"path": [], "keyword": None, "message": e} for e in self.errors or ()]
+        return {"message": self.message, "errors": errors}
+
 
 def _default_spec_dir() -> Path:
     """
@@ -49,37 +109,271 @@ def _default_spec_dir() -> Path:
     Priority:
       1) SDT_SPEC_DIR environment variable
       2) ./spec relative to current working directory
+
+    Validation with no spec_dir and no SDT_SPEC_DIR uses the packaged bundle
+    (see bundle.py) for schemas ./spec lacks.
     """
-    env = os.getenv("SDT_SPEC_DIR")
+    return _spec_dir_for(os.getenv("SDT_SPEC_DIR"), os.getcwd())
+
+
+@lru_cache(maxsize=64)
+def _spec_dir_for(env: Optional[str], cwd: str) -> Path:
     if env:
-        return Path(env).expanduser().resolve()
-    return (Path.cwd() / "spec").resolve()
+        return (Path(cwd) / Path(env).expanduser()).resolve()
+    return (Path(cwd) / "spec").resolve()
 
 
 def _build_registry(spec_dir: Path) -> Registry:
+    from referencing import Registry, Resource
+
     resources: dict[str, Resource] = {}
     for schema_path in spec_dir.glob("*.json"):
         with schema_path.open("r", encoding="utf-8") as f:
             schema = json.load(f)
         schema_id = schema.get("$id") or schema_path.name
         resources[schema_id] = Resource.from_contents(schema)
-    return Registry().with_resources(resources.items())
+    return Registry().with_resources(resources.items()).crawl()
+
+
+@dataclass
+class _CompiledSchema:
+    """
+    A schema with its registry and validator.
+
+    The registry and the generic validator are built on first use, so when
+    the generated check accepts every object jsonschema is never imported.
+    """
+    schema: Dict[str, Any]
+    fingerprint: tuple
+    make_registry: Callable[[], Registry]
+    # Generated fast-path check (see codegen.py); None when unsupported.
+    check: Optional[Callable[[Any], bool]] = None
+    _registry: Optional[Registry] = field(default=None, repr=False)
+    _validator: Optional[Draft202012Validator] = field(default=None, repr=False)
+
+    @property
+    def registry(self) -> Registry:
+        if self._registry is None:
+            self._registry = self.make_registry()
+        return self._registry
+
+    @property
+    def validator(self) -> Draft202012Validator:
+        if self._validator is None:
+            from jsonschema import Draft202012Validator
+
+            self._validator = Draft202012Validator(
+                self.schema, registry=self.registry, format_checker=_format_checker()
+            )
+        return self._validator
+
+
+def _is_date_time(instance: Any) -> bool:
+    return not isinstance(instance, str) or is_rfc3339(instance)
+
+
+@lru_cache(maxsize=1)
+def _format_checker() -> FormatChecker:
+    """Asserts only the formats the spec uses; others stay annotations."""
+    from jsonschema import FormatChecker
+
+    checker = FormatChecker(formats=())
+    checker.checks("date-time")(_is_date_time)
+    return checker
+
+
+# Fingerprints are re-checked at most once per interval per spec directory, so
+# the hot path does not stat the spec files on every call.
+_FINGERPRINT_TTL = 1.0
+
+_cache_lock = threading.RLock()
+_schema_cache: dict[tuple[Path, str], _CompiledSchema] = {}
+_registry_cache: dict[Path, tuple[tuple, Registry]] = {}
+_fingerprint_cache: dict[Path, tuple[float, tuple]] = {}
+
+
+def _spec_fingerprint(spec_dir: Path) -> tuple:
+    now = time.monotonic()
+    cached = _fingerprint_cache.get(spec_dir)
+    if cached is not None and now - cached[0] < _FINGERPRINT_TTL:
+        return cached[1]
+    entries = []
+    try:
+        with os.scandir(spec_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.is_file():
+                    st = entry.stat()
+                    entries.append((entry.name, st.st_mtime_ns, st.st_size))
+    except (FileNotFoundError, NotADirectoryError):
+        entries = []
+    fingerprint = tuple(sorted(entries))
+    _fingerprint_cache[spec_dir] = (now, fingerprint)
+    return fingerprint
+
+
+def _cached_registry(spec_dir: Path, fingerprint: tuple) -> Registry:
+    cached = _registry_cache.get(spec_dir)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    registry = _build_registry(spec_dir)
+    _registry_cache[spec_dir] = (fingerprint, registry)
+    return registry
+
+
+def _get_compiled(schema_filename: str, spec_dir: Optional[Path] = None) -> _CompiledSchema:
+    """
+    Return the compiled validator for a schema file, building it on first use.
+
+    With no spec_dir and no SDT_SPEC_DIR, ./spec is used if it holds the
+    schema and the packaged bundle (see bundle.py) otherwise, so a checkout
+    always validates against its own spec files and an installed package
+    needs none.
+
+    Entries are keyed by the resolved spec directory and schema file name and
+    are rebuilt when any file in the spec directory changes (mtime or size).
+    Changes are noticed within _FINGERPRINT_TTL seconds; call
+    clear_schema_cache() to force a reload immediately.
+    """
+    if spec_dir is None:
+        env = os.getenv("SDT_SPEC_DIR")
+        spec_dir = _spec_dir_for(env, os.getcwd())
+        if not env and not any(
+            name == schema_filename for name, _, _ in _spec_fingerprint(spec_dir)
+        ):
+            bundled = _get_bundled(schema_filename)
+            if bundled is not None:
+                return bundled
+    else:
+        spec_dir = _spec_dir_for(str(spec_dir), os.getcwd())
+    key = (spec_dir, schema_filename)
+    with _cache_lock:
+        fingerprint = _spec_fingerprint(spec_dir)
+        compiled = _schema_cache.get(key)
+        if compiled is not None and compiled.fingerprint == fingerprint:
+            return compiled
+
+        schema_path = spec_dir / schema_filename
+        if not any(name == schema_filename for name, _, _ in fingerprint):
+            _raise_schema_not_found(schema_path)
+        with schema_path.open("r", encoding="utf-8") as f:
+            schema = json.load(f)
+        registry = _cached_registry(spec_dir, fingerprint)
+        check = None
+        if os.getenv("SDT_CODEGEN", "1") != "0":
+            check = compile_check(
+                schema, registry, label=schema_filename, cache_dir=default_cache_dir()
+            )
+        compiled = _CompiledSchema(
+            schema=schema,
+            fingerprint=fingerprint,
+            make_registry=lambda: registry,
+            check=check,
+        )
+        _schema_cache[key] = compiled
+        return compiled
+
+
+@lru_cache(maxsize=1)
+def _bundle_registry() -> Registry:
+    from referencing import Registry, Resource
+
+    schemas = (load_bundle() or {}).get("schemas", {})
+    return Registry().with_resources(
+        (schema.get("$id") or name, Resource.from_contents(schema))
+        for name, schema in schemas.items()
+    )
+
+
+def _get_bundled(schema_filename: str) -> Optional[_CompiledSchema]:
+    """The compiled schema from the packaged bundle (see bundle.py), if it has one."""
+    key = (BUNDLE_PATH, schema_filename)
+    compiled = _schema_cache.get(key)
+    if compiled is not None:
+        return compiled
+    with _cache_lock:
+        bundle = load_bundle()
+        if bundle is None or schema_filename not in bundle["schemas"]:
+            return None
+        schema = bundle["schemas"][schema_filename]
+        check = None
+        if os.getenv("SDT_CODEGEN", "1") != "0":
+            source = bundle["checks"].get(schema_filename)
+            if source is not None and bundle["generator_version"] == GENERATOR_VERSION:
+                check = load_source(source, filename=f"<sdt-bundle {schema_filename}>")
+            else:
+                check = compile_check(
+                    schema, _bundle_registry(), label=schema_filename,
+                    cache_dir=default_cache_dir(),
+                )
+        compiled = _CompiledSchema(
+            schema=schema,
+            fingerprint=(bundle["spec_digest"],),
+            make_registry=_bundle_registry,
+            check=check,
+        )
+        _schema_cache[key] = compiled
+        return compiled
+
+
+def clear_schema_cache(spec_dir: Optional[str | Path] = None) -> None:
+    """
+    Drop cached schemas, registries and validators.
+
+    If spec_dir is given only entries for that directory are dropped.
+    """
+    with _cache_lock:
+        if spec_dir is None:
+            _schema_cache.clear()
+            _registry_cache.clear()
+            _fingerprint_cache.clear()
+            _spec_dir_for.cache_clear()
+            _bundle_registry.cache_clear()
+            load_bundle.cache_clear()
+            return
+        resolved = Path(spec_dir).expanduser().resolve()
+        for key in [k for k in _schema_cache if k[0] == resolved]:
+            del _schema_cache[key]
+        _registry_cache.pop(resolved, None)
+        _fingerprint_cache.pop(resolved, None)
+
+
+def compile_schemas(
+    *, spec_dir: Optional[str | Path] = None, cache_dir: Optional[str | Path] = None
+) -> list[str]:
+    """
+    Generate specialized check functions for every schema in the spec directory.
+
+    Generated sources are written to cache_dir (default: SDT_CACHE_DIR) so
+    later processes load them instead of regenerating. Returns the schema
+    file names that were compiled; unsupported schemas are skipped and keep
+    using the generic validator.
+    """
+    spec_path = Path(spec_dir) if spec_dir else _default_spec_dir()
+    target = Path(cache_dir).expanduser() if cache_dir else default_cache_dir()
+    if target is None:
+        raise ValueError("cache_dir is required when SDT_CACHE_DIR is not set.")
+    compiled_names: list[str] = []
+    for schema_path in sorted(spec_path.glob("*.schema.json")):
+        compiled = _get_compiled(schema_path.name, spec_path)
+        if compile_check(
+            compiled.schema, compiled.registry, label=schema_path.name, cache_dir=target
+        ) is not None:
+            compiled_names.append(schema_path.name)
+    return compiled_names
+
+
+def _raise_schema_not_found(schema_path: Path) -> None:
+    raise FileNotFoundError(
+        f"Schema file not found: {schema_path}. "
+        f"Set SDT_SPEC_DIR or run from repo root so ./spec exists."
+    )
 
 
 def _load_schema(
     schema_filename: str, spec_dir: Optional[Path] = None
 ) -> tuple[Dict[str, Any], Registry]:
-    spec_dir = spec_dir or _default_spec_dir()
-    schema_path = spec_dir / schema_filename
-    if not schema_path.exists():
-        raise FileNotFoundError(
-            f"Schema file not found: {schema_path}. "
-            f"Set SDT_SPEC_DIR or run from repo root so ./spec exists."
-        )
-    with schema_path.open("r", encoding="utf-8") as f:
-        schema = json.load(f)
-    registry = _build_registry(spec_dir)
-    return schema, registry
+    compiled = _get_compiled(schema_filename, spec_dir)
+    return compiled.schema, compiled.registry
 
 
 def load_json_file(path: str | Path) -> Any:
@@ -88,23 +382,21 @@ def load_json_file(path: str | Path) -> Any:
         return json.load(f)
 
 
-def _validate(obj: Any, schema: Dict[str, Any], label: str, registry: Registry) -> None:
-    validator = Draft202012Validator(schema, registry=registry)
-    errors = sorted(validator.iter_errors(obj), key=lambda e: list(e.path))
-
+def _validate(
+    obj: Any, compiled: _CompiledSchema, label: str, fail_fast: bool = False
+) -> None:
+    if compiled.check is not None and compiled.check(obj):
+        return
+    if fail_fast:
+        errors = []
+        for error in compiled.validator.iter_errors(obj):
+            errors.append(error)
+            break
+    else:
+        errors = sorted(compiled.validator.iter_errors(obj), key=lambda e: list(e.path))
     if errors:
-        rendered: list[str] = []
-        for e in errors:
-            # Build a readable path like fields[0].key
-            path = ""
-            for part in e.path:
-                if isinstance(part, int):
-                    path += f"[{part}]"
-                else:
-                    path += f".{part}" if path else str(part)
-            where = f" at '{path}'" if path else ""
-            rendered.append(f"{e.message}{where}")
-        raise ValidationError(f"{label} failed schema validation.", rendered)
+        details = [ErrorDetail(tuple(e.path), e.validator, e.message) for e in errors]
+        raise ValidationError(f"{label} failed schema validation.", details=details)
 
 
 def _extract_identifiers(formula: str) -> list[str]:
@@ -140,14 +432,34 @@ def _validate_metric_formulas(template_obj: Any) -> None:
                 f"Metric[{idx}].formula references unknown fields {sorted(unknowns)}. "
                 f"Available fields: {sorted(fields) if fields else 'none'}"
             )
+            continue
+
+        try:
+            compile_formula(formula)
+        except MetricFormulaError as e:
+            errors.append(f"Metric[{idx}].formula is invalid: {e}")
 
     if errors:
         raise ValidationError("Template failed metric validation.", errors)
 
 
-def validate_template(template_obj: Any, *, spec_dir: Optional[str | Path] = None) -> None:
-    schema, registry = _load_schema("template.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(template_obj, schema, "Template", registry)
+def _validate_rule_windows(rule_obj: Any) -> None:
+    errors: list[str] = []
+    for idx, condition in enumerate(rule_obj.get("conditions", [])):
+        if isinstance(condition, dict) and condition.get("type") == "time_window":
+            try:
+                parse_window(condition.get("window"))
+            except ValueError as e:
+                errors.append(f"conditions[{idx}].window: {e}")
+    if errors:
+        raise ValidationError(f"Rule '{rule_obj.get('id')}' has invalid time windows.", errors)
+
+
+def validate_template(
+    template_obj: Any, *, spec_dir: Optional[str | Path] = None, fail_fast: bool = False
+) -> None:
+    compiled = _get_compiled("template.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(template_obj, compiled, "Template", fail_fast)
     _validate_metric_formulas(template_obj)
 
 
@@ -155,10 +467,12 @@ def validate_rule(
     rule_obj: Any,
     *,
     template_obj: Optional[Any] = None,
-    spec_dir: Optional[str | Path] = None
+    spec_dir: Optional[str | Path] = None,
+    fail_fast: bool = False,
 ) -> None:
-    schema, registry = _load_schema("rule.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(rule_obj, schema, "Rule", registry)
+    compiled = _get_compiled("rule.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(rule_obj, compiled, "Rule", fail_fast)
+    _validate_rule_windows(rule_obj)
     if template_obj is not None:
         _validate_rule_references(rule_obj, template_obj)
 
@@ -167,7 +481,8 @@ def validate_agent(
     agent_obj: Any,
     *,
     template_obj: Optional[Any] = None,
-    spec_dir: Optional[str | Path] = None
+    spec_dir: Optional[str | Path] = None,
+    fail_fast: bool = False,
 ) -> None:
     """
     Validate an agent object against the agent schema.
@@ -178,33 +493,141 @@ def validate_agent(
                      If provided, validates that template_id exists and
                      capabilities reference valid fields.
         spec_dir: Optional path to spec directory containing schemas
+        fail_fast: Report only the first schema error found
     """
-    schema, registry = _load_schema("agent.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(agent_obj, schema, "Agent", registry)
+    compiled = _get_compiled("agent.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(agent_obj, compiled, "Agent", fail_fast)
     
     # Cross-reference validation if template is provided
     if template_obj is not None:
         _validate_agent_references(agent_obj, template_obj)
 
 
-def validate_project(project_obj: Any, *, spec_dir: Optional[str | Path] = None) -> None:
-    schema, registry = _load_schema("project.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(project_obj, schema, "Project", registry)
+def _validate_project_workflows(project_obj: Any) -> None:
+    """
+    Validate each workflow's cron trigger and step graph: unique step ids,
+    known depends_on targets, agent_ids listed in project.agents, and no
+    dependency cycles.
+    """
+    errors: list[str] = []
+    agents = set(project_obj.get("agents", []))
+    seen: set[str] = set()
+    for idx, workflow in enumerate(project_obj.get("workflows", [])):
+        workflow_id = workflow.get("workflow_id")
+        if workflow_id in seen:
+            errors.append(f"Workflow[{idx}].workflow_id '{workflow_id}' is duplicated")
+        seen.add(workflow_id)
+        trigger = workflow.get("trigger", {})
+        if trigger.get("type") == "time_interval" and "cron" in trigger:
+            try:
+                parse_cron(trigger["cron"])
+            except CronError as e:
+                errors.append(f"Workflow[{idx}] '{workflow_id}': trigger.cron is invalid: {e}")
+        for problem in workflow_errors(workflow, agents=agents):
+            errors.append(f"Workflow[{idx}] '{workflow_id}': {problem}")
+
+    if errors:
+        raise ValidationError("Project failed workflow validation.", errors)
+
 
+def validate_project(
+    project_obj: Any, *, spec_dir: Optional[str | Path] = None, fail_fast: bool = False
+) -> None:
+    compiled = _get_compiled("project.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(project_obj, compiled, "Project", fail_fast)
+    _validate_project_workflows(project_obj)
 
-def validate_execution(execution_obj: Any, *, spec_dir: Optional[str | Path] = None) -> None:
-    schema, registry = _load_schema("execution.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(execution_obj, schema, "Execution", registry)
 
+def validate_execution(
+    execution_obj: Any, *, spec_dir: Optional[str | Path] = None, fail_fast: bool = False
+) -> None:
+    compiled = _get_compiled("execution.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(execution_obj, compiled, "Execution", fail_fast)
 
-def validate_event(event_obj: Any, *, spec_dir: Optional[str | Path] = None) -> None:
-    schema, registry = _load_schema("event.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(event_obj, schema, "Event", registry)
 
+def validate_event(
+    event_obj: Any, *, spec_dir: Optional[str | Path] = None, fail_fast: bool = False
+) -> None:
+    compiled = _get_compiled("event.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(event_obj, compiled, "Event", fail_fast)
 
-def validate_billing(billing_obj: Any, *, spec_dir: Optional[str | Path] = None) -> None:
-    schema, registry = _load_schema("billing.schema.json", Path(spec_dir) if spec_dir else None)
-    _validate(billing_obj, schema, "Billing", registry)
+
+def validate_billing(
+    billing_obj: Any, *, spec_dir: Optional[str | Path] = None, fail_fast: bool = False
+) -> None:
+    compiled = _get_compiled("billing.schema.json", Path(spec_dir) if spec_dir else None)
+    _validate(billing_obj, compiled, "Billing", fail_fast)
+
+
+def validate_kind(
+    kind: str,
+    obj: Any,
+    *,
+    template_obj: Optional[Any] = None,
+    spec_dir: Optional[str | Path] = None,
+    fail_fast: bool = False,
+) -> None:
+    """
+    Validate obj as the given kind (one of KINDS).
+
+    template_obj is only used for rule and agent cross-reference validation.
+    With fail_fast, schema validation stops at the first error instead of
+    collecting and sorting all of them.
+    """
+    if kind == "template":
+        validate_template(obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    elif kind == "rule":
+        validate_rule(obj, template_obj=template_obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    elif kind == "agent":
+        validate_agent(obj, template_obj=template_obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    elif kind == "project":
+        validate_project(obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    elif kind == "execution":
+        validate_execution(obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    elif kind == "event":
+        validate_event(obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    elif kind == "billing":
+        validate_billing(obj, spec_dir=spec_dir, fail_fast=fail_fast)
+    else:
+        raise ValueError(f"Unknown kind '{kind}'. Expected one of {list(KINDS)}")
+
+
+def is_valid(
+    kind: str,
+    obj: Any,
+    *,
+    template_obj: Optional[Any] = None,
+    spec_dir: Optional[str | Path] = None,
+) -> bool:
+    """
+    Whether validate_kind() would accept obj, without building any error report.
+
+    The schema check uses the generated fast path, falling back to the
+    generic validator's is_valid only for objects it rejects. The semantic
+    checks of templates, projects and cross-references run only for
+    schema-valid objects.
+    """
+    if kind not in _KIND_SCHEMAS:
+        raise ValueError(f"Unknown kind '{kind}'. Expected one of {list(KINDS)}")
+    compiled = _get_compiled(_KIND_SCHEMAS[kind], Path(spec_dir) if spec_dir else None)
+    if not (compiled.check is not None and compiled.check(obj)):
+        # The generated check may reject objects the generic validator accepts.
+        if not compiled.validator.is_valid(obj):
+            return False
+    try:
+        if kind == "template":
+            _validate_metric_formulas(obj)
+        elif kind == "project":
+            _validate_project_workflows(obj)
+        elif kind == "rule":
+            _validate_rule_windows(obj)
+            if template_obj is not None:
+                _validate_rule_references(obj, template_obj)
+        elif kind == "agent" and template_obj is not None:
+            _validate_agent_references(obj, template_obj)
+    except ValidationError:
+        return False
+    return True
 
 
 def _validate_agent_references(agent_obj: Any, template_obj: Any) -> None:
@@ -226,20 +649,12 @@ def _validate_agent_references(agent_obj: Any, template_obj: Any) -> None:
             f"but provided template has id '{template_id}'"
         )
     
-    # Build set of valid field keys from template
-    template_fields = template_obj.get("fields", [])
-    valid_field_keys = {field.get("key") for field in template_fields if field.get("key")}
-    
     # Validate capabilities field references
-    capabilities = agent_obj.get("capabilities", [])
-    for idx, capability in enumerate(capabilities):
-        field = capability.get("field")
-        if field is not None:
-            if field not in valid_field_keys:
-                errors.append(
-                    f"Capability[{idx}].field '{field}' does not exist in template. "
-                    f"Available fields: {sorted(valid_field_keys) if valid_field_keys else 'none'}"
-                )
+    errors.extend(
+        field_reference_errors(
+            "Capability", agent_capability_fields(agent_obj), _template_field_keys(template_obj)
+        )
+    )
     
     # Validate SDT support consistency (optional check)
     agent_sdt = agent_obj.get("sdt_support")
@@ -257,6 +672,50 @@ def _validate_agent_references(agent_obj: Any, template_obj: Any) -> None:
         raise ValidationError("Agent failed cross-reference validation.", errors)
 
 
+def _template_field_keys(template_obj: Any) -> set[str]:
+    return {field.get("key") for field in template_obj.get("fields", []) if field.get("key")}
+
+
+def rule_condition_fields(rule_obj: Any) -> list[tuple[int, Optional[str]]]:
+    """Return (condition index, field) for every condition of a rule; field may be None."""
+    return [
+        (idx, condition.get("field"))
+        for idx, condition in enumerate(rule_obj.get("conditions", []))
+    ]
+
+
+def agent_capability_fields(agent_obj: Any) -> list[tuple[int, Optional[str]]]:
+    """Return (capability index, field) for every capability of an agent; field may be None."""
+    return [
+        (idx, capability.get("field"))
+        for idx, capability in enumerate(agent_obj.get("capabilities", []))
+    ]
+
+
+def field_reference_errors(
+    label: str,
+    refs: list[tuple[int, Optional[str]]],
+    valid_field_keys: Collection[str],
+    available: Optional[str] = None,
+) -> list[str]:
+    """
+    Error messages for (index, field) references missing from valid_field_keys.
+
+    `available` is the rendered list of keys; pass it to avoid re-sorting the
+    keys for every object checked against the same template.
+    """
+    errors: list[str] = []
+    for idx, field in refs:
+        if field is not None and field not in valid_field_keys:
+            if available is None:
+                available = str(sorted(valid_field_keys)) if valid_field_keys else "none"
+            errors.append(
+                f"{label}[{idx}].field '{field}' does not exist in template. "
+                f"Available fields: {available}"
+            )
+    return errors
+
+
 def _validate_rule_references(rule_obj: Any, template_obj: Any) -> None:
     """
     Validate cross-references between rule and template.
@@ -275,17 +734,11 @@ def _validate_rule_references(rule_obj: Any, template_obj: Any) -> None:
             f"but provided template has id '{template_id}'"
         )
 
-    template_fields = template_obj.get("fields", [])
-    valid_field_keys = {field.get("key") for field in template_fields if field.get("key")}
-
-    conditions = rule_obj.get("conditions", [])
-    for idx, condition in enumerate(conditions):
-        field = condition.get("field")
-        if field is not None and field not in valid_field_keys:
-            errors.append(
-                f"Condition[{idx}].field '{field}' does not exist in template. "
-                f"Available fields: {sorted(valid_field_keys) if valid_field_keys else 'none'}"
-            )
+    errors.extend(
+        field_reference_errors(
+            "Condition", rule_condition_fields(rule_obj), _template_field_keys(template_obj)
+        )
+    )
 
     if errors:
         raise ValidationError("Rule failed cross-reference validation.", errors)
@@ -0,0 +1,142 @@
+"""
+Window specs and bounded-memory sliding-window counters.
+
+parse_window() understands the free-form `window` strings of time_window
+conditions: compact forms such as "30m", "24h", "7d", "1h30m" and ISO 8601
+durations such as "PT30M", "P1D" or "P1W". Calendar units (years, months)
+are rejected because their length is not fixed.
+
+SlidingWindowCounter keeps a ring of fixed-width buckets covering the window.
+Memory is O(buckets) regardless of the event rate, updates and queries are
+amortized O(1), and answers are exact up to one bucket width at the old edge
+of the window.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from typing import Any, Optional
+
+from .timeutil import MICROS_PER_SECOND
+
+
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86_400, "w": 604_800}
+_COMPACT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(ms|s|m|h|d|w)", re.IGNORECASE)
+_ISO_RE = re.compile(
+    r"P(?:(?P<w>\d+(?:\.\d+)?)W)?(?:(?P<d>\d+(?:\.\d+)?)D)?"
+    r"(?:T(?:(?P<h>\d+(?:\.\d+)?)H)?(?:(?P<m>\d+(?:\.\d+)?)M)?(?:(?P<s>\d+(?:\.\d+)?)S)?)?",
+    re.IGNORECASE,
+)
+
+
+def parse_window(window: Any) -> int:
+    """
+    Parse a window spec into microseconds.
+
+    Raises ValueError for anything that is not a positive fixed-length duration.
+    """
+    if not isinstance(window, str) or not window.strip():
+        raise ValueError("Window must be a non-empty string such as '7d', '24h' or 'PT30M'")
+    text = window.strip()
+    seconds = 0.0
+    if text[:1] in ("P", "p"):
+        m = _ISO_RE.fullmatch(text)
+        if m is None or text.upper().endswith("T") or all(v is None for v in m.groupdict().values()):
+            raise ValueError(
+                f"Unsupported window '{window}'. ISO 8601 durations may use W, D, H, M and S "
+                f"(years and months have no fixed length)"
+            )
+        for unit, amount in m.groupdict().items():
+            if amount is not None:
+                seconds += float(amount) * _UNIT_SECONDS[unit.lower()]
+    else:
+        pos = 0
+        compact = text.replace(" ", "")
+        for m in _COMPACT_RE.finditer(compact):
+            if m.start() != pos:
+                break
+            seconds += float(m.group(1)) * _UNIT_SECONDS[m.group(2).lower()]
+            pos = m.end()
+        if pos != len(compact) or pos == 0:
+            raise ValueError(
+                f"Unsupported window '{window}'. Expected e.g. '30m', '24h', '7d' or 'PT30M'"
+            )
+    micros = round(seconds * MICROS_PER_SECOND)
+    if micros <= 0:
+        raise ValueError(f"Window '{window}' must be longer than zero")
+    return micros
+
+
+class SlidingWindowCounter:
+    """
+    Count (and optionally sum) events in the trailing window ending at `now`.
+
+    The window is split into `buckets` equal slots kept in a ring. Events
+    older than the window are dropped; late events that still fall inside
+    the window are counted in their bucket.
+    """
+
+    __slots__ = ("window", "width", "buckets", "head", "total", "total_sum", "_counts", "_sums")
+
+    def __init__(self, window: int, *, buckets: int = 32, track_sum: bool = False) -> None:
+        if window <= 0 or buckets <= 0:
+            raise ValueError("window and buckets must be positive")
+        self.window = window
+        self.buckets = buckets
+        self.width = -(-window // buckets)  # ceil so buckets * width >= window
+        self.head: Optional[int] = None  # absolute index of the newest bucket
+        self.total = 0
+        self.total_sum = 0.0
+        self._counts = array("L", bytes(array("L").itemsize * buckets))
+        self._sums = array("d", bytes(8 * buckets)) if track_sum else None
+
+    def _advance(self, bucket: int) -> None:
+        head = self.head
+        if head is None:
+            self.head = bucket
+            return
+        if bucket <= head:
+            return
+        if bucket - head >= self.buckets:
+            for i in range(self.buckets):
+                self._counts[i] = 0
+                if self._sums is not None:
+                    self._sums[i] = 0.0
+            self.total = 0
+            self.total_sum = 0.0
+        else:
+            for b in range(head + 1, bucket + 1):
+                i = b % self.buckets
+                self.total -= self._counts[i]
+                self._counts[i] = 0
+                if self._sums is not None:
+                    self.total_sum -= self._sums[i]
+                    self._sums[i] = 0.0
+        self.head = bucket
+
+    def add(self, ts: int, value: float = 1.0) -> bool:
+        """Record an event at ts (epoch microseconds). Returns False if it is too old."""
+        bucket = ts // self.width
+        self._advance(bucket)
+        if bucket <= self.head - self.buckets:
+            return False
+        i = bucket % self.buckets
+        self._counts[i] += 1
+        self.total += 1
+        if self._sums is not None:
+            self._sums[i] += value
+            self.total_sum += value
+        return True
+
+    def count(self, now: int) -> int:
+        """Events in the window ending at now."""
+        self._advance(now // self.width)
+        return self.total
+
+    def sum(self, now: int) -> float:
+        """Sum of event values in the window ending at now (requires track_sum)."""
+        if self._sums is None:
+            raise ValueError("SlidingWindowCounter was created without track_sum=True")
+        self._advance(now // self.width)
+        return self.total_sum
@@ -0,0 +1,153 @@
+"""
+Dependency-graph checks and execution plans for project workflows.
+
+Each workflow's steps form a graph through `depends_on`. plan_workflow()
+checks it in linear time (Kahn's topological sort) and reports duplicate
+step ids, dangling dependencies, agent_ids missing from the project's
+`agents`, and dependency cycles with the offending path. A valid workflow
+yields a WorkflowPlan: a topological order plus parallelism levels, where
+every step in a level depends only on steps in earlier levels.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Collection, Mapping, Optional
+
+
+class WorkflowError(ValueError):
+    """Raised when a workflow's step graph is invalid; `errors` lists each problem."""
+
+    def __init__(self, workflow_id: Optional[str], errors: list[str]) -> None:
+        super().__init__(
+            f"Workflow '{workflow_id}' has an invalid step graph: " + "; ".join(errors)
+        )
+        self.workflow_id = workflow_id
+        self.errors = errors
+
+
+@dataclass
+class WorkflowPlan:
+    """Topological order and parallelism levels of a workflow's steps."""
+    workflow_id: Optional[str]
+    order: list[str]
+    levels: list[list[str]]
+    steps: dict[str, Mapping[str, Any]] = field(repr=False)
+
+
+def _find_cycle(remaining: list[str], deps: Mapping[str, list[str]]) -> list[str]:
+    """Return one dependency cycle among steps Kahn's algorithm could not order."""
+    left = set(remaining)
+    state: dict[str, int] = {}  # 1 = on the current path, 2 = done
+    for start in remaining:
+        if start in state:
+            continue
+        path = [start]
+        state[start] = 1
+        stack = [iter(deps[start])]
+        while stack:
+            nxt = next(stack[-1], None)
+            if nxt is None:
+                state[path.pop()] = 2
+                stack.pop()
+                continue
+            if nxt not in left:
+                continue
+            if state.get(nxt) == 1:
+                return path[path.index(nxt):] + [nxt]
+            if nxt not in state:
+                state[nxt] = 1
+                path.append(nxt)
+                stack.append(iter(deps[nxt]))
+    return []
+
+
+def _analyze(
+    workflow: Mapping[str, Any], agents: Optional[Collection[str]]
+) -> tuple[Optional[WorkflowPlan], list[str]]:
+    workflow_id = workflow.get("workflow_id")
+    errors: list[str] = []
+    steps: dict[str, Mapping[str, Any]] = {}
+    available = sorted(agents) if agents is not None else None
+    for idx, step in enumerate(workflow.get("steps", [])):
+        step_id = step.get("step_id")
+        if step_id in steps:
+            errors.append(f"Step[{idx}].step_id '{step_id}' is duplicated")
+            continue
+        steps[step_id] = step
+        agent_id = step.get("agent_id")
+        if agents is not None and agent_id not in agents:
+            errors.append(
+                f"Step[{idx}] '{step_id}' uses agent_id '{agent_id}', "
+                f"which is not in project agents {available}"
+            )
+
+    deps: dict[str, list[str]] = {}
+    dependents: dict[str, list[str]] = {step_id: [] for step_id in steps}
+    indegree: dict[str, int] = {}
+    for step_id, step in steps.items():
+        known = []
+        for dep in dict.fromkeys(step.get("depends_on", [])):
+            if dep not in steps:
+                errors.append(f"Step '{step_id}' depends_on unknown step '{dep}'")
+                continue
+            known.append(dep)
+            dependents[dep].append(step_id)
+        deps[step_id] = known
+        indegree[step_id] = len(known)
+
+    levels: list[list[str]] = []
+    level = [step_id for step_id, n in indegree.items() if n == 0]
+    order: list[str] = []
+    while level:
+        levels.append(level)
+        order.extend(level)
+        nxt = []
+        for step_id in level:
+            for dependent in dependents[step_id]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    nxt.append(dependent)
+        level = nxt
+
+    if len(order) < len(steps):
+        placed = set(order)
+        cycle = _find_cycle([s for s in steps if s not in placed], deps)
+        errors.append(
+            "Dependency cycle: " + " -> ".join(cycle) + " (each step depends on the next)"
+        )
+
+    if errors:
+        return None, errors
+    return WorkflowPlan(workflow_id, order, levels, steps), []
+
+
+def workflow_errors(
+    workflow: Mapping[str, Any], *, agents: Optional[Collection[str]] = None
+) -> list[str]:
+    """All graph problems in one workflow; empty if it is valid."""
+    return _analyze(workflow, agents)[1]
+
+
+def plan_workflow(
+    workflow: Mapping[str, Any], *, agents: Optional[Collection[str]] = None
+) -> WorkflowPlan:
+    """
+    Check a workflow's step graph and return its execution plan.
+
+    agents, if given, is the set of agent ids steps may use. Raises
+    WorkflowError listing every problem found.
+    """
+    plan, errors = _analyze(workflow, None if agents is None else set(agents))
+    if plan is None:
+        raise WorkflowError(workflow.get("workflow_id"), errors)
+    return plan
+
+
+def plan_project(project_obj: Mapping[str, Any]) -> dict[str, WorkflowPlan]:
+    """Plans for every workflow of a project, keyed by workflow_id."""
+    agents = set(project_obj.get("agents", []))
+    return {
+        wf.get("workflow_id"): plan_workflow(wf, agents=agents)
+        for wf in project_obj.get("workflows", [])
+    }